@@ -39,6 +39,14 @@ Provided by Gismo 0.0.2
         _context: Input the "terrainShadingMask" output from "Terrain shading mask" component.
                   You can additionally input other opaque obstacles surrounding your location: houses, buildings etc.
                   Do not input trees, as they are not opaque obstacles and should not be taken into account when analysing the horizon angles.
+                  -
+                  If "horizonMap_" input is supplied, _context input is not needed.
+        horizonMap_: Input the "horizonMap" output from "Terrain Generator" component.
+                     If supplied, horizon angles of each "_analysisGeometry" point will be read from the horizon map of the terrain (the horizon angles of the terrain grid cell below that point) instead of being calculated from the "_context" input. This takes a fraction of a second for hundreds of points.
+                     "_analysisGeometry" needs to lie on the "terrain" output of the same "Terrain Generator" component. Only its X and Y coordinates are taken into account.
+                     Horizon map angles are usually within 1 (smooth terrain) to 2 degrees (rough terrain) of the ones calculated by marching along each azimuth from the point. For points less than 8 grid cells from the terrain's edge (in azimuth direction) the difference can be up to about 8 degrees.
+                     -
+                     If not supplied, horizon angles will be calculated from the "_context" input.
         north_: Input a vector to be used as a true North direction, or a number between 0 and 360 that represents the clockwise degrees off from the Y-axis.
                 -
                 If not supplied, default North direction will be set to the Y-axis (0 degrees).
@@ -72,6 +80,9 @@ Provided by Gismo 0.0.2
         bakeIt_: Set to "True" to bake the Horizon angles rose into the Rhino scene.
                  -
                  If not supplied default value "False" will be used.
+        parallel_: Set to "True" to calculate the horizon angles of "_analysisGeometry" points in parallel, using all processor cores. Useful for a large number of points (for example facade panels).
+                   -
+                   If not supplied default value "False" will be used.
         _runIt: ...
     
     output:
@@ -103,11 +114,11 @@ Provided by Gismo 0.0.2
 
 ghenv.Component.Name = "Gismo_Horizon Angles"
 ghenv.Component.NickName = "HorizonAngles"
-ghenv.Component.Message = "VER 0.0.2\nMAR_01_2017"
+ghenv.Component.Message = "VER 0.0.2\nOCT_18_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.2\nMAR_01_2017
+#compatibleGismoVersion = VER 0.0.2\nOCT_18_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -117,12 +128,13 @@ import Grasshopper
 import datetime
 import System
 import Rhino
+import bisect
 import time
 import math
 import os
 
 
-def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometryIndex, workingFolderPath, horizonFileType):
+def checkInputData(analysisGeometry, contextMeshes, horizonMapFilePath, north, scale, outputGeometryIndex, workingFolderPath, horizonFileType):
     
     pathsAnalysisGeometry = analysisGeometry.Paths
     analysisGeometryBranchesLists = analysisGeometry.Branches
@@ -176,21 +188,21 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         if item == None:
             NoneItemsIn_srfCentroidL += 1
     if len(srfCentroidL) == NoneItemsIn_srfCentroidL:
-        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
         validInputData = False
         printMsg = "The value(s) you supplied to the \"_analysisGeometry\" input are neither points nor surfaces.\n" + \
                    "Please input one of these."
-        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
     
     
     # check if something inputted into "context_" input
-    if len(contextMeshes) == 0:
-        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+    if (len(contextMeshes) == 0) and (horizonMapFilePath == None):
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
         validInputData = False
         printMsg = "Input the \"terrainShadingMask\" output from \"Terrain shading mask\" component.\n" + \
                    "You can additionally input other opaque obstacles surrounding your location: houses, buildings etc.\n" + \
                    "Do not input trees, as they are not opaque obstacles and should not be taken into account when analysing the horizon angles."
-        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
     else:
         # remove "None" from context_
         contextMeshesFiltered = []
@@ -203,6 +215,19 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
             contextMeshJoined.Append(filteredContextMesh)
     
     
+    # check "horizonMap_" input
+    if (horizonMapFilePath == None):
+        horizonMapHeader = None
+    elif not os.path.isfile(horizonMapFilePath):
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+        validInputData = False
+        printMsg = "The file path supplied to the \"horizonMap_\" input does not exist.\n" + \
+                   "Input the \"horizonMap\" output from the \"Terrain Generator\" component (with its \"horizonMapSectors_\" input set to a number larger than 0)."
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+    else:
+        horizonMapHeader = gismo_terrain.readHorizonMapHeader(horizonMapFilePath)
+    
+    
     if (north == None):
         northRad = 0  # default, in radians
         northVec = Rhino.Geometry.Vector3d(0,1,0)
@@ -210,10 +235,10 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+                srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
                 validInputData = False
                 printMsg = "Please input north angle value from 0 to 360."
-                return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+                return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -234,12 +259,12 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         workingSubFolderPath = os.path.join(workingFolderPath, "horizon_files")
     folderCreated = gismo_preparation.createFolder(workingSubFolderPath)
     if folderCreated == False:
-        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
         validInputData = False
         printMsg = "workingFolder_ input is invalid.\n" + \
                    "Input the string in the following format (example): C:\someFolder.\n" + \
                    "Or do not input anything, in which case a default Gismo folder will be used instead."
-        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
     
     
     if (horizonFileType == None) or (horizonFileType == 0):  # .hor file with no heading (Meteonorm 6 and Meteonorm 7)
@@ -270,17 +295,17 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         outputGeometryIndex = 0  # default
     else:
         if (outputGeometryIndex + 1) > len(pathsAnalysisGeometry):
-            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
             validInputData = False
             printMsg = "The index number inputted into \"outputGeometryIndex_\" is higher than number of inputted objects into \"_analysisGeometry\". Please choose an input for \"outputGeometryIndex_\" from 0 to %s." % str(len(analysisGeometryBranchesLists)-1)
-            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
         elif srfCentroidL[outputGeometryIndex] == None:
-            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = horizonMapHeader = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
             validInputData = False
             printMsg = "The %s supplied to the \"outputGeometryIndex_\" input, points to the %s. item in the \"_analysisGeometry\" input. This item is neither a surface, nor a point, therefor it's invalid.\n" % (outputGeometryIndex, outputGeometryIndex) + \
                        "Remove that item from your \"_analysisGeometry\" input, or change the value supplied to the \"outputGeometryIndex_\" so that it points to some other valid \"_analysisGeometry\" item."
             outputGeometryIndex  = None  # set bellow the "printMsg" variable, so that it does not confront with it
-            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
     
     
     srfCentroid = srfCentroidL[outputGeometryIndex]
@@ -290,110 +315,229 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
     validInputData = True
     printMsg = "ok"
     
-    return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+    return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+
+
+def contextTriangles(contextMeshJoined, northRad, numOfAzimuthBins):
+    
+    # shared structure of contextMeshJoined for horizon rasterization of any number of origin points
+    verticesX = []; verticesY = []; verticesZ = []
+    for vertex in contextMeshJoined.Vertices:
+        verticesX.append(vertex.X)
+        verticesY.append(vertex.Y)
+        verticesZ.append(vertex.Z)
+    
+    # quad faces are split into two triangles. Edges shared by neighbouring faces are taken only once
+    triangles = []
+    edges = set()
+    for face in contextMeshJoined.Faces:
+        if face.IsQuad:
+            faceTriangles = [(face.A, face.B, face.C), (face.A, face.C, face.D)]
+        else:
+            faceTriangles = [(face.A, face.B, face.C)]
+        for triangle in faceTriangles:
+            triangles.append(triangle)
+            for vertexIndex1, vertexIndex2 in ((triangle[0],triangle[1]), (triangle[1],triangle[2]), (triangle[2],triangle[0])):
+                if vertexIndex1 < vertexIndex2:
+                    edges.add((vertexIndex1, vertexIndex2))
+                elif vertexIndex1 > vertexIndex2:
+                    edges.add((vertexIndex2, vertexIndex1))
+    
+    # edges and triangles sorted from the highest to the lowest. Those entirely below the origin can not raise its horizon, so they are skipped in "rasterizeHorizon" function
+    edges = sorted(edges, key=lambda edge: -max(verticesZ[edge[0]], verticesZ[edge[1]]))
+    edgesNegativeMaxZ = [-max(verticesZ[vertexIndex1], verticesZ[vertexIndex2]) for vertexIndex1, vertexIndex2 in edges]
+    triangles.sort(key=lambda triangle: -max(verticesZ[triangle[0]], verticesZ[triangle[1]], verticesZ[triangle[2]]))
+    trianglesNegativeMaxZ = [-max(verticesZ[vertexIndex1], verticesZ[vertexIndex2], verticesZ[vertexIndex3]) for vertexIndex1, vertexIndex2, vertexIndex3 in triangles]
+    
+    # azimuth bins (starting at north, clockwise) as directions in Rhino scene, rotated due to north angle position
+    binAngleR = 2*math.pi / numOfAzimuthBins
+    binSines = [math.sin(k*binAngleR - northRad) for k in xrange(numOfAzimuthBins)]
+    binCosines = [math.cos(k*binAngleR - northRad) for k in xrange(numOfAzimuthBins)]
+    
+    return [verticesX, verticesY, verticesZ, edges, edgesNegativeMaxZ, triangles, trianglesNegativeMaxZ, binSines, binCosines]
+
+
+def rasterizeHorizon(contextTrianglesData, origin, northRad):
+    
+    # max-rasterize the context triangles into a horizon buffer of numOfAzimuthBins azimuths (starting at north, clockwise). Each buffer value is the largest tangent of the horizon angle
+    # the vertical half-plane of an azimuth cuts a triangle in a line segment, and the highest point (tangent) of a line segment is always at one of its ends. These lie on the triangle edges, so only the edges need to be projected
+    verticesX, verticesY, verticesZ, edges, edgesNegativeMaxZ, triangles, trianglesNegativeMaxZ, binSines, binCosines = contextTrianglesData
+    numOfAzimuthBins = len(binSines)
+    binAngleR = 2*math.pi / numOfAzimuthBins
+    horizonTangents = [0.0] * numOfAzimuthBins
+    
+    # triangle above the origin covers all azimuths
+    for triangleIndex in xrange(bisect.bisect_left(trianglesNegativeMaxZ, -origin.Z)):
+        vertexIndex1, vertexIndex2, vertexIndex3 = triangles[triangleIndex]
+        x1 = verticesX[vertexIndex1] - origin.X; y1 = verticesY[vertexIndex1] - origin.Y
+        x2 = verticesX[vertexIndex2] - origin.X; y2 = verticesY[vertexIndex2] - origin.Y
+        x3 = verticesX[vertexIndex3] - origin.X; y3 = verticesY[vertexIndex3] - origin.Y
+        area1 = x2*y3 - y2*x3
+        area2 = x3*y1 - y3*x1
+        area3 = x1*y2 - y1*x2
+        areaSum = area1 + area2 + area3
+        if (areaSum != 0) and (((area1 >= 0) and (area2 >= 0) and (area3 >= 0)) or ((area1 <= 0) and (area2 <= 0) and (area3 <= 0))):
+            originZ = (area1*verticesZ[vertexIndex1] + area2*verticesZ[vertexIndex2] + area3*verticesZ[vertexIndex3]) / areaSum
+            if originZ > origin.Z:
+                return [float("inf")] * numOfAzimuthBins
+    
+    for edgeIndex in xrange(bisect.bisect_left(edgesNegativeMaxZ, -origin.Z)):
+        vertexIndex1, vertexIndex2 = edges[edgeIndex]
+        x1 = verticesX[vertexIndex1] - origin.X; y1 = verticesY[vertexIndex1] - origin.Y; z1 = verticesZ[vertexIndex1] - origin.Z
+        x2 = verticesX[vertexIndex2] - origin.X; y2 = verticesY[vertexIndex2] - origin.Y; z2 = verticesZ[vertexIndex2] - origin.Z
+        azimuth1R = math.atan2(x1, y1) + northRad
+        azimuthSpanR = math.atan2(x2, y2) + northRad - azimuth1R
+        if azimuthSpanR > math.pi:
+            azimuthSpanR -= 2*math.pi
+        elif azimuthSpanR < -math.pi:
+            azimuthSpanR += 2*math.pi
+        if azimuthSpanR < 0:
+            # edge always goes clockwise
+            x1, y1, z1, x2, y2, z2 = x2, y2, z2, x1, y1, z1
+            azimuth1R = azimuth1R + azimuthSpanR
+            azimuthSpanR = -azimuthSpanR
+        if azimuthSpanR > math.pi - 1e-9:
+            # edge goes through the origin: its triangles have been checked above
+            continue
+        
+        edgeX = x2 - x1; edgeY = y2 - y1; edgeZ = z2 - z1
+        firstBin = int(math.ceil(azimuth1R/binAngleR - 1e-9))
+        lastBin = int(math.floor((azimuth1R + azimuthSpanR)/binAngleR + 1e-9))
+        for k in xrange(firstBin, lastBin+1):
+            k = k % numOfAzimuthBins
+            directionX = binSines[k]
+            directionY = binCosines[k]
+            denominator = directionX*edgeY - directionY*edgeX
+            if denominator == 0:
+                # edge lies on the azimuth half-plane
+                ends = (0, 1)
+            else:
+                t = (x1*directionY - y1*directionX) / denominator
+                ends = (min(max(t, 0), 1),)
+            for t in ends:
+                x = x1 + t*edgeX
+                y = y1 + t*edgeY
+                distance = math.sqrt(x*x + y*y)
+                if distance > 0:
+                    tangent = (z1 + t*edgeZ) / distance
+                    if tangent > horizonTangents[k]:
+                        horizonTangents[k] = tangent
+    
+    return horizonTangents
+
+
+def horizonAnglesRosePts(originLifted, northRad, unitConversionFactor):
+    
+    # pairs of originLifted and horizon circle points for azimuths 0,1,2,3... 358,359: starting at +Y axis, clockwise, rotated due to north angle position
+    skyDomeRadius = 200 / unitConversionFactor  # in meters
+    horizonAnglesRoseMeshPts = []
+    for azimuthD in xrange(360):
+        horizonPt = Rhino.Geometry.Point3d(originLifted.X, originLifted.Y + skyDomeRadius, originLifted.Z)
+        horizonPt.Transform(Rhino.Geometry.Transform.Rotation(-math.radians(azimuthD), Rhino.Geometry.Vector3d(0,0,1), originLifted))
+        horizonPt.Transform(Rhino.Geometry.Transform.Rotation(northRad, Rhino.Geometry.Vector3d(0,0,1), originLifted))
+        horizonAnglesRoseMeshPts.append(originLifted)
+        horizonAnglesRoseMeshPts.append(horizonPt)
+    
+    return horizonAnglesRoseMeshPts
 
 
-def calculateHorizonAngles(contextMeshJoined, origin, northRad, unitConversionFactor):
+def calculateHorizonAngles(contextTrianglesData, origin, northRad, unitConversionFactor):
     
     originLifted = Rhino.Geometry.Point3d(origin.X, origin.Y, origin.Z + 0.01)  # fix for rays intersection, if user inputted a ground surface to "_contex" input
     
-    # create skyDome
-    skyDomeRadius = 200 / unitConversionFactor  # in meters
-    skyDomeSphere = Rhino.Geometry.Sphere(originLifted, skyDomeRadius)
-    skyDomeSrf = skyDomeSphere.ToBrep().Faces[0]
-    
-    # small number of rays (for example: precisionU = 30, precisionV = 10) can result in rays missing the contextMeshJoined, thererfor the shadingMaskSrf will not be created
-    precisionU = 3600  # rays shot per 0.1 degrees (10th of a degree)
-    precisionV = 1200  # rays shot per 0.075 degrees - more denser than precisionU
-    #precisionU = 140
-    #precisionV = 40
-    
-    halvedSkyDomeSrf = skyDomeSrf.Trim(Rhino.Geometry.Interval(skyDomeSrf.Domain(0)[0], skyDomeSrf.Domain(0)[1]), Rhino.Geometry.Interval(0, skyDomeSrf.Domain(1)[1])) # split the skyDome sphere in half
-    halvedSkyDomeSrf.SetDomain(1, Rhino.Geometry.Interval(0, halvedSkyDomeSrf.Domain(1)[1]))  # shrink the halvedSkyDomeSrf V start domain
-    
-    clockwise = True
-    if clockwise == True:
-        # reverse the U domain (from counter-clockwise to clockwise)
-        uStart,uEnd = halvedSkyDomeSrf.Domain(0)
-        interval0 = Rhino.Geometry.Interval(-uEnd, -uStart)
-        halvedSkyDomeSrf.SetDomain(0,interval0)
-        halvedSkyDomeSrf = halvedSkyDomeSrf.Reverse(0)
-    else:
-        pass
+    precisionV = 1200  # horizon angles are snapped down to 0.075 degrees steps of altitude
+    
+    horizonTangents = rasterizeHorizon(contextTrianglesData, originLifted, northRad)
+    
     
-    # rotate the halvedSkyDomeSrf by 90 degrees so that it starts at 0 degrees (+Y axis)
-    transformMatrixRotate1 = Rhino.Geometry.Transform.Rotation(math.radians(90), Rhino.Geometry.Vector3d(0,0,1), originLifted)
-    halvedSkyDomeSrf.Transform(transformMatrixRotate1)
+    # calculate the horizonAngles from horizonTangents:
+    stepVD = 90.0 / precisionV
+    azimuthsD = []  # depends on precisionU (in "main" function) and precisionV
+    horizonAnglesD = []
+    horizonAnglesD_for_colors = []  # made of horizonAnglesD duplicates to account for the origin point of the horizonAnglesRoseMeshPts
+    for azimuth,horizonTangent in enumerate(horizonTangents):
+        altitudeSteps = min(int(math.floor(math.degrees(math.atan(horizonTangent)) / stepVD + 1e-9)), precisionV - 1)
+        tangent_horizonAngleR = math.tan(math.radians(altitudeSteps * stepVD))
+        if tangent_horizonAngleR < 0.001:  # fix if horizonAngle = 0
+            tangent_horizonAngleR = 0
+        horizonAngleR = math.atan(tangent_horizonAngleR)
+        horizonAngleD = math.degrees(horizonAngleR)  # .hor files have integer values for horizon angles
+        
+        horizonAnglesD.append(int(horizonAngleD))
+        azimuthsD.append(azimuth)  # azimuths 0,1,2,3... 358,359
+        
+        horizonAnglesD_for_colors.append(horizonAngleD)
+        horizonAnglesD_for_colors.append(horizonAngleD)
+    
+    horizonAnglesRoseMeshPts = horizonAnglesRosePts(originLifted, northRad, unitConversionFactor)
     
-    # rotation due to north angle position
-    #transformMatrixRotate2 = Rhino.Geometry.Transform.Rotation(-northRad, Rhino.Geometry.Vector3d(0,0,1), originLifted)  # counter-clockwise
-    transformMatrixRotate2 = Rhino.Geometry.Transform.Rotation(northRad, Rhino.Geometry.Vector3d(0,0,1), originLifted)  # clockwise
-    halvedSkyDomeSrf.Transform(transformMatrixRotate2)
     
-    skyDomeDomainUmin, skyDomeDomainUmax = halvedSkyDomeSrf.Domain(0)
-    skyDomeDomainVmin, skyDomeDomainVmax = halvedSkyDomeSrf.Domain(1)
-    stepU = (skyDomeDomainUmax - skyDomeDomainUmin)/precisionU
-    stepV = (skyDomeDomainVmax - skyDomeDomainVmin)/precisionV
+    # possible future creation of contextShadingMask (more precisely contextShadingMaskUnscaledUnrotated), the same as from "Terrain shading mask" component by its code starting from "    if maskStyle == 0:  # spherical terrain shading mask" (line ?)
+    contextShadingMaskUnscaledUnrotated = None
     
+    return azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated
+
+
+def horizonAnglesFromMap(horizonMapFilePath, horizonMapHeader, origin, northRad, unitConversionFactor):
     
-    # check for intersection between the contextMeshJoined and rays
-    horizonAnglesRoseMeshPts = []
-    lastRowPoints = []
-    
-    hitted = False  # initial switch
-    for i in xrange(0,precisionU):
-        u = skyDomeDomainUmin + stepU*i
-        if (i % 10 == 0):
-            horizonAnglesRoseMeshPts.append(originLifted)
-            firstRowPt = halvedSkyDomeSrf.PointAt(u,0)
-            horizonAnglesRoseMeshPts.append(firstRowPt)
-        for k in xrange(0,precisionV):
-            v = skyDomeDomainVmin + stepV*k
-            skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
-            rayVector = skyDomePt-originLifted
-            ray = Rhino.Geometry.Ray3d(originLifted, rayVector)
-            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(contextMeshJoined,ray)
-            if rayIntersectParam >= 0:
-                # ray hitted something in that column
-                hitted = True
-                lastRowPt = skyDomePt
-                continue
-            else:
-                # ray did not hit anything in that column
-                pass
-        if hitted == False:
-            lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
-        lastRowPoints.append(lastRowPt)
-        hitted = False  # reset the hitted switch
+    # read the horizon angles of the origin's terrain grid cell from the horizon map created by "Terrain Generator" component. Returns the same data as "calculateHorizonAngles" function
+    originLifted = Rhino.Geometry.Point3d(origin.X, origin.Y, origin.Z + 0.01)
     
+    # origin's position in the terrain grid: undo the "Terrain Generator" moving and rotation, then convert to meters
+    terrainOrigin = Rhino.Geometry.Point3d(horizonMapHeader["origin"][0], horizonMapHeader["origin"][1], horizonMapHeader["origin"][2])
+    originUnrotated = Rhino.Geometry.Point3d(origin)
+    originUnrotated.Transform(Rhino.Geometry.Transform.Rotation(-horizonMapHeader["northRad"], Rhino.Geometry.Vector3d(0,0,1), terrainOrigin))
+    originColumn = horizonMapHeader["locationColumn"] + (originUnrotated.X - terrainOrigin.X) * horizonMapHeader["unitConversionFactor"] / horizonMapHeader["cellsizeM"]
+    originRow = horizonMapHeader["locationRow"] - (originUnrotated.Y - terrainOrigin.Y) * horizonMapHeader["unitConversionFactor"] / horizonMapHeader["cellsizeM"]
     
-    # calculate the horizonAngles from lastRowPoints:
-    azimuthsD = []  # depends on precisionU and precisionV
+    sectorsHorizonAnglesD = gismo_terrain.horizonMapProfile(horizonMapFilePath, horizonMapHeader, originColumn, originRow)
+    numOfSectors = len(sectorsHorizonAnglesD)
+    
+    # horizon angles for azimuths 0,1,2,3... 358,359 are taken from the nearest horizon map sector
+    azimuthsD = []
     horizonAnglesD = []
     horizonAnglesD_for_colors = []  # made of horizonAnglesD duplicates to account for the origin point of the horizonAnglesRoseMeshPts
-    for azimuth,lastRowPt in enumerate(lastRowPoints):
-        if (azimuth % 10 == 0):  # only take azimuths 0,10,20,30... 3580,3590
-            projectedLastRowPt = Rhino.Geometry.Point3d(lastRowPt.X, lastRowPt.Y, originLifted.Z)
-            tangent_horizonAngleR = (lastRowPt.Z - originLifted.Z)/originLifted.DistanceTo(projectedLastRowPt)
-            if tangent_horizonAngleR < 0.001:  # fix if horizonAngle = 0
-                tangent_horizonAngleR = 0
-            horizonAngleR = math.atan(tangent_horizonAngleR)
-            horizonAngleD = math.degrees(horizonAngleR)  # .hor files have integer values for horizon angles
-            
-            horizonAnglesD.append(int(horizonAngleD))
-            azimuthsD.append(int(azimuth/10))  # convert the azimuths from 0,10,20,30... 3580,3590 to 0,1,2,3... 358,359
-            
-            horizonAnglesD_for_colors.append(horizonAngleD)
-            horizonAnglesD_for_colors.append(horizonAngleD)
+    for azimuthD in xrange(360):
+        sectorIndex = int(round(azimuthD * numOfSectors / 360.0)) % numOfSectors
+        tangent_horizonAngleR = math.tan(math.radians(sectorsHorizonAnglesD[sectorIndex]))
+        if tangent_horizonAngleR < 0.001:  # fix if horizonAngle = 0
+            tangent_horizonAngleR = 0
+        horizonAngleD = math.degrees(math.atan(tangent_horizonAngleR))
+        
+        horizonAnglesD.append(int(horizonAngleD))  # .hor files have integer values for horizon angles
+        azimuthsD.append(azimuthD)
+        
+        horizonAnglesD_for_colors.append(horizonAngleD)
+        horizonAnglesD_for_colors.append(horizonAngleD)
     
+    horizonAnglesRoseMeshPts = horizonAnglesRosePts(originLifted, northRad, unitConversionFactor)
     
-    # possible future creation of contextShadingMask (more precisely contextShadingMaskUnscaledUnrotated), the same as from "Terrain shading mask" component by its code starting from "    if maskStyle == 0:  # spherical terrain shading mask" (line ?)
     contextShadingMaskUnscaledUnrotated = None
     
     return azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated
 
 
-def main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitConversionFactor):
+def main(contextMeshJoined, horizonMapFilePath, horizonMapHeader, srfCentroidL, northRad, outputGeometryIndex, unitConversionFactor, parallel):
+    
+    # horizon angles of all points. The contextMeshJoined structure is created only once and shared by all of them
+    if (horizonMapHeader == None):
+        precisionU = 360  # horizon buffer per 1 degree of azimuth: azimuths 0,1,2,3... 358,359 written to .hor files
+        contextTrianglesData = contextTriangles(contextMeshJoined, northRad, precisionU)
+    
+    horizonAnglesResults = [None] * len(srfCentroidL)
+    def horizonAnglesOfPoint(index):
+        srfCentroid = srfCentroidL[index]
+        if srfCentroid != None:  # the inputted _analysisGeometry is not a point nor a single faced brep
+            if (horizonMapHeader != None):
+                horizonAnglesResults[index] = horizonAnglesFromMap(horizonMapFilePath, horizonMapHeader, srfCentroid, northRad, unitConversionFactor)
+            else:
+                horizonAnglesResults[index] = calculateHorizonAngles(contextTrianglesData, srfCentroid, northRad, unitConversionFactor)
+    
+    if parallel:
+        System.Threading.Tasks.Parallel.ForEach(xrange(len(srfCentroidL)), horizonAnglesOfPoint)
+    else:
+        for index in xrange(len(srfCentroidL)):
+            horizonAnglesOfPoint(index)
     
     azimuthsD_dataTree = Grasshopper.DataTree[object]()
     horizonAnglesD_dataTree = Grasshopper.DataTree[object]()
@@ -403,7 +547,7 @@ def main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitCon
     paths = _analysisGeometry.Paths
     for index,srfCentroid in enumerate(srfCentroidL):
         if srfCentroid != None:  # the inputted _analysisGeometry is not a point nor a single faced brep
-            azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts_notPicked, horizonAnglesD_for_colors_notPicked, contextShadingMaskUnscaledUnrotated_notPicked = calculateHorizonAngles(contextMeshJoined, srfCentroid, northRad, unitConversionFactor)
+            azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts_notPicked, horizonAnglesD_for_colors_notPicked, contextShadingMaskUnscaledUnrotated_notPicked = horizonAnglesResults[index]
             
            # maximualHorizonAngle, maximalAzimuth
             maximalHorizonAngle_maximalAzimuth = []
@@ -611,13 +755,14 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_mainComponent = sc.sticky["gismo_mainComponent"]()
         gismo_preparation = sc.sticky["gismo_Preparation"]()
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
         
         locationName, locationLatitudeD, locationLongitudeD, timeZone, elevation, validLocationData, printMsg = gismo_preparation.checkLocationData(_location)
         if validLocationData:
-            srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg = checkInputData(_analysisGeometry, _context, north_, scale_, outputGeometryIndex_, workingFolder_, horizonFileType_)
+            srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, horizonMapHeader, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg = checkInputData(_analysisGeometry, _context, horizonMap_, north_, scale_, outputGeometryIndex_, workingFolder_, horizonFileType_)
             if validInputData:
                 if _runIt:
-                    azimuthsD, horizonAnglesD, azimuthsD_for_horizonFile, horizonAnglesD_for_horizonFile, maximalAzimuthD, maximalHorizonAngleD, maximalAzimuthD_for_title, maximalHorizonAngleD_for_title, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated = main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitConversionFactor)
+                    azimuthsD, horizonAnglesD, azimuthsD_for_horizonFile, horizonAnglesD_for_horizonFile, maximalAzimuthD, maximalHorizonAngleD, maximalAzimuthD_for_title, maximalHorizonAngleD_for_title, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated = main(contextMeshJoined, horizonMap_, horizonMapHeader, srfCentroidL, northRad, outputGeometryIndex, unitConversionFactor, parallel_)
                     horizonAnglesRoseMeshUnscaledUnrotated, compassCrvsUnscaledUnrotated, titleDescriptionLabelMeshesUnscaledUnrotated, legendUnscaledUnrotated, legendBasePtUnscaledUnrotated = compassCrvs_legend(srfCentroid, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, maximalAzimuthD_for_title, maximalHorizonAngleD_for_title, unitConversionFactor, legendBakePar_)
                     contextShadingMask, horizonAnglesRoseMesh, compassCrvs, legend, legendPlane, titleDescriptionLabelMeshes = scalingRotating(northRad, scale, srfCentroid, contextShadingMaskUnscaledUnrotated, horizonAnglesRoseMeshUnscaledUnrotated, compassCrvsUnscaledUnrotated, legendUnscaledUnrotated, legendBasePtUnscaledUnrotated, titleDescriptionLabelMeshesUnscaledUnrotated)
                     if exportHorizon_: createHorFile(locationLatitudeD, locationLongitudeD, locationName, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, azimuthsD_for_horizonFile, horizonAnglesD_for_horizonFile)
@@ -28,6 +28,14 @@ Use this component to perform the following terrain analysis types:
 - SRF (Surface Roughness Factor by Hobson)
 - TPI (Topographic Position Index)
 - Mean curvature
+- Cumulative visibility
+- TPI for custom neighbourhoods
+- Landforms (TPI based landform classification by Weiss)
+- Profile curvature
+- Plan curvature
+- Gaussian curvature
+- Hillshade hours
+- Cast shadows
 ------
 Component mainly based on:
 
@@ -36,17 +44,20 @@ Component mainly based on:
 "How to calculate Topographic Ruggedness Index in ArcGIS Desktop" article from gis.stackexchange.com
 "Terrain Roughness – 13 Ways" article from gis4geomorphology.com
 TopoToolbox "roughness" function by Wolfgang Schwanghart
+"Quantitative analysis of land surface topography" article by Lyle W. Zevenbergen and Colin R. Thorne
+"Topographic Position and Landforms Analysis" poster by Andrew Weiss
 -
 http://www.jennessent.com/downloads/DEM%20Surface%20Tools%20for%20ArcGIS_A4.pdf
 http://edndoc.esri.com/arcobjects/9.2/net/shared/geoprocessing/spatial_analyst_tools/how_hillshade_works.htm
 http://gis.stackexchange.com/a/6059/65002
 http://gis4geomorphology.com/roughness-topographic-position
 https://github.com/wschwanghart/topotoolbox/blob/master/@GRIDobj/roughness.m
+http://www.jennessent.com/downloads/tpi-poster-tnc_18x22.pdf
 -
 Provided by Gismo 0.0.2
     
     input:
-        _analysisType: Choose one of the terrain analysis types:
+        _analysisType: Choose one or more of the terrain analysis types:
                        0 - Slope
                        1 - Grade
                        2 - Aspect
@@ -58,13 +69,22 @@ Provided by Gismo 0.0.2
                        8 - SRF (Surface Roughness Factor by Hobson)
                        9 - TPI (Topographic Position Index)
                        10 - Mean curvature
-        _terrain: A terrain surface or polysurface.
+                       11 - Cumulative visibility
+                       12 - TPI for custom neighbourhoods (Topographic Position Index for "TPIradii_" input)
+                       13 - Landforms (TPI based landform classification by Weiss)
+                       14 - Profile curvature
+                       15 - Plan curvature
+                       16 - Gaussian curvature
+                       17 - Hillshade hours (number of "sunVector_" vectors for which the Hillshade is above "hillshadeThreshold_")
+                       18 - Cast shadows (1 for lit and 0 for shadowed terrain, or number of "sunVector_" vectors for which the terrain is lit)
+                       -
+                       If more than one analysis type is supplied, all of them are calculated in a single pass: the terrain mesh, its normals, the grid of heights and TRI, SRF, TPI windows are generated only once and shared by all analysis types. Then "analysedTerrain", "title", "legend" and "legendPlane" outputs will have one item for each analysis type, and "values" output one branch for each analysis type, in the same order as supplied to this input.
+        _terrain: A terrain surface, polysurface or mesh.
                   Add it by supplying the "terrain" output from the Ladybug "Terrain Generator" or Gismo "Terrain Generator" components.
                   -
-                  It needs to be a surface. So set the:
-                  "type_" input of the Ladybug "Terrain Generator" component to "1"
-                  or
-                  "type_" input of the Gismo "Terrain Generator" component to "2" or "3"
+                  Mesh terrains (for example from Gismo "Terrain Generator" component with "type_" input set to 0, 1, 4 or 5, or from photogrammetry) are analysed directly from their vertices and faces, without being converted to a surface. Vertex normals, slope, aspect, curvature and TRI, SRF, TPI windows (vertex and its neighbouring vertices) are calculated from the mesh itself. The "analysedTerrain" mesh vertices are the _terrain mesh vertices.
+                  -
+                  Slope, Grade, Aspect, Visibility, Hillshade, curvatures and cast shadows (_analysisType = 0,1,2,4,5,10,14,15,16,18) of a terrain surface created from a regular grid of heights (like the ones from "Terrain Generator" components) are calculated much faster, directly from that grid. Cast shadows (_analysisType = 18) are then calculated by sweeping the grid of heights along the sun direction, once for each sun vector. Curvatures are then calculated from a quadratic surface fitted to each 3x3 grid points window. In that case the "analysedTerrain" mesh vertices are the grid points. This is not done if "context_" input is supplied.
         _origin: An origin (point on a "_terrain") of the upper "_terrain" input.
                  Add it by suppling the "origin" output from the Ladybug "Terrain Generator" component.
                  or
@@ -83,16 +103,55 @@ Provided by Gismo 0.0.2
         north_: Input a vector to be used as a true North direction, or a number between 0 and 360 that represents the clockwise degrees off from the Y-axis.
                 -
                 If not supplied, default North direction will be set to the Y-axis (0 degrees).
-        sunVector_: Illuminance source direction.
-                    This input is only used for _analysisType = 5 (Hillshade).
+        sunVector_: Illuminance source direction, or a list of them (for example "sunVectors" output from the Ladybug "SunPath" component, for each hour of the year).
+                    If more than one vector is supplied, the "values" output of _analysisType = 5 will be the mean Hillshade of all of them. Slope and aspect are calculated only once, and Hillshade for each vector is then a single multiplication per terrain vertex.
+                    -
+                    For _analysisType = 18 (Cast shadows) each vector is the direction of the sun rays, from the sun towards the terrain. Vectors pointing upwards (sun below the horizon) shadow the whole terrain.
+                    -
+                    This input is only used for _analysisType = 5 (Hillshade), 17 (Hillshade hours) and 18 (Cast shadows).
                     -
                     If not supplied, default sunVector of (0, 2.37126, -2.37126) will be used (an Y+ vector angled at 45 degrees downwards).
         hypsoStrength_: Hypsometric strength - a factor which determines shading factor's intensity due to elevation differences of terrain vertices.
                         It ranges from 0 to 100.
                         -
-                        This input is only used for _analysisType = 5 (Hillshade).
+                        This input is only used for _analysisType = 5 (Hillshade) and 17 (Hillshade hours).
                         -
                         If not supplied, default hypsoStrength of 50 will be used.
+        hillshadeThreshold_: Hillshade value above which a terrain vertex is counted as lit, for _analysisType = 17 (Hillshade hours).
+                             It ranges from 0 to 255.
+                             -
+                             If not supplied, default hillshadeThreshold of 127.5 (half of the maximal Hillshade) will be used.
+        hillshadeFile_: Optional file path to which Hillshade of each terrain vertex for each of the "sunVector_" vectors will be written, as comma separated values: one line for each "analysedTerrain" vertex, with one value for each sun vector.
+                        For example: "C:\gismo\hillshades.csv".
+                        -
+                        This input is only used for _analysisType = 5 and 17, when more than one vector is supplied to the "sunVector_" input or _analysisType = 17 is chosen.
+        observers_: Points from which the terrain is viewed. For example viewpoints for a landscape impact report.
+                    Each point is projected to the terrain, and then lifted for its observer height (see "observerHeights_" input below).
+                    -
+                    This input is only used, and required, for _analysisType = 11 (Cumulative visibility).
+        observerHeights_: Heights of each observer from "observers_" input, above the terrain. A single value will be used for all observers.
+                          -
+                          This input is only used for _analysisType = 11 (Cumulative visibility).
+                          -
+                          If not supplied, default observer height of 1.6 meters (5.25 feet) will be used (average height of the human eyesight).
+                          -
+                          In meters.
+        TPIradii_: Inner and outer radius of the neighbourhood around each terrain point, for which its TPI (Topographic Position Index) is calculated: the difference between the terrain point elevation and the mean elevation of its neighbourhood.
+                   Supply two values (inner and outer radius of a small neighbourhood), or four values (inner and outer radius of a small, and then of a large neighbourhood).
+                   Small neighbourhood shows local features (small hills, gullies), large neighbourhood the regional ones (ridges, valleys).
+                   -
+                   This input is only used for _analysisType = 12 (small neighbourhood only) and 13 (both neighbourhoods).
+                   -
+                   If not supplied, default small neighbourhood outer radius of 3 and large neighbourhood outer radius of 10 grid cells, with inner radii of 0, will be used.
+                   -
+                   In meters.
+        TPIwindow_: Shape of the "TPIradii_" neighbourhoods:
+                    0 - circular (annulus between the inner and outer radius)
+                    1 - rectangular (outer square without the inner square, with half sizes of the inner and outer radius)
+                    -
+                    This input is only used for _analysisType = 12 and 13.
+                    -
+                    If not supplied, 0 (circular) will be used.
         refine_: Refines the "analysedTerrain" output's mesh to finer resolution (halves the Maximum edge length of the "analysedTerrain" mesh).
                  -
                  Final "analysedTerrain" output is created with a certain mesh resolution.
@@ -100,6 +159,8 @@ Provided by Gismo 0.0.2
                  Be cautious !!! Due to "analysedTerrain" mesh increased number of vertices-faces, setting refine_ to True, can result in much longer component runtime !!!
                  Still if your PC configuration is strong enough, you can always set this input to "True". Except for the _analysisType = 7 (TRI categories). In that case the refine_ input will not make any effect on the final "analysedTerrain" mesh.
                  -
+                 This input has no effect on mesh terrains.
+                 -
                  If not supplied, the refine_ input will be set to False by default.
         legendBakePar_: Optional legend parameters from the Gismo "Legend Bake Parameters" component.
         bakeIt_: Set to "True" to bake the terrain analysis geometry into the Rhino scene.
@@ -119,15 +180,21 @@ Provided by Gismo 0.0.2
         legendPlane: Legend starting plane, which can be used to move the "legend" geometry with grasshopper's "Move" component.
                      -
                      Connect this output to a Grasshopper's "Plane" parameter in order to preview the "legendPlane" plane in the Rhino scene.
+        nearestVisibleDistance: Distance from each "analysedTerrain" vertex to the nearest observer (from "observers_" input) which can see it.
+                                If vertex can not be seen from any observer (these are gray colored areas), then the distance will be: 0.
+                                -
+                                Only for _analysisType = 11 (Cumulative visibility). If more than one analysis type is supplied, the distances are in the branch of the Cumulative visibility analysis type, the same as its "values" output branch.
+                                -
+                                In Rhino document units.
 """
 
 ghenv.Component.Name = "Gismo_Terrain Analysis"
 ghenv.Component.NickName = "TerrainAnalysis"
-ghenv.Component.Message = "VER 0.0.2\nAPR_28_2017"
+ghenv.Component.Message = "VER 0.0.2\nOCT_18_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.2\nMAR_01_2017
+#compatibleGismoVersion = VER 0.0.2\nOCT_18_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -140,16 +207,17 @@ import Rhino
 import time
 import math
 import gc
+import os
 
 
-def checkInputData(analysisType, terrainId, originPt, originPtElevation, north, sunVector, hypsometricStrength, refine):
+def checkInputData(analysisType, terrainId, originPt, originPtElevation, north, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, observers, observerHeights, TPIradii, TPIwindow, refine):
     
     # check inputs
-    if (analysisType == None) or ((analysisType  < 0) or (analysisType  > 10)):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+    if (analysisType == None) or ((analysisType  < 0) or (analysisType  > 18)):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
-        printMsg = "Please supply a number from 0 to 10 to the \"_analysisGeometry\" input based on the analysis you would like to perform."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        printMsg = "Please supply a number from 0 to 18 to the \"_analysisGeometry\" input based on the analysis you would like to perform."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     if (analysisType == 0):
         analysisTypeLabel = "Slope"
     elif (analysisType == 1):
@@ -172,45 +240,55 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
         analysisTypeLabel = "Topographic Position Index"
     elif (analysisType == 10):
         analysisTypeLabel = "Mean curvature"
+    elif (analysisType == 11):
+        analysisTypeLabel = "Cumulative visibility"
+    elif (analysisType == 12):
+        analysisTypeLabel = "Topographic Position Index for custom neighbourhoods"
+    elif (analysisType == 13):
+        analysisTypeLabel = "Landforms"
+    elif (analysisType == 14):
+        analysisTypeLabel = "Profile curvature"
+    elif (analysisType == 15):
+        analysisTypeLabel = "Plan curvature"
+    elif (analysisType == 16):
+        analysisTypeLabel = "Gaussian curvature"
+    elif (analysisType == 17):
+        analysisTypeLabel = "Hillshade hours"
+    elif (analysisType == 18):
+        analysisTypeLabel = "Cast shadows"
     
     
     if (terrainId == None):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
-        printMsg = "Please supply the \"terrain\" output data from the Gismo \"Terrain Generator\" component, to this component's \"_terrain\" input.\n" + \
-                   "It needs to be a surface/polysurface: set the:\n" + \
-                   "\"type_\" input of the Ladybug \"Terrain Generator\" component to \"1\", or\n" + \
-                   "\"type_\" input of the Gismo \"Terrain Generator\" component to \"2\" or \"3\"."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        printMsg = "Please supply the \"terrain\" output data from the Gismo \"Terrain Generator\" component, to this component's \"_terrain\" input."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     else:
         terrainObj = rs.coercegeometry(terrainId)
-        if isinstance(terrainObj, Rhino.Geometry.Brep):
+        if isinstance(terrainObj, Rhino.Geometry.Brep) or isinstance(terrainObj, Rhino.Geometry.Mesh):
             # ok
             pass
         else:
-            #isinstance(terrainObj, Rhino.Geometry.Mesh) or any other geometry type
-            analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+            # any other geometry type
+            analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
             validInputData = False
-            printMsg = "The data you supplied to the \"_terrain\" input is not a surface nor a polysurface.\n" + \
-                       "Please supply the \"terrain\" output data from the Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_terrain\" input.\n" + \
-                       "It needs to be a surface/polysurface: set the:\n" + \
-                       "\"type_\" input of the Ladybug \"Terrain Generator\" component to \"1\", or\n" + \
-                       "\"type_\" input of the Gismo \"Terrain Generator\" component to \"2\" or \"3\"."
-            return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+            printMsg = "The data you supplied to the \"_terrain\" input is not a surface, polysurface nor a mesh.\n" + \
+                       "Please supply the \"terrain\" output data from the Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_terrain\" input."
+            return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     
     
     if (originPt == None):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
         printMsg = "Please supply the \"origin\" output data from Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_origin\" input.."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     
     
     if (originPtElevation == None):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
         printMsg = "Please supply the \"elevation\" output data from Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_elevation\" input.."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     
     
     if (north == None):
@@ -220,10 +298,10 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+                analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
                 validInputData = False
                 printMsg = "Please input north_ angle value from 0 to 360."
-                return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+                return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -233,20 +311,86 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
     if northD == 360: northD = 0
     
     
-    if (sunVector == None):
-        sunVector = Rhino.Geometry.Vector3d(0, 2.37126, -2.37126)  # default (towards +Y, angled by 45 degrees towards -Z)
+    sunVectors = [sunVector  for sunVector in sunVectors  if sunVector != None]
+    if (len(sunVectors) == 0):
+        sunVectors = [Rhino.Geometry.Vector3d(0, 2.37126, -2.37126)]  # default (towards +Y, angled by 45 degrees towards -Z)
     # check if sunVector is parallel to Z + or - axis (then it's invalid). If it is, angle it (set the Y coordinate to 0.01)
     Zaxis = Rhino.Geometry.Vector3d(0,0,-1)
-    if sunVector.IsParallelTo(Zaxis):
-        sunVector = Rhino.Geometry.Vector3d(sunVector.X, 0.01, sunVector.Z)
+    for index, sunVector in enumerate(sunVectors):
+        if sunVector.IsParallelTo(Zaxis):
+            sunVectors[index] = Rhino.Geometry.Vector3d(sunVector.X, 0.01, sunVector.Z)
     
     
     if (hypsometricStrength == None):
         hypsometricStrength = 50  # default
     
+    if (hillshadeThreshold == None):
+        hillshadeThreshold = 127.5  # default
+    elif (hillshadeThreshold < 0) or (hillshadeThreshold > 255):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "Please input hillshadeThreshold_ value from 0 to 255."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
+    if (hillshadeFilePath != None) and not os.path.isdir(os.path.dirname(os.path.abspath(hillshadeFilePath))):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "The folder of the file path you supplied to the \"hillshadeFile_\" input does not exist.\n" + \
+                   "Please supply a file path in an existing folder."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
     if (refine == None):
         refine = False  # default
     
+    
+    observerPts = [observer  for observer in observers  if observer != None]
+    if (analysisType == 11) and (len(observerPts) == 0):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "Please supply at least one point to the \"observers_\" input, from which the terrain will be viewed."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
+    observerHeightsM = [observerHeight  for observerHeight in observerHeights  if observerHeight != None]
+    if (len(observerHeightsM) == 0):
+        observerHeightsM = [1.6] * len(observerPts)  # default (1.6 meters, 5.25 feet)
+    elif (len(observerHeightsM) == 1):
+        observerHeightsM = observerHeightsM * len(observerPts)
+    elif (len(observerHeightsM) != len(observerPts)) and (analysisType == 11):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "The number of values supplied to the \"observerHeights_\" input needs to be either one, or the same as the number of points supplied to the \"observers_\" input."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
+    TPIradiiM = [TPIradius  for TPIradius in TPIradii  if TPIradius != None]
+    if (len(TPIradiiM) == 0):
+        TPIradiiM = [0, None, 0, None]  # default (outer radii of 3 and 10 grid cells)
+    elif (len(TPIradiiM) == 2):
+        TPIradiiM = TPIradiiM + [0, None]
+    if (len(TPIradiiM) != 4) or (TPIradiiM[0] < 0) or (TPIradiiM[2] < 0) or ((TPIradiiM[1] != None) and (TPIradiiM[1] <= TPIradiiM[0])) or ((TPIradiiM[3] != None) and (TPIradiiM[3] <= TPIradiiM[2])):
+        if (analysisType == 12) or (analysisType == 13):
+            analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+            validInputData = False
+            printMsg = "Please supply two or four values to the \"TPIradii_\" input: inner and outer radius of the small (and large) neighbourhood.\n" + \
+                       "Inner radii can not be negative, and outer radii need to be larger than inner ones."
+            return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
+    if (TPIwindow == None) or (TPIwindow == 0):
+        TPIcircular = True  # default
+    elif (TPIwindow == 1):
+        TPIcircular = False
+    else:
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "Please supply 0 (circular) or 1 (rectangular) to the \"TPIwindow_\" input."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
+    if ((analysisType == 12) or (analysisType == 13) or (analysisType == 14) or (analysisType == 15) or (analysisType == 16)) and isinstance(rs.coercegeometry(terrainId), Rhino.Geometry.Mesh):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVectors = hypsometricStrength = hillshadeThreshold = hillshadeFilePath = refine = observerPts = observerHeightsM = TPIradiiM = TPIcircular = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "TPI for custom neighbourhoods, Landforms, Profile, Plan and Gaussian curvature (_analysisType = 12 to 16) can only be calculated for terrain surfaces or polysurfaces, not meshes.\n" + \
+                   "Please supply a terrain surface to the \"_terrain\" input (for example from Gismo \"Terrain Generator\" component with \"type_\" input set to 2 or 3)."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
     exportValues = True  # possible future input (exportValues_)
     if (exportValues == None):
         exportValues = False  # default
@@ -264,24 +408,32 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
         legendUnit = "degrees"
     elif (analysisType == 1):
         legendUnit = "percent"
-    elif (analysisType == 3) or (analysisType == 4) or (analysisType == 6) or (analysisType == 9):
+    elif (analysisType == 3) or (analysisType == 4) or (analysisType == 6) or (analysisType == 9) or (analysisType == 12):
         legendUnit = unitSystem
     elif (analysisType == 5):
         legendUnit = "HSH"
+    elif (analysisType == 17) or (analysisType == 18):
+        legendUnit = "sun vectors"
     elif (analysisType == 7):
         legendUnit = "TRI category"
     elif (analysisType == 8):
         legendUnit = "unitless‎"
-    elif (analysisType == 10):
+    elif (analysisType == 10) or (analysisType == 14) or (analysisType == 15):
         legendUnit = "1/%s" % unitSystem
+    elif (analysisType == 16):
+        legendUnit = "1/%s2" % unitSystem
+    elif (analysisType == 11):
+        legendUnit = "observers"
+    elif (analysisType == 13):
+        legendUnit = "landform class"
     
     validInputData = True
     printMsg = "ok"
     
-    return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
 
 
-def createOutputDescriptions(analysisType, unitSystem):
+def createOutputDescriptions(analysisTypes, unitSystem):
     
     if _runIt:
         outputDescriptions = [
@@ -344,7 +496,7 @@ def createOutputDescriptions(analysisType, unitSystem):
         "Hillshading is a useful way to depict the topographic relief of a terrain by illuminating it with a hypothetical light source (sunVector_).\n" + \
         "A somewhat better preview of the analysedTerrain mesh is given when the legendPar_ input is supplied with customColors_ consisted of two colors only (white and black for example).",  #analysedTerrain
         
-        "Terrain Hillshade values.\nEach value represents a hypsometrically shaded hillshade (HSH) which is calculated as Elevation shading factor subtracted from 1 and multiplied by the actual Hillshade. Actual Hillshade being the hypothetical illumination of each terrain mesh vertex.\n" + \
+        "Terrain Hillshade values.\nEach value represents a hypsometrically shaded hillshade (HSH) (or the mean HSH of all \"sunVector_\" vectors, if more than one is supplied) which is calculated as Elevation shading factor subtracted from 1 and multiplied by the actual Hillshade. Actual Hillshade being the hypothetical illumination of each terrain mesh vertex.\n" + \
         "-\n" + \
         "In hypsometrically shaded hillshade (HSH) value."]  #values
         
@@ -407,9 +559,107 @@ def createOutputDescriptions(analysisType, unitSystem):
         "Each value represents mean curvature value at each terrain mesh vertex.\n" + \
         "-\n" + \
         "In 1/%s." % unitSystem]  #values
+        
+        ,
+        
+        ["Terrain Cumulative visibility analysis mesh.",  #analysedTerrain
+        
+        "Terrain Cumulative visibility values.\n" + \
+        "Each value represents the number of observers (from \"observers_\" input) which can see each terrain mesh vertex.\n" + \
+        "Each observer is lifted for its observer height (\"observerHeights_\" input).\n" + \
+        "If mesh vertex is not visible from any observer (these are gray colored areas), then the value will be: 0.\n" + \
+        "-\n" + \
+        "Unitless."]  #values
+        
+        ,
+        
+        ["Topographic Position Index (TPI) for custom neighbourhood analysis mesh.\n" + \
+        "Positive values are higher than their surroundings (hills, ridges), negative values lower (valleys, gullies).",  #analysedTerrain
+        
+        "Topographic Position Index (TPI) values.\n" + \
+        "Each value represents the difference between vertex elevation and mean elevation of its small neighbourhood (first two \"TPIradii_\" input values).\n" + \
+        "-\n" + \
+        "In %s." % unitSystem]  #values
+        
+        ,
+        
+        ["Landforms analysis mesh.\n" + \
+        "Landforms are classified from TPI of a small and a large neighbourhood (\"TPIradii_\" input), standardized by standard deviation of the neighbourhood elevations.",  #analysedTerrain
+        
+        "Landform class values, by Andrew Weiss:\n" + \
+        "-\n" + \
+        "- class 1: Canyons, deeply incised streams.\n" + \
+        "- class 2: Midslope drainages, shallow valleys.\n" + \
+        "- class 3: Upland drainages, headwaters.\n" + \
+        "- class 4: U-shaped valleys.\n" + \
+        "- class 5: Plains.\n" + \
+        "- class 6: Open slopes.\n" + \
+        "- class 7: Upper slopes, mesas.\n" + \
+        "- class 8: Local ridges, hills in valleys.\n" + \
+        "- class 9: Midslope ridges, small hills in plains.\n" + \
+        "- class 10: Mountain tops, high ridges.\n" + \
+        "-\n" + \
+        "Unitless."]  #values
+        
+        ,
+        
+        ["Terrain Profile curvature analysis mesh.\n" + \
+        "It is the curvature of the terrain in the slope direction, and it affects the flow acceleration, erosion and deposition.",  #analysedTerrain
+        
+        "Terrain Profile curvature values.\n" + \
+        "Positive values are concave slopes (flow decelerates, deposition), negative values convex slopes (flow accelerates, erosion). Flat terrain has the value of 0.\n" + \
+        "-\n" + \
+        "In 1/%s." % unitSystem]  #values
+        
+        ,
+        
+        ["Terrain Plan curvature analysis mesh.\n" + \
+        "It is the curvature of the terrain contour lines, and it affects the convergence and divergence of the flow.",  #analysedTerrain
+        
+        "Terrain Plan curvature values.\n" + \
+        "Positive values are hollows (flow converges, drainage lines), negative values spurs (flow diverges). Flat terrain has the value of 0.\n" + \
+        "-\n" + \
+        "In 1/%s." % unitSystem]  #values
+        
+        ,
+        
+        ["Terrain Gaussian curvature analysis mesh.",  #analysedTerrain
+        
+        "Terrain Gaussian curvature values.\n" + \
+        "Each value represents the product of the two principal curvatures at each terrain mesh vertex.\n" + \
+        "Positive values are domes and basins, negative values are saddles.\n" + \
+        "-\n" + \
+        "In 1/%s2." % unitSystem]  #values
+        
+        ,
+        
+        ["Terrain Hillshade hours analysis mesh.\n" + \
+        "It shows how long each part of the terrain is lit, for example during a year when \"sunVector_\" input is supplied with sun vectors for each hour of the year.",  #analysedTerrain
+        
+        "Terrain Hillshade hours values.\n" + \
+        "Each value represents the number of \"sunVector_\" vectors for which the hypsometrically shaded hillshade (HSH) of each terrain mesh vertex is above the \"hillshadeThreshold_\" input value. For hourly sun vectors this is the number of hours.\n" + \
+        "-\n" + \
+        "Unitless."]  #values
+        
+        ,
+        
+        ["Terrain Cast shadows analysis mesh.\n" + \
+        "It shows the parts of the terrain shadowed by the surrounding terrain (and \"context_\" input), not only the ones facing away from the sun.",  #analysedTerrain
+        
+        "Terrain Cast shadows values.\n" + \
+        "For a single \"sunVector_\" vector, each value is 1 for lit and 0 for shadowed terrain mesh vertex. For more than one vector, each value represents the number of \"sunVector_\" vectors for which the terrain mesh vertex is lit. For hourly sun vectors this is the number of sun hours.\n" + \
+        "-\n" + \
+        "Unitless."]  #values
         ]
         
-        chosenOutputDescription = outputDescriptions[analysisType]
+        if (len(analysisTypes) == 1):
+            chosenOutputDescription = outputDescriptions[analysisTypes[0]]
+        else:
+            chosenOutputDescription = \
+            ["Analysed terrain meshes, one for each of the chosen _analysisType numbers.",  #analysedTerrain
+            
+            "Values corresponding to each \"analysedTerrain\" mesh vertex.\n" + \
+            "One branch for each of the chosen _analysisType numbers, in the same order as the \"analysedTerrain\" meshes."]  #values
     
     else:
         chosenOutputDescription = \
@@ -430,9 +680,436 @@ def correctSrfAzimuthDforNorth(northRad, srfAzimuthD):
     return correctedSrfAzimuthD
 
 
-def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevation, contextIdL, northRad, sunVector, hypsometricStrength, refine, exportValues, unitConversionFactor):
+def terrainSrfGrid(terrainSrf, numberOfRows, numberOfColumns):
+    
+    # sample points on terrainSrf in a numberOfRows x numberOfColumns grid of its u,v parameters
+    uDomain = terrainSrf.Domain(0)
+    vDomain = terrainSrf.Domain(1)
+    ptsOnTerrainSrf = []
+    for i in xrange(numberOfRows):
+        u = uDomain.ParameterAt(i/float(numberOfRows-1))
+        for k in xrange(numberOfColumns):
+            v = vDomain.ParameterAt(k/float(numberOfColumns-1))
+            ptsOnTerrainSrf.append(terrainSrf.PointAt(u,v))
+    
+    # check if the points form a rectilinear grid in XY plane (each row parallel to X axis and each column to Y axis, or the other way around), like terrain surfaces created from a DEM grid do
+    rowsX = [[pt.X  for pt in ptsOnTerrainSrf[i*numberOfColumns:(i+1)*numberOfColumns]]  for i in xrange(numberOfRows)]
+    rowsY = [[pt.Y  for pt in ptsOnTerrainSrf[i*numberOfColumns:(i+1)*numberOfColumns]]  for i in xrange(numberOfRows)]
+    for rowsAlong, rowsAcross in [(rowsX, rowsY), (rowsY, rowsX)]:
+        columnCoordinates = rowsAlong[0]
+        rowCoordinates = [rowAcross[0]  for rowAcross in rowsAcross]
+        spacings = [abs(columnCoordinates[k+1]-columnCoordinates[k])  for k in xrange(numberOfColumns-1)] + [abs(rowCoordinates[i+1]-rowCoordinates[i])  for i in xrange(numberOfRows-1)]
+        tolerance = 0.01 * min(spacings)  # 1% of the smallest grid spacing
+        if (tolerance > 0) and \
+           all([abs(coordinate - rowCoordinates[i]) <= tolerance  for i in xrange(numberOfRows)  for coordinate in rowsAcross[i]]) and \
+           all([abs(coordinate - columnCoordinates[k]) <= tolerance  for rowAlong in rowsAlong  for k,coordinate in enumerate(rowAlong)]):
+            rowsParallelToX = rowsAlong is rowsX
+            return ptsOnTerrainSrf, columnCoordinates, rowCoordinates, rowsParallelToX, True
+    
+    return ptsOnTerrainSrf, None, None, None, False
+
+
+def gridTerrainNormals(ptsOnTerrainSrf, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates, rowsParallelToX):
     
-    terrainBrep = rs.coercegeometry(terrainId)
+    # normals of a rectilinear grid of points, from Horn's finite differences of their heights. Slope, grade, aspect and hillshade calculated from them are the same as the ones calculated from terrainSrf normals in "createAnalysedTerrainMesh" function
+    vertexZ = [pt.Z  for pt in ptsOnTerrainSrf]
+    columnDerivatives, rowDerivatives = gismo_terrain.gradients(vertexZ, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates)
+    if rowsParallelToX:
+        derivativesX, derivativesY = columnDerivatives, rowDerivatives
+    else:
+        derivativesX, derivativesY = rowDerivatives, columnDerivatives
+    
+    # surface normal is (-derivativeX, -derivativeY, 1)
+    normalsX = [-derivativeX  for derivativeX in derivativesX]
+    normalsY = [-derivativeY  for derivativeY in derivativesY]
+    normalsZ = [1.0]*len(vertexZ)
+    
+    return normalsX, normalsY, normalsZ, vertexZ
+
+
+def normalsTerrainAnalysis(analysisType, normalsX, normalsY, normalsZ, vertexZ, northRad, sunVector, hypsometricStrength):
+    
+    # slope, grade, aspect and hillshade of each vertex from its normal (normals do not need to be unitized)
+    if (analysisType == 5):
+        # hillshade based on: http://edndoc.esri.com/arcobjects/9.2/net/shared/geoprocessing/spatial_analyst_tools/how_hillshade_works.htm
+        # http://www.jennessent.com/downloads/DEM%20Surface%20Tools%20for%20ArcGIS_A4.pdf
+        # deconstruct sunVector to sunAltitudeR, sunZenithR, sunAzimuthR
+        projectedSunvector = Rhino.Geometry.Vector3d(sunVector.X, sunVector.Y, 0)
+        sunAltitudeR = Rhino.Geometry.Vector3d.VectorAngle(sunVector, projectedSunvector)
+        sunZenithR = (math.pi/2) - sunAltitudeR
+        Yaxis = Rhino.Geometry.Vector3d(0,1,0)
+        sunAzimuthR = Rhino.Geometry.Vector3d.VectorAngle(projectedSunvector, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))  # clockwise
+        vertexZmin = min(vertexZ)
+        vertexZmax = max(vertexZ)
+        hypsometricStrength2 = -hypsometricStrength
+    
+    values = []
+    for index in xrange(len(vertexZ)):
+        slopeAngleR = math.atan2(math.sqrt(normalsX[index]**2 + normalsY[index]**2), normalsZ[index])
+        if slopeAngleR < 0.01:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
+            slopeAngleR = 0
+            slopeDirectionD = 0
+        else:
+            slopeDirectionR = math.atan2(normalsX[index], normalsY[index]) % (2*math.pi)  # clockwise from +Y axis
+            if slopeDirectionR < 0.001: slopeDirectionR = 0
+            slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
+        
+        if (analysisType == 0):
+            values.append(math.degrees(slopeAngleR))  # in degrees
+        elif (analysisType == 1):
+            values.append(math.tan(slopeAngleR)*100)  # in percent
+        elif (analysisType == 2):
+            values.append(correctSrfAzimuthDforNorth(northRad, slopeDirectionD))
+        elif (analysisType == 5):
+            correctedSlopeDirectionR_forNorth = math.radians(correctSrfAzimuthDforNorth(northRad, slopeDirectionD))
+            hillshade = 255 * ( ( math.cos(sunZenithR) * math.cos(slopeAngleR) ) + ( math.sin(sunZenithR) * math.sin(slopeAngleR) * math.cos(sunAzimuthR - correctedSlopeDirectionR_forNorth) ) )
+            if hillshade < 0: hillshade = 0
+            shadingFactor = 1 - ((vertexZ[index] - vertexZmin)/(vertexZmax-vertexZmin))*(hypsometricStrength2/100)-((100-hypsometricStrength2)/100)
+            values.append((1-shadingFactor) * hillshade)  # also called HSH
+    
+    return values
+
+
+def batchHillshade(normalsX, normalsY, normalsZ, vertexZ, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath):
+    
+    # hillshade of each vertex for each of the sunVectors, from the normals calculated only once. Returns the mean hillshade (for analysisType 5) and the number of sunVectors for which the hillshade is above hillshadeThreshold (for analysisType 17)
+    # the same formula as in "normalsTerrainAnalysis" function, with the sun zenith and azimuth (corrected for north) of each sunVector turned into a lightVector, and the slope and aspect of each vertex into its unit normal
+    Yaxis = Rhino.Geometry.Vector3d(0,1,0)
+    northCorrectionR = math.radians(correctSrfAzimuthDforNorth(northRad, 0))
+    lightVectors = []
+    for sunVector in sunVectors:
+        projectedSunvector = Rhino.Geometry.Vector3d(sunVector.X, sunVector.Y, 0)
+        sunAltitudeR = Rhino.Geometry.Vector3d.VectorAngle(sunVector, projectedSunvector)
+        sunZenithR = (math.pi/2) - sunAltitudeR
+        sunAzimuthR = Rhino.Geometry.Vector3d.VectorAngle(projectedSunvector, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))  # clockwise
+        lightAzimuthR = sunAzimuthR - northCorrectionR
+        lightVectors.append((math.sin(sunZenithR)*math.sin(lightAzimuthR), math.sin(sunZenithR)*math.cos(lightAzimuthR), math.cos(sunZenithR)))
+    
+    unitNormalsX = []; unitNormalsY = []; unitNormalsZ = []
+    for index in xrange(len(vertexZ)):
+        normalLength = math.sqrt(normalsX[index]**2 + normalsY[index]**2 + normalsZ[index]**2)
+        if math.atan2(math.sqrt(normalsX[index]**2 + normalsY[index]**2), normalsZ[index]) < 0.01:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
+            unitNormalsX.append(0); unitNormalsY.append(0); unitNormalsZ.append(1)
+        else:
+            unitNormalsX.append(normalsX[index]/normalLength); unitNormalsY.append(normalsY[index]/normalLength); unitNormalsZ.append(normalsZ[index]/normalLength)
+    
+    # hypsometric shading factor of each vertex
+    vertexZmin = min(vertexZ)
+    vertexZmax = max(vertexZ)
+    hypsometricStrength2 = -hypsometricStrength
+    weights = [1 - (1 - ((Z - vertexZmin)/(vertexZmax-vertexZmin))*(hypsometricStrength2/100)-((100-hypsometricStrength2)/100))  for Z in vertexZ]
+    
+    meanHillshades, numOfHillshadesAboveThreshold = gismo_terrain.hillshadeStatistics(unitNormalsX, unitNormalsY, unitNormalsZ, weights, lightVectors, hillshadeThreshold, hillshadeFilePath)
+    del unitNormalsX; del unitNormalsY; del unitNormalsZ; del weights
+    
+    return meanHillshades, numOfHillshadesAboveThreshold
+
+
+def hillshadeTypesAnalysis(analysisType, normalsX, normalsY, normalsZ, vertexZ, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, hillshades):
+    
+    # slope, grade, aspect, hillshade of each vertex from its normal. Hillshade for more than one sunVector and Hillshade hours are calculated with "batchHillshade" function only once for both analysisTypes, and kept in "hillshades" list
+    if ((analysisType == 5) and (len(sunVectors) > 1)) or (analysisType == 17):
+        if (len(hillshades) == 0):
+            hillshades.extend(batchHillshade(normalsX, normalsY, normalsZ, vertexZ, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath))
+        if (analysisType == 5):
+            return hillshades[0]
+        else:
+            return hillshades[1]
+    else:
+        return normalsTerrainAnalysis(analysisType, normalsX, normalsY, normalsZ, vertexZ, northRad, sunVectors[0], hypsometricStrength)
+
+
+def fractionalIndex(coordinates, coordinate):
+    
+    # fractional index of a coordinate in an ascending or descending list of grid coordinates
+    for k in xrange(len(coordinates)-1):
+        if (min(coordinates[k], coordinates[k+1]) <= coordinate <= max(coordinates[k], coordinates[k+1])) and (coordinates[k] != coordinates[k+1]):
+            return k + (coordinate - coordinates[k]) / (coordinates[k+1] - coordinates[k])
+    # coordinate outside of the grid: the nearest end
+    if abs(coordinate - coordinates[0]) <= abs(coordinate - coordinates[-1]):
+        return 0
+    else:
+        return len(coordinates)-1
+
+
+def gridTerrainVisibility(ptsOnTerrainSrf, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates, rowsParallelToX, originPt, unitConversionFactor):
+    
+    # visibility of a rectilinear grid of points from the lifted _origin, with a viewshed of their heights instead of intersecting lines with the terrainMesh
+    vertexZ = [pt.Z  for pt in ptsOnTerrainSrf]
+    if rowsParallelToX:
+        originColumn = fractionalIndex(columnCoordinates, originPt.X)
+        originRow = fractionalIndex(rowCoordinates, originPt.Y)
+    else:
+        originColumn = fractionalIndex(columnCoordinates, originPt.Y)
+        originRow = fractionalIndex(rowCoordinates, originPt.X)
+    
+    # project _origin to the grid, and lift it for average eye height
+    eyeHeightRhinoUnits = 1.6 / unitConversionFactor  # (1.6 meters, 5.25 feet)
+    liftedOriginPt = Rhino.Geometry.Point3d(originPt.X, originPt.Y, gismo_terrain.heightAt(vertexZ, numberOfRows, numberOfColumns, originColumn, originRow) + eyeHeightRhinoUnits)
+    visibility = gismo_terrain.viewshed(vertexZ, numberOfRows, numberOfColumns, originColumn, originRow, liftedOriginPt.Z, 0.01)  # lift each grid point the same as mesh vertices in "meshVisibility" function
+    
+    legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, legendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
+    distanceToEachMeshVertex_notHitted = []
+    distanceToEachMeshVertex_all = []
+    eachMeshVertexIndex_notHitted = []
+    colors = [System.Drawing.Color.FromArgb(70,70,70)]*len(ptsOnTerrainSrf)  # gray color for grid points which can not be seen from liftedOriginPt
+    for index,pt in enumerate(ptsOnTerrainSrf):
+        if visibility[index]:
+            eachMeshVertexIndex_notHitted.append(index)
+            distanceRhinoUnits = liftedOriginPt.DistanceTo(pt)
+            distanceToEachMeshVertex_notHitted.append(distanceRhinoUnits)  # will be used to create a legend
+            distanceToEachMeshVertex_all.append(distanceRhinoUnits)  # will be used for "values" output
+        else:
+            distanceToEachMeshVertex_all.append(0)  # if grid point can not be seen from liftedOriginPt, then set the distance between a grid point and liftedOriginPt to 0
+    if len(distanceToEachMeshVertex_notHitted) == 0:  # fix when all grid points can not be seen
+        distanceToEachMeshVertex_notHitted = [0]
+    
+    colors_notHitted = gismo_preparation.numberToColor(distanceToEachMeshVertex_notHitted, customColors, minValue, maxValue)
+    for dummyIndex, notHittedVertexIndex in enumerate(eachMeshVertexIndex_notHitted):
+        colors[notHittedVertexIndex] = colors_notHitted[dummyIndex]
+    
+    return distanceToEachMeshVertex_all, distanceToEachMeshVertex_notHitted, colors
+
+
+def gridCastShadows(ptsOnTerrainSrf, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates, rowsParallelToX, sunVectors):
+    
+    # shadows cast by a rectilinear grid of points on itself, by sweeping its heights along the sun direction, instead of intersecting a ray towards the sun from each terrainMesh vertex. Returns the number of sunVectors for which each grid point is lit
+    vertexZ = [pt.Z  for pt in ptsOnTerrainSrf]
+    columnSpacing = (columnCoordinates[-1] - columnCoordinates[0]) / (numberOfColumns-1)  # negative for descending columnCoordinates
+    rowSpacing = (rowCoordinates[-1] - rowCoordinates[0]) / (numberOfRows-1)
+    
+    litCounts = [0]*len(vertexZ)
+    for sunVector in sunVectors:
+        # sunVector points from the sun towards the terrain
+        if rowsParallelToX:
+            sunColumnDirection, sunRowDirection = -sunVector.X, -sunVector.Y
+        else:
+            sunColumnDirection, sunRowDirection = -sunVector.Y, -sunVector.X
+        if columnSpacing < 0:
+            sunColumnDirection = -sunColumnDirection
+        if rowSpacing < 0:
+            sunRowDirection = -sunRowDirection
+        sunAltitudeR = math.atan2(-sunVector.Z, math.sqrt(sunVector.X**2 + sunVector.Y**2))
+        lit = gismo_terrain.castShadows(vertexZ, numberOfRows, numberOfColumns, abs(columnSpacing), abs(rowSpacing), sunColumnDirection, sunRowDirection, sunAltitudeR)
+        litCounts = [litCount+vertexLit  for litCount,vertexLit in zip(litCounts, lit)]
+    
+    return litCounts
+
+
+def meshCastShadows(terrainMesh, terrainMesh_vertices, sunVectors):
+    
+    # shadows cast by the terrainMesh (and "context_" appended to it) on its own vertices: a vertex is lit if a ray from it towards the sun does not hit the terrainMesh. Returns the number of sunVectors for which each vertex is lit
+    litCounts = [0]*len(terrainMesh_vertices)
+    for sunVector in sunVectors:
+        if (sunVector.Z >= 0):
+            continue  # sun below the horizon
+        reversedSunVector = Rhino.Geometry.Vector3d(-sunVector.X, -sunVector.Y, -sunVector.Z)
+        for index,vertex in enumerate(terrainMesh_vertices):
+            liftedVertex = Rhino.Geometry.Point3d(vertex.X, vertex.Y, vertex.Z + 0.01)  # lift each mesh vertex due to Intersection.MeshRay
+            ray = Rhino.Geometry.Ray3d(liftedVertex, reversedSunVector)
+            if (Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray) < 0):
+                # nothing hitted
+                litCounts[index] += 1
+    
+    return litCounts
+
+
+def calculate_TRI_category(TRI_rhinoUnits, unitConversionFactor):
+    
+    # TRI categories by Riley
+    TRI_meters = TRI_rhinoUnits/unitConversionFactor
+    
+    if TRI_meters <=80:
+        TRI_category = 0
+    elif 80<TRI_meters<=116:
+        TRI_category = 1
+    elif 116<TRI_meters<=161:
+        TRI_category = 2
+    elif 161<TRI_meters<=239:
+        TRI_category = 3
+    elif 239<TRI_meters<=497:
+        TRI_category = 4
+    elif 497<TRI_meters<=958:
+        TRI_category = 5
+    elif TRI_meters>958:
+        TRI_category = 6
+    return TRI_category
+
+
+def appendContext(terrainMesh, contextIdL, meshParam):
+    
+    # add "context_" meshes to the terrainMesh
+    for contextId in contextIdL:
+        contextObj = rs.coercegeometry(contextId)
+        if (type(contextObj) == Rhino.Geometry.Brep):
+            for mesh in Rhino.Geometry.Mesh.CreateFromBrep(contextObj, meshParam):
+                terrainMesh.Append(mesh)
+        elif (type(contextObj) == Rhino.Geometry.Mesh):
+            terrainMesh.Append(contextObj)
+        else:
+            print "One of the items you added to the \"context_\" input is not a brep nor a mesh which is what this input requires."
+
+
+def surfaceCurvatures(analysisType, surfaceCurvature):
+    
+    # profile, plan or Gaussian curvature from terrainSrf principal curvatures, for terrain surfaces which are not created from a regular grid of heights
+    # profile curvature is the normal curvature in the slope direction, and plan curvature the normal curvature in the contour line direction divided by the sine of the slope angle. Both are calculated with Euler's theorem from the principal curvatures
+    if (analysisType == 16):
+        return surfaceCurvature.Gaussian
+    
+    surfaceNormal = surfaceCurvature.Normal
+    surfaceNormal.Unitize()
+    # curvatures positive where the terrain bends towards the normal pointing upwards, the same as for terrain surfaces created from a regular grid of heights
+    curvatureSign = 1 if (surfaceNormal.Z >= 0) else -1
+    # slope direction (upwards) is the Z axis projected to the tangent plane
+    slopeDirection = Rhino.Geometry.Vector3d(0,0,1) - surfaceNormal.Z * surfaceNormal
+    sinSlopeAngle = slopeDirection.Length
+    if sinSlopeAngle < 1e-6:
+        return 0  # flat terrain
+    firstPrincipalDirection = surfaceCurvature.Direction(0)
+    firstPrincipalDirection.Unitize()
+    cosAngle = (slopeDirection * firstPrincipalDirection) / sinSlopeAngle  # angle between the slope direction and the first principal direction
+    cosAngle2 = min(cosAngle*cosAngle, 1)
+    if (analysisType == 14):
+        return curvatureSign * (surfaceCurvature.Kappa(0)*cosAngle2 + surfaceCurvature.Kappa(1)*(1-cosAngle2))
+    elif (analysisType == 15):
+        return curvatureSign * (surfaceCurvature.Kappa(0)*(1-cosAngle2) + surfaceCurvature.Kappa(1)*cosAngle2) / sinSlopeAngle
+
+
+def meshVisibility(terrainMesh, terrainMesh_vertices, originPt, unitConversionFactor):
+    
+    # visibility of each terrainMesh vertex from the lifted _origin
+    legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, legendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
+    hittedPts = []
+    hittedLines = []
+    
+    distanceToEachMeshVertex_notHitted = []
+    distanceToEachMeshVertex_all = []
+    eachMeshVertexIndex_notHitted = []
+    colors = [None]*len(terrainMesh_vertices)
+    
+    # project _origin to terrainMesh. This is done due to inconsistency between "origin" output for "type = 0 or 1", and "origin" output for "type = 2 or 3" for Gismo "Terrain Generator" component
+    safeHeightDummy = 10000/unitConversionFactor  # in meters
+    highLiftedOrigin = Rhino.Geometry.Point3d(originPt.X, originPt.Y, (originPt.Z+safeHeightDummy))
+    ray = Rhino.Geometry.Ray3d(highLiftedOrigin, Rhino.Geometry.Vector3d(0,0,-1))
+    rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
+    locationPt = ray.PointAt(rayIntersectParam)
+    # lift the locationPt for average eye height
+    eyeHeightRhinoUnits = 1.6 / unitConversionFactor  # (1.6 meters, 5.25 feet)
+    liftedOriginPt = Rhino.Geometry.Point3d(locationPt.X, locationPt.Y, locationPt.Z + eyeHeightRhinoUnits)
+    
+    for index,vertex in enumerate(terrainMesh_vertices):
+        liftedVertex = Rhino.Geometry.Point3d(vertex.X, vertex.Y, vertex.Z + 0.01)  # lift each mesh vertex due to Intersection.MeshLine
+        line = Rhino.Geometry.Line(liftedOriginPt, liftedVertex)
+        intersectionPts, intersectionFaceIndex = Rhino.Geometry.Intersect.Intersection.MeshLine(terrainMesh,line)
+        if len(intersectionPts) != 0:
+            # terrainMesh hitted
+            #hittedPts.append(liftedVertex)
+            #hittedLines.append(line)
+            colors[index] = System.Drawing.Color.FromArgb(70,70,70)  # set it to gray color
+            distanceToEachMeshVertex_all.append(0)  # if vertex can not be seen from liftedOriginPt, then set the distance between a vertex and liftedOriginPt to 0
+        else:
+            # nothing hitted
+            eachMeshVertexIndex_notHitted.append(index)
+            distanceRhinoUnits = liftedOriginPt.DistanceTo(vertex)
+            distanceToEachMeshVertex_notHitted.append(distanceRhinoUnits)  # will be used to create a legend
+            distanceToEachMeshVertex_all.append(distanceRhinoUnits)  # will be used for "values" output
+    if len(distanceToEachMeshVertex_notHitted) == 0:  # fix when all vertices can not be seen
+        distanceToEachMeshVertex_notHitted = [System.Drawing.Color.FromArgb(70,70,70)]*len(terrainMesh_vertices)
+    
+    colors_notHitted = gismo_preparation.numberToColor(distanceToEachMeshVertex_notHitted, customColors, minValue, maxValue)
+    
+    for dummyIndex, notHittedVertexIndex in enumerate(eachMeshVertexIndex_notHitted):
+        colors[notHittedVertexIndex] = colors_notHitted[dummyIndex]
+    
+    return distanceToEachMeshVertex_all, distanceToEachMeshVertex_notHitted, colors
+
+
+def meshTerrainAnalysis(analysisTypes, terrainObj, originPt, originPtElevation, contextIdL, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, unitConversionFactor):
+    
+    # analysis of a mesh terrain directly from its vertices and faces: normals, curvature and neighbouring vertices are derived from the mesh topology, instead of from a surface fitted to the mesh
+    # welded terrainMesh, its vertices, faces and normals are generated only once for all analysisTypes: with "context_" for analysisTypes 0 to 5, 10 and 14 to 18, without it for TRI, TRI categories, SRF, TPI
+    meshData = {}
+    roughness = None  # TRI, SRF, TPI (ERR) of each vertex
+    hillshades = []  # mean hillshade and hillshade hours of each vertex, for more than one sunVector
+    
+    analysedTerrainMeshes = []
+    for analysisType in analysisTypes:
+        withContext = (len(contextIdL) > 0) and (analysisType != 6) and (analysisType != 7) and (analysisType != 8) and (analysisType != 9)
+        if not meshData.has_key(withContext):
+            terrainMesh = terrainObj.DuplicateMesh()
+            if withContext:
+                appendContext(terrainMesh, contextIdL, Rhino.Geometry.MeshingParameters())
+            terrainMesh.Vertices.CombineIdentical(True, True)  # weld the vertices, so that the neighbouring faces share them
+            
+            verticesX = []; verticesY = []; verticesZ = []
+            for vertex in terrainMesh.Vertices:
+                verticesX.append(vertex.X); verticesY.append(vertex.Y); verticesZ.append(vertex.Z)
+            faces = [(face.A, face.B, face.C) if face.IsTriangle else (face.A, face.B, face.C, face.D)  for face in terrainMesh.Faces]
+            triangles = gismo_terrain.meshTriangles(faces)
+            normalsX, normalsY, normalsZ = gismo_terrain.meshVertexNormals(verticesX, verticesY, verticesZ, triangles)  # area weighted
+            meshData[withContext] = [terrainMesh, verticesX, verticesY, verticesZ, faces, triangles, normalsX, normalsY, normalsZ]
+        terrainMesh, verticesX, verticesY, verticesZ, faces, triangles, normalsX, normalsY, normalsZ = meshData[withContext]
+        
+        if (analysisType == 3):
+            # elevation
+            values = legendValues = [(vertexZ-originPt.Z)+originPtElevation  for vertexZ in verticesZ]
+        elif (analysisType == 4):
+            # visibility
+            values, legendValues, colors = meshVisibility(terrainMesh, list(terrainMesh.Vertices), originPt, unitConversionFactor)
+        elif (analysisType == 18):
+            # cast shadows
+            values = legendValues = meshCastShadows(terrainMesh, list(terrainMesh.Vertices), sunVectors)
+        elif (analysisType == 10):
+            # mean curvature
+            values = legendValues = gismo_terrain.meshMeanCurvatures(verticesX, verticesY, verticesZ, triangles, normalsX, normalsY, normalsZ)
+        elif (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9):
+            # TRI, TRI categories, SRF, TPI, for a window of each vertex and its neighbouring vertices
+            if (roughness == None):
+                vertexElevations = [(vertexZ-originPt.Z)+originPtElevation  for vertexZ in verticesZ]
+                neighbours = gismo_terrain.meshVertexNeighbours(len(verticesZ), faces)
+                TRI_List, SRF_List, TPI_List_dummy, TPI_List = gismo_terrain.meshRoughnessIndices(vertexElevations, normalsX, normalsY, normalsZ, neighbours)  # TPI_List is ERR (Elevation-Relief Ratio), the same as for surface terrains
+                del vertexElevations; del neighbours; del TPI_List_dummy
+                roughness = [TRI_List, SRF_List, TPI_List]
+            TRI_List, SRF_List, TPI_List = roughness
+            if (analysisType == 6):
+                values = TRI_List
+            elif (analysisType == 7):
+                values = [calculate_TRI_category(TRI_rhinoUnits, unitConversionFactor)  for TRI_rhinoUnits in TRI_List]  # unitless
+            elif (analysisType == 8):
+                values = SRF_List
+            elif (analysisType == 9):
+                values = TPI_List
+            legendValues = values
+        else:
+            # slope, grade, aspect, hillshade, hillshade hours
+            values = legendValues = hillshadeTypesAnalysis(analysisType, normalsX, normalsY, normalsZ, verticesZ, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, hillshades)
+        
+        if (analysisType != 4):
+            legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, legendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
+            colors = gismo_preparation.numberToColor(values, customColors, minValue, maxValue)
+        # color a copy of the terrainMesh, so that the terrainMesh can be shared by the rest of analysisTypes
+        terrainMesh_colored = terrainMesh.DuplicateMesh()
+        terrainMesh_colored.VertexColors.Clear()
+        for color in colors:
+            terrainMesh_colored.VertexColors.Add(color)
+        del colors
+        
+        analysedTerrainMeshes.append([terrainMesh_colored, values, legendValues])
+    del meshData; del roughness; del hillshades
+    
+    return analysedTerrainMeshes
+
+
+def createAnalysedTerrainMesh(analysisTypes, terrainId, originPt, originPtElevation, contextIdL, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, TPIradiiM, TPIcircular, refine, exportValues, unitConversionFactor):
+    
+    # analysedTerrain mesh, values and legend values for each of the analysisTypes. The data they share (terrainMesh, terrainSrf normals, grid of points on terrainSrf, TRI, SRF, TPI windows and neighbourhoods) is generated only once
+    terrainObj = rs.coercegeometry(terrainId)
+    if isinstance(terrainObj, Rhino.Geometry.Mesh):
+        # mesh terrain is analysed directly, without converting it to a surface
+        return meshTerrainAnalysis(analysisTypes, terrainObj, originPt, originPtElevation, contextIdL, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, unitConversionFactor)
+    
+    terrainBrep = terrainObj
     # shrink the upper terrain brepface in case it is not shrinked (for example: the terrain surface inputted to _terrain input is not created by Gismo "Terrain Generator" component)
     terrainBrepFaces = terrainBrep.Faces
     terrainBrepFaces.ShrinkFaces()
@@ -451,416 +1128,318 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
     bb_bottom_Ydirection_edge = bb.GetEdges()[1]
     numberOfRows = int( (bb_bottom_Ydirection_edge.Length/distanceBetweenFirstSecondControlPt) )  # if "refine_" input set to False
     numberOfColumns = int( (bb_bottom_Xdirection_edge.Length/distanceBetweenFirstSecondControlPt) )  # if "refine_" input set to False
+    numberOfRows_TRIcategories = numberOfRows  # "refine_ == True" will not affect the TRI categories (analysisType = 7)
+    numberOfColumns_TRIcategories = numberOfColumns
     
-    if refine and (analysisType != 7):  # "refine_ == True" will not affect the TRI categories (analysisType = 7)
+    if refine:
         # if refine_ input set to True, limit the meshParam.MaximumEdgeLength (this is for analysisType 0 to 5 and 10)
         meshParam.MaximumEdgeLength = int(distanceBetweenFirstSecondControlPt) / 2
-        # for analysisType 6 and 7
+        # for analysisType 6, 8, 9, 12, 13
         numberOfRows = 2 * numberOfRows  # for "refine_" input set to True, double the numberOfRows
         numberOfColumns = 2 * numberOfColumns  # for "refine_" input set to True, double the numberOfColumns
     
-    terrainMesh = Rhino.Geometry.Mesh.CreateFromBrep(terrainBrep, meshParam)[0]
-    
-    
-    # add "context_" to "terrainMesh" unless in casses of TRI, TRI categories, SRF, TPI because they use the surface terrain instead of mesh terrain to analyse the terrain
-    if (analysisType != 6) or (analysisType != 7) or (analysisType != 8) or (analysisType != 9):
-        for contextId in contextIdL:
-            contextObj = rs.coercegeometry(contextId)
-            if (type(contextObj) == Rhino.Geometry.Brep):
-                contextObj_meshes = Rhino.Geometry.Mesh.CreateFromBrep(contextObj, meshParam)
-                for mesh in contextObj_meshes:
-                    terrainMesh.Append(mesh)
-            elif (type(contextObj) == Rhino.Geometry.Mesh):
-                terrainMesh.Append(contextObj)
-            else:
-                print "One of the items you added to the \"context_\" input is not a brep nor a mesh which is what this input requires."
-    
-    
-    terrainMesh_vertices = list(terrainMesh.Vertices)
-    
     
     # deconstruct legendBakePar_
     legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, legendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
     
-    originPtZ = originPt.Z
-    # for _analysisStyle == 3,6,7 (not needed for 5)
-    def calculateVertexElevation(vertexZ):
-        vertexElevation = (vertexZ-originPtZ)+originPtElevation
-        return vertexElevation
-    
-    if (analysisType == 0):
-        # slope
-        slopeAngles = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if slopeAngleD = 0
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                slopeAngleD = 0
-            else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
-                if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
-                slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
-                slopeAngleD = math.degrees(slopeAngleR)  # in degrees
-            slopeAngles.append(slopeAngleD)
-        colors = gismo_preparation.numberToColor(slopeAngles, customColors, minValue, maxValue)
-    
-    
-    elif (analysisType == 1):
-        # grade
-        gradePercents = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if slopeAngleD = 0
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                gradePercent = 0
-            else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
-                if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
-                slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
-                gradePercent = math.tan(slopeAngleR)*100  # in percent
-            gradePercents.append(gradePercent)
-        colors = gismo_preparation.numberToColor(gradePercents, customColors, minValue, maxValue)
-    
-    
-    elif (analysisType == 2):
-        # aspect (slope direction)
-        Yaxis = Rhino.Geometry.Vector3d(0,1,0)
-        slopeDirections = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if surfaceNormal == +Z axis
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                slopeDirectionD = 0
-            else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                # clockwise
-                slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
-                # counter clockwise
-                #slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
-                if slopeDirectionR < 0.001: slopeDirectionR = 0
-                slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
-            correctedSlopeDirectionD_forNorth = correctSrfAzimuthDforNorth(northRad, slopeDirectionD)
-            slopeDirections.append(correctedSlopeDirectionD_forNorth)
-        colors = gismo_preparation.numberToColor(slopeDirections, customColors, minValue, maxValue)
-    
-    
-    elif (analysisType == 3):
-        # elevation
-        elevations = []
-        for vertex in terrainMesh_vertices:
-            vertexElevation = calculateVertexElevation(vertex.Z)  # in rhino document units
-            elevations.append(vertexElevation)
-        colors = gismo_preparation.numberToColor(elevations, customColors, minValue, maxValue)
-    
-    
-    elif (analysisType == 4):
-        # visibility
-        hittedPts = []
-        hittedLines = []
-        
-        distanceToEachMeshVertex_notHitted = []
-        distanceToEachMeshVertex_all = []
-        eachMeshVertexIndex_notHitted = []
-        colors = [None]*len(terrainMesh_vertices)
-        
-        # project _origin to terrainMesh. This is done due to inconsistency between "origin" output for "type = 0 or 1", and "origin" output for "type = 2 or 3" for Gismo "Terrain Generator" component
-        safeHeightDummy = 10000/unitConversionFactor  # in meters
-        highLiftedOrigin = Rhino.Geometry.Point3d(originPt.X, originPt.Y, (originPt.Z+safeHeightDummy))
-        ray = Rhino.Geometry.Ray3d(highLiftedOrigin, Rhino.Geometry.Vector3d(0,0,-1))
-        rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
-        locationPt = ray.PointAt(rayIntersectParam)
-        # lift the locationPt for average eye height
-        eyeHeightRhinoUnits = 1.6 / unitConversionFactor  # (1.6 meters, 5.25 feet)
-        liftedOriginPt = Rhino.Geometry.Point3d(locationPt.X, locationPt.Y, locationPt.Z + eyeHeightRhinoUnits)
-        
-        for index,vertex in enumerate(terrainMesh_vertices):
-            liftedVertex = Rhino.Geometry.Point3d(vertex.X, vertex.Y, vertex.Z + 0.01)  # lift each mesh vertex due to Intersection.MeshLine
-            line = Rhino.Geometry.Line(liftedOriginPt, liftedVertex)
-            intersectionPts, intersectionFaceIndex = Rhino.Geometry.Intersect.Intersection.MeshLine(terrainMesh,line)
-            if len(intersectionPts) != 0:
-                # terrainMesh hitted
-                #hittedPts.append(liftedVertex)
-                #hittedLines.append(line)
-                colors[index] = System.Drawing.Color.FromArgb(70,70,70)  # set it to gray color
-                distanceToEachMeshVertex_all.append(0)  # if vertex can not be seen from liftedOriginPt, then set the distance between a vertex and liftedOriginPt to 0
-            else:
-                # nothing hitted
-                eachMeshVertexIndex_notHitted.append(index)
-                distanceRhinoUnits = liftedOriginPt.DistanceTo(vertex)
-                distanceToEachMeshVertex_notHitted.append(distanceRhinoUnits)  # will be used to create a legend
-                distanceToEachMeshVertex_all.append(distanceRhinoUnits)  # will be used for "values" output
-        if len(distanceToEachMeshVertex_notHitted) == 0:  # fix when all vertices can not be seen
-            distanceToEachMeshVertex_notHitted = [System.Drawing.Color.FromArgb(70,70,70)]*len(terrainMesh_vertices)
-        
-        colors_notHitted = gismo_preparation.numberToColor(distanceToEachMeshVertex_notHitted, customColors, minValue, maxValue)
-        
-        for dummyIndex, notHittedVertexIndex in enumerate(eachMeshVertexIndex_notHitted):
-            colors[notHittedVertexIndex] = colors_notHitted[dummyIndex]
-    
-    
-    elif (analysisType == 5):
-        # hillshade
-        # based on: http://edndoc.esri.com/arcobjects/9.2/net/shared/geoprocessing/spatial_analyst_tools/how_hillshade_works.htm
-        # http://www.jennessent.com/downloads/DEM%20Surface%20Tools%20for%20ArcGIS_A4.pdf
-        
-        # deconstruct sunVector to sunAltitudeR, sunZenithR, sunAzimuthR
-        projectedSunvector = Rhino.Geometry.Vector3d(sunVector.X, sunVector.Y, 0)
-        sunAltitudeR = Rhino.Geometry.Vector3d.VectorAngle(sunVector, projectedSunvector)
-        sunZenithR = (math.pi/2) - sunAltitudeR
+    srfGrid = None  # grid of points on terrainSrf, for analysisType 0,1,2,4,5,10,14,15,16,17,18
+    gridNormals = None  # normals of the grid of points on terrainSrf, for analysisType 0,1,2,5,17
+    gridCurvatures = None  # curvatures of the grid of points on terrainSrf, for analysisType 10,14,15,16
+    terrainMesh = None  # terrainMesh with "context_", for analysisType 0 to 5, 10 and 14 to 18
+    srfParameters = None  # terrainSrf u,v parameters closest to each terrainMesh vertex, for analysisType 0,1,2,5,10,14,15,16,17
+    srfPointGrids = {}  # points on terrainSrf, their elevations and unit normals, for each numberOfRows x numberOfColumns grid
+    roughness = {}  # TRI, SRF, TPI (ERR) for each numberOfRows x numberOfColumns grid
+    TPIneighbourhoods = [None, None]  # TPI and standardized TPI (DEV) for small and large "TPIradii_" neighbourhood
+    hillshades = []  # mean hillshade and hillshade hours of each vertex, for more than one sunVector
+    
+    analysedTerrainMeshes = []
+    for analysisType in analysisTypes:
+        # slope, grade, aspect, visibility, hillshade, curvatures and cast shadows of terrain surfaces created from a DEM grid (for example by Gismo "Terrain Generator" component) are calculated from the grid of heights, instead of terrainSrf normals, curvatures or terrainMesh intersections at each terrainMesh vertex
+        if ((analysisType == 0) or (analysisType == 1) or (analysisType == 2) or (analysisType == 4) or (analysisType == 5) or (analysisType == 10) or (analysisType == 14) or (analysisType == 15) or (analysisType == 16) or (analysisType == 17) or (analysisType == 18)) and (len(contextIdL) == 0):
+            if (srfGrid == None):
+                srfGrid = terrainSrfGrid(terrainSrf, numberOfRows, numberOfColumns)
+            ptsOnTerrainSrf, columnCoordinates, rowCoordinates, rowsParallelToX, gridTerrain = srfGrid
+            if gridTerrain:
+                if (analysisType == 4):
+                    values, legendValues, colors = gridTerrainVisibility(ptsOnTerrainSrf, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates, rowsParallelToX, originPt, unitConversionFactor)
+                elif (analysisType == 18):
+                    values = legendValues = gridCastShadows(ptsOnTerrainSrf, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates, rowsParallelToX, sunVectors)
+                    colors = gismo_preparation.numberToColor(values, customColors, minValue, maxValue)
+                elif (analysisType == 10) or (analysisType == 14) or (analysisType == 15) or (analysisType == 16):
+                    if (gridCurvatures == None):
+                        # mean, Gaussian, profile and plan curvature, all in one pass over the grid of heights
+                        gridCurvatures = gismo_terrain.curvatures([pt.Z  for pt in ptsOnTerrainSrf], numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates)
+                    meanCurvatures, gaussianCurvatures, profileCurvatures, planCurvatures = gridCurvatures
+                    if (analysisType == 10):
+                        values = legendValues = meanCurvatures
+                    elif (analysisType == 14):
+                        values = legendValues = profileCurvatures
+                    elif (analysisType == 15):
+                        values = legendValues = planCurvatures
+                    elif (analysisType == 16):
+                        values = legendValues = gaussianCurvatures
+                    colors = gismo_preparation.numberToColor(values, customColors, minValue, maxValue)
+                else:
+                    if (gridNormals == None):
+                        gridNormals = gridTerrainNormals(ptsOnTerrainSrf, numberOfRows, numberOfColumns, columnCoordinates, rowCoordinates, rowsParallelToX)
+                    gridNormalsX, gridNormalsY, gridNormalsZ, gridVertexZ = gridNormals
+                    values = legendValues = hillshadeTypesAnalysis(analysisType, gridNormalsX, gridNormalsY, gridNormalsZ, gridVertexZ, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, hillshades)
+                    colors = gismo_preparation.numberToColor(values, customColors, minValue, maxValue)
+                terrainMesh_colored = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, ptsOnTerrainSrf, colors)
+                del colors
+                
+                analysedTerrainMeshes.append([terrainMesh_colored, values, legendValues])
+                continue
         
-        Yaxis = Rhino.Geometry.Vector3d(0,1,0)
-        # clockwise
-        sunAzimuthR = Rhino.Geometry.Vector3d.VectorAngle(projectedSunvector, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
-        # counter clockwise
-        #sunAzimuthR = Rhino.Geometry.Vector3d.VectorAngle(projectedSunvector, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
-        
-        # for shadingFactor
-        # (there is no need to use "calculateVertexElevation" function because the ratio between vertices actual elevations and their Rhino Z coordinates is the same)
-        vertexZ = [vertex.Z  for vertex in terrainMesh_vertices]
-        vertexZmin = min(vertexZ)
-        vertexZmax = max(vertexZ)
         
-        hypsometricallyShadedHillshadeL = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if slopeAngleD = 0 and slopeDirectionD = 0
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                slopeAngleR = 0
-                slopeAngleD = 0
-                slopeDirectionD = 0
+        if (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9) or (analysisType == 12) or (analysisType == 13):
+            if (analysisType == 7):
+                gridSize = (numberOfRows_TRIcategories, numberOfColumns_TRIcategories)
             else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
-                if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
-                slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
-                slopeAngleD = math.degrees(slopeAngleR)  # in degrees
-                
-                # clockwise
-                slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
-                # counter clockwise
-                #slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
-                if slopeDirectionR < 0.001: slopeDirectionR = 0
-                slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
-            
-            correctedSlopeDirectionD_forNorth = correctSrfAzimuthDforNorth(northRad, slopeDirectionD)
-            correctedSlopeDirectionR_forNorth = math.radians(correctedSlopeDirectionD_forNorth)
+                gridSize = (numberOfRows, numberOfColumns)
+            rows, columns = gridSize
             
-            hillshade = 255 * ( ( math.cos(sunZenithR) * math.cos(slopeAngleR) ) + ( math.sin(sunZenithR) * math.sin(slopeAngleR) * math.cos(sunAzimuthR - correctedSlopeDirectionR_forNorth) ) )
-            if hillshade < 0: hillshade = 0
-            
-            hypsometricStrength2 = -hypsometricStrength
-            shadingFactor = 1 - ((vertex.Z - vertexZmin)/(vertexZmax-vertexZmin))*(hypsometricStrength2/100)-((100-hypsometricStrength2)/100)
-            hypsometricallyShadedHillshade = (1-shadingFactor) * hillshade   # also called HSH
-            hypsometricallyShadedHillshadeL.append(hypsometricallyShadedHillshade)
-        colors = gismo_preparation.numberToColor(hypsometricallyShadedHillshadeL, customColors, minValue, maxValue)
-    
-    
-    elif (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9):
-        # TRI, TRI categories, SRF, TPI
-        # based on: http://download.osgeo.org/qgis/doc/reference-docs/Terrain_Ruggedness_Index.pdf
-        # http://gis.stackexchange.com/a/6059/65002
-        # https://github.com/wschwanghart/topotoolbox/blob/master/@GRIDobj/roughness.m
-        def calculate_TRI_category(TRI_rhinoUnits):
-            TRI_meters = TRI_rhinoUnits/unitConversionFactor
-            
-            if TRI_meters <=80:
-                TRI_category = 0
-            elif 80<TRI_meters<=116:
-                TRI_category = 1
-            elif 116<TRI_meters<=161:
-                TRI_category = 2
-            elif 161<TRI_meters<=239:
-                TRI_category = 3
-            elif 239<TRI_meters<=497:
-                TRI_category = 4
-            elif 497<TRI_meters<=958:
-                TRI_category = 5
-            elif TRI_meters>958:
-                TRI_category = 6
-            return TRI_category
-        
-        
-        # TPI categories based on: "GIS-Based Automated Landform Classification and Topographic, Landcover and Geologic Attributes of Landforms Around the Yazoren Polje", S. Tagil, J. Jenness, Journal of applied sciences 8, 2008
-        # http://scialert.net/qredirect.php?doi=jas.2008.910.921&linkid=pdf
-        def calculate_TPI_category(TPI_rhinoUnits, SD, slopeD):
-            
-            if TPI_rhinoUnits <=-1:
-                TPI_category = 0  # valley bottom
-            elif (-1<TPI_rhinoUnits<1) and (slopeD <= 6):
-                TPI_category = 1  # flat
-            elif (-1<TPI_rhinoUnits<1) and (slopeD > 6):
-                TPI_category = 2  # flat
-            elif TPI_rhinoUnits >= 1:
-                TPI_category = 3  # hilltop
-            return TPI_category
-        
-        
-        # generates points on terrainSrf (ptsOnTerrainSrf) and its elevation values (vertexElevations). They are used to calculate TRI and TRI categories after that
-        domainUV = Rhino.Geometry.Interval(0,1)
-        terrainSrf.SetDomain(0, domainUV)
-        terrainSrf.SetDomain(1, domainUV)
-        uDomain = terrainSrf.Domain(0)
-        vDomain = terrainSrf.Domain(1)
-        
-        uStep = uDomain.T1/(numberOfRows-1)
-        vStep = vDomain.T1/(numberOfColumns-1)
-        
-        
-        ptsOnTerrainSrf = []  # to create the mesh by gismo_geometry.meshFromPoints
-        vertexElevations = []
-        vertexNormals = []
-        for i in xrange(numberOfRows):
-            u = i * uStep
-            for k in xrange(numberOfColumns):
-                v = k * vStep
-                pt = terrainSrf.PointAt(u,v)
-                ptsOnTerrainSrf.append(pt)
-                ptZ = pt.Z
-                vertexElevation = calculateVertexElevation(ptZ)
-                vertexElevations.append(vertexElevation)
-                surfaceNormal = terrainSrf.NormalAt(u,v)
-                surfaceNormal.Unitize()
-                vertexNormals.append(surfaceNormal)
-        # end of generation of points on terrainSrf (ptsOnTerrainSrf) and its elevation values (vertexElevations)
-        
-        
-        # calculation of surrounding set of neighboring indices in a matrix. equations by: http://math.stackexchange.com/users/71915/dolma
-        def rowOfIndexFunc(index):
-            rowOfIndex = int(math.floor(index/numberOfColumns)+1)
-            return rowOfIndex
-        
-        TRI_List = []
-        SRF_List = []
-        TPI_List = []
-        TRI_category_List = []
-        TPI_category_List = []
-        for wantedIndex in xrange(len(vertexElevations)):
-            rowOfWantedIndex = rowOfIndexFunc(wantedIndex)
-            
-            indicesInRowBeforeWantedIndex = [wantedIndex-numberOfColumns-1, wantedIndex-numberOfColumns, wantedIndex-numberOfColumns+1]
-            indicesInRowOfWantedIndex = [wantedIndex-1, wantedIndex+1]
-            indicesInRowAfterWantedIndex = [wantedIndex+numberOfColumns-1, wantedIndex+numberOfColumns, wantedIndex+numberOfColumns+1]
-            
-            kept_indicesInRowBeforeWantedIndex = [index  for index in indicesInRowBeforeWantedIndex  if rowOfIndexFunc(index) ==  rowOfWantedIndex-1]
-            kept_indicesInRowOfWantedIndex = [index2  for index2 in indicesInRowOfWantedIndex  if rowOfIndexFunc(index2) ==  rowOfWantedIndex]
-            kept_indicesInRowAfterWantedIndex = [index3  for index3 in indicesInRowAfterWantedIndex  if rowOfIndexFunc(index3) ==  rowOfWantedIndex+1]
-            mergedThreeLists_kept_indices = kept_indicesInRowBeforeWantedIndex + kept_indicesInRowOfWantedIndex + kept_indicesInRowAfterWantedIndex
-            
-            indicesRange = range(0, numberOfRows*numberOfColumns)
-            neighborIndices = [index4  for index4 in mergedThreeLists_kept_indices  if index4 in indicesRange]
-            neighboringVertexElevations = [vertexElevations[index] for index in neighborIndices]
-            neighboringVertexNormals = [vertexNormals[index] for index in neighborIndices]
-            centralVertexElevation = vertexElevations[wantedIndex]
-            centralVertexNormal = vertexNormals[wantedIndex]
-            neighboringVertexElevations_plus_centralVertexElevation = neighboringVertexElevations + [centralVertexElevation]
-            neighboringVertexNormals_plus_centralVertexNormal = neighboringVertexNormals + [centralVertexNormal]
-            
-            TRI_rhinoUnits = math.sqrt( sum([(centralVertexElevation-ptsZ)**2  for ptsZ in neighboringVertexElevations]) )  # in rhino document units
-            TRI_List.append(TRI_rhinoUnits)
-            
-            TRI_category = calculate_TRI_category(TRI_rhinoUnits)  # unitless
-            TRI_category_List.append(TRI_category)
-            
-            SRF_unitless = math.sqrt( (sum([normal.X  for normal in neighboringVertexNormals_plus_centralVertexNormal]))**2 + (sum([normal.Y  for normal in neighboringVertexNormals_plus_centralVertexNormal]))**2 + (sum([normal.Z  for normal in neighboringVertexNormals_plus_centralVertexNormal]))**2 ) / len(neighboringVertexElevations_plus_centralVertexElevation)  # unitless
-            SRF_List.append(SRF_unitless)
-            
-            TPI_rhinoUnits = centralVertexElevation - sum(neighboringVertexElevations)/len(neighboringVertexElevations)  # in rhino document units
-            averageVertexElevations = sum(neighboringVertexElevations_plus_centralVertexElevation) / len(neighboringVertexElevations_plus_centralVertexElevation)
-            TPI2 = (averageVertexElevations - min(neighboringVertexElevations_plus_centralVertexElevation)) / (max(neighboringVertexElevations_plus_centralVertexElevation) - min(neighboringVertexElevations_plus_centralVertexElevation))  # unitless, also called ERR (Elevation–Relief Ratio (Pike and Wilson, 1971)), source: Olaya, V. 2009: Basic land-surface parameters. In: Geomorphometry, Hengl, T. & Reuter, H. I.
-            #TPI_List.append(TPI_rhinoUnits)
-            TPI_List.append(TPI2)
-            """
-            # TPI cagories
-            averageElevationOfCellsWindow = sum(neighboringVertexElevations_plus_centralVertexElevation) / len(neighboringVertexElevations_plus_centralVertexElevation)
-            SD = math.sqrt(  sum( [(elevation - averageElevationOfCellsWindow)**2  for elevation in neighboringVertexElevations_plus_centralVertexElevation] ) / (len(neighboringVertexElevations_plus_centralVertexElevation) - 1)  )  # standard deviation of the elevation, in rhino document units
-            projectedCentralVertexNormal = Rhino.Geometry.Vector3d(centralVertexNormal.X, centralVertexNormal.Y, 0)
-            slopeAngleR = math.radians(90) - Rhino.Geometry.Vector3d.VectorAngle(centralVertexNormal, projectedCentralVertexNormal)
-            slopeAngleD = math.degrees(slopeAngleR)
-            TPI_category = calculate_TPI_category(TPI_rhinoUnits, SD, slopeAngleD)  # unitless
-            TPI_category_List.append(TPI_category)
-            """
-        
-        if (analysisType == 6):
-            colors = gismo_preparation.numberToColor(TRI_List, customColors, minValue, maxValue)
-            terrainMesh_colored = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, ptsOnTerrainSrf, colors)
-            del terrainMesh_vertices; del ptsOnTerrainSrf; del colors; del TRI_category_List; del SRF_List; del TPI_List
+            if not srfPointGrids.has_key(gridSize):
+                # generates points on terrainSrf (ptsOnTerrainSrf) and its elevation values (vertexElevations). They are used to calculate TRI, TRI categories and TPI after that
+                uDomain = terrainSrf.Domain(0)
+                vDomain = terrainSrf.Domain(1)
+                
+                ptsOnTerrainSrf = []  # to create the mesh by gismo_geometry.meshFromPoints
+                vertexElevations = []
+                vertexNormalsX = []; vertexNormalsY = []; vertexNormalsZ = []
+                for i in xrange(rows):
+                    u = uDomain.ParameterAt(i/float(rows-1))
+                    for k in xrange(columns):
+                        v = vDomain.ParameterAt(k/float(columns-1))
+                        pt = terrainSrf.PointAt(u,v)
+                        ptsOnTerrainSrf.append(pt)
+                        vertexElevations.append((pt.Z-originPt.Z)+originPtElevation)
+                        surfaceNormal = terrainSrf.NormalAt(u,v)
+                        surfaceNormal.Unitize()
+                        vertexNormalsX.append(surfaceNormal.X); vertexNormalsY.append(surfaceNormal.Y); vertexNormalsZ.append(surfaceNormal.Z)
+                # end of generation of points on terrainSrf (ptsOnTerrainSrf) and its elevation values (vertexElevations)
+                srfPointGrids[gridSize] = [ptsOnTerrainSrf, vertexElevations, vertexNormalsX, vertexNormalsY, vertexNormalsZ]
+            ptsOnTerrainSrf, vertexElevations, vertexNormalsX, vertexNormalsY, vertexNormalsZ = srfPointGrids[gridSize]
             
-            return terrainMesh_colored, TRI_List, TRI_List
-        elif (analysisType == 7):
-            colors = gismo_preparation.numberToColor(TRI_category_List, customColors, minValue, maxValue)
-            terrainMesh_colored = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, ptsOnTerrainSrf, colors)
-            del terrainMesh_vertices; del ptsOnTerrainSrf; del colors; del TRI_List; del SRF_List; del TPI_List
+            if (analysisType == 12) or (analysisType == 13):
+                # TPI for small and large neighbourhoods, and landforms
+                # based on: "Topographic Position and Landforms Analysis", A. Weiss, poster presentation, ESRI User Conference, 2001
+                # average horizontal (XY) spacing of the grid points along its columns and along its rows. Distances along the slope would be too large on steep terrain, and shrink the neighbourhoods below the "TPIradii_"
+                columnSpacing = sum([math.hypot(ptsOnTerrainSrf[i*columns + k+1].X - ptsOnTerrainSrf[i*columns + k].X, ptsOnTerrainSrf[i*columns + k+1].Y - ptsOnTerrainSrf[i*columns + k].Y)  for i in xrange(rows)  for k in xrange(columns-1)]) / (rows*(columns-1))
+                rowSpacing = sum([math.hypot(ptsOnTerrainSrf[(i+1)*columns + k].X - ptsOnTerrainSrf[i*columns + k].X, ptsOnTerrainSrf[(i+1)*columns + k].Y - ptsOnTerrainSrf[i*columns + k].Y)  for i in xrange(rows-1)  for k in xrange(columns)]) / ((rows-1)*columns)
+                for scale, defaultOuterRadiusCells in [(0, 3), (1, 10)]:
+                    if (TPIneighbourhoods[scale] == None) and ((scale == 0) or (analysisType == 13)):
+                        innerRadiusM, outerRadiusM = TPIradiiM[scale*2:scale*2+2]
+                        innerRadius = innerRadiusM/unitConversionFactor  # in rhino document units
+                        if (outerRadiusM == None):
+                            outerRadius = defaultOuterRadiusCells * max(columnSpacing, rowSpacing)
+                        else:
+                            outerRadius = outerRadiusM/unitConversionFactor
+                        TPIneighbourhoods[scale] = gismo_terrain.topographicPositionIndices(vertexElevations, rows, columns, columnSpacing, rowSpacing, innerRadius, outerRadius, TPIcircular)
+                
+                if (analysisType == 12):
+                    values = TPIneighbourhoods[0][0]
+                elif (analysisType == 13):
+                    slopesD = [math.degrees(math.acos(min(abs(normalZ), 1)))  for normalZ in vertexNormalsZ]
+                    values = gismo_terrain.landforms(TPIneighbourhoods[0][1], TPIneighbourhoods[1][1], slopesD)
+                    del slopesD
             
-            return terrainMesh_colored, TRI_category_List, TRI_category_List
-        elif (analysisType == 8):
-            colors = gismo_preparation.numberToColor(SRF_List, customColors, minValue, maxValue)
-            terrainMesh_colored = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, ptsOnTerrainSrf, colors)
-            del terrainMesh_vertices; del ptsOnTerrainSrf; del colors; del TRI_List; del TRI_category_List; del TPI_List
+            else:
+                # TRI, TRI categories, SRF, TPI
+                # based on: http://download.osgeo.org/qgis/doc/reference-docs/Terrain_Ruggedness_Index.pdf
+                # http://gis.stackexchange.com/a/6059/65002
+                # https://github.com/wschwanghart/topotoolbox/blob/master/@GRIDobj/roughness.m
+                if not roughness.has_key(gridSize):
+                    # TRI, SRF, TPI (ERR) of every vertex in one pass over the grid of vertexElevations
+                    TRI_List, SRF_List, TPI_List_dummy, TPI_List = gismo_terrain.roughnessIndices(vertexElevations, vertexNormalsX, vertexNormalsY, vertexNormalsZ, rows, columns)  # TPI_List is ERR (Elevation-Relief Ratio)
+                    del TPI_List_dummy
+                    roughness[gridSize] = [TRI_List, SRF_List, TPI_List]
+                TRI_List, SRF_List, TPI_List = roughness[gridSize]
+                
+                if (analysisType == 6):
+                    values = TRI_List
+                elif (analysisType == 7):
+                    values = [calculate_TRI_category(TRI_rhinoUnits, unitConversionFactor)  for TRI_rhinoUnits in TRI_List]  # unitless
+                elif (analysisType == 8):
+                    values = SRF_List
+                elif (analysisType == 9):
+                    values = TPI_List
+            colors = gismo_preparation.numberToColor(values, customColors, minValue, maxValue)
+            terrainMesh_colored = gismo_geometry.meshFromPoints(rows, columns, ptsOnTerrainSrf, colors)
+            del colors
             
-            return terrainMesh_colored, SRF_List, SRF_List
-        elif (analysisType == 9):
-            colors = gismo_preparation.numberToColor(TPI_List, customColors, minValue, maxValue)
-            terrainMesh_colored = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, ptsOnTerrainSrf, colors)
-            del terrainMesh_vertices; del ptsOnTerrainSrf; del colors; del TRI_List; del TRI_category_List; del SRF_List
+            analysedTerrainMeshes.append([terrainMesh_colored, values, values])
+            continue
+        
+        
+        # analysisType 0 to 5, 10 and 14 to 18 on the terrainMesh
+        if (terrainMesh == None):
+            terrainMesh = Rhino.Geometry.Mesh.CreateFromBrep(terrainBrep, meshParam)[0]
+            # add "context_" to "terrainMesh"
+            appendContext(terrainMesh, contextIdL, meshParam)
+            terrainMesh_vertices = list(terrainMesh.Vertices)
+        
+        if (analysisType == 3):
+            # elevation
+            values = legendValues = [(vertex.Z-originPt.Z)+originPtElevation  for vertex in terrainMesh_vertices]  # in rhino document units
+        elif (analysisType == 4):
+            # visibility
+            values, legendValues, colors = meshVisibility(terrainMesh, terrainMesh_vertices, originPt, unitConversionFactor)
+        elif (analysisType == 18):
+            # cast shadows, by the terrainMesh and "context_"
+            values = legendValues = meshCastShadows(terrainMesh, terrainMesh_vertices, sunVectors)
+        else:
+            if (srfParameters == None):
+                # terrainSrf u,v parameters closest to each terrainMesh vertex, and terrainSrf normals at them (pointing upwards)
+                srfParameters = []
+                srfNormalsX = []; srfNormalsY = []; srfNormalsZ = []
+                for vertex in terrainMesh_vertices:
+                    success, u, v = terrainSrf.ClosestPoint(vertex)
+                    srfParameters.append((u,v))
+                    surfaceNormal = terrainSrf.NormalAt(u,v)
+                    if surfaceNormal.Z < 0:
+                        surfaceNormal.Reverse()
+                    srfNormalsX.append(surfaceNormal.X); srfNormalsY.append(surfaceNormal.Y); srfNormalsZ.append(surfaceNormal.Z)
             
-            return terrainMesh_colored, TPI_List, TPI_List
-    
-    
-    elif (analysisType == 10):
-        # mean curvature
-        MeanCurvatures = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceCurvatureParameters = terrainSrf.CurvatureAt(u,v)
-            meanCurvature = surfaceCurvatureParameters.Mean
-            MeanCurvatures.append(meanCurvature)
-        colors = gismo_preparation.numberToColor(MeanCurvatures, customColors, minValue, maxValue)
-    
-    
+            if (analysisType == 10):
+                # mean curvature
+                values = legendValues = [terrainSrf.CurvatureAt(u,v).Mean  for u,v in srfParameters]
+            elif (analysisType == 14) or (analysisType == 15) or (analysisType == 16):
+                # profile, plan, Gaussian curvature
+                values = legendValues = [surfaceCurvatures(analysisType, terrainSrf.CurvatureAt(u,v))  for u,v in srfParameters]
+            else:
+                # slope, grade, aspect, hillshade, hillshade hours
+                values = legendValues = hillshadeTypesAnalysis(analysisType, srfNormalsX, srfNormalsY, srfNormalsZ, [vertex.Z  for vertex in terrainMesh_vertices], northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, hillshades)
+        
+        if (analysisType != 4):
+            colors = gismo_preparation.numberToColor(values, customColors, minValue, maxValue)
+        # color a copy of the terrainMesh, so that the terrainMesh can be shared by the rest of analysisTypes
+        terrainMesh_colored = terrainMesh.DuplicateMesh()
+        terrainMesh_colored.VertexColors.Clear()
+        for color in colors:
+            terrainMesh_colored.VertexColors.Add(color)
+        del colors
+        
+        analysedTerrainMeshes.append([terrainMesh_colored, values, legendValues])
+    del srfGrid; del gridNormals; del gridCurvatures; del terrainMesh; del srfParameters; del srfPointGrids; del roughness; del TPIneighbourhoods; del hillshades
+    
+    return analysedTerrainMeshes
+
+
+def createCumulativeVisibilityMesh(terrainId, contextIdL, observerPts, observerHeightsM, refine, unitConversionFactor):
     
-    # color the terrainMesh with generated colors for every analysisType except 6,7,8,9 types
-    terrainMesh.VertexColors.Clear()
-    for i in xrange(len(terrainMesh_vertices)):
-        terrainMesh.VertexColors.Add(colors[i])
+    # number of observerPts which can see each terrain point, and the distance to the nearest of them
+    terrainObj = rs.coercegeometry(terrainId)
+    meshParam = Rhino.Geometry.MeshingParameters()
+    gridTerrain = False
+    if isinstance(terrainObj, Rhino.Geometry.Brep):
+        terrainBrep = terrainObj
+        terrainBrepFaces = terrainBrep.Faces
+        terrainBrepFaces.ShrinkFaces()
+        terrainSrf = terrainBrepFaces[0].DuplicateSurface()
+        
+        terrainSrfControlPtsCoordinates = [pt.Location for pt in terrainSrf.Points]
+        distanceBetweenFirstSecondControlPt = terrainSrfControlPtsCoordinates[int((len(terrainSrfControlPtsCoordinates)/2)-4)].DistanceTo(terrainSrfControlPtsCoordinates[int(len(terrainSrfControlPtsCoordinates)/2-5)])
+        bb = terrainBrep.GetBoundingBox(False)
+        numberOfRows = int( (bb.GetEdges()[1].Length/distanceBetweenFirstSecondControlPt) )
+        numberOfColumns = int( (bb.GetEdges()[0].Length/distanceBetweenFirstSecondControlPt) )
+        if refine:
+            meshParam.MaximumEdgeLength = int(distanceBetweenFirstSecondControlPt) / 2
+            numberOfRows = 2 * numberOfRows
+            numberOfColumns = 2 * numberOfColumns
+        
+        if (len(contextIdL) == 0):
+            ptsOnTerrainSrf, columnCoordinates, rowCoordinates, rowsParallelToX, gridTerrain = terrainSrfGrid(terrainSrf, numberOfRows, numberOfColumns)
+    
+    # visibility of terrain points from each observer. The terrain (grid of heights or terrainMesh) is created only once and shared by all observers. Observers on the grid of heights are calculated in parallel, and the ones on the terrainMesh one after another: its intersection tree is built on the first intersection, and is not safe to be built from several threads at once
+    visibilities = [None] * len(observerPts)
+    liftedObserverPts = [None] * len(observerPts)
+    if gridTerrain:
+        terrainPts = ptsOnTerrainSrf
+        vertexZ = [pt.Z  for pt in ptsOnTerrainSrf]
+        def observerVisibility(observerIndex):
+            observerPt = observerPts[observerIndex]
+            if rowsParallelToX:
+                observerColumn = fractionalIndex(columnCoordinates, observerPt.X)
+                observerRow = fractionalIndex(rowCoordinates, observerPt.Y)
+            else:
+                observerColumn = fractionalIndex(columnCoordinates, observerPt.Y)
+                observerRow = fractionalIndex(rowCoordinates, observerPt.X)
+            liftedObserverPt = Rhino.Geometry.Point3d(observerPt.X, observerPt.Y, gismo_terrain.heightAt(vertexZ, numberOfRows, numberOfColumns, observerColumn, observerRow) + observerHeightsM[observerIndex]/unitConversionFactor)
+            liftedObserverPts[observerIndex] = liftedObserverPt
+            visibilities[observerIndex] = gismo_terrain.viewshed(vertexZ, numberOfRows, numberOfColumns, observerColumn, observerRow, liftedObserverPt.Z, 0.01)
+        System.Threading.Tasks.Parallel.ForEach(xrange(len(observerPts)), observerVisibility)
+    else:
+        if isinstance(terrainObj, Rhino.Geometry.Mesh):
+            terrainMesh = terrainObj.DuplicateMesh()  # mesh terrain is used as it is
+        else:
+            terrainMesh = Rhino.Geometry.Mesh.CreateFromBrep(terrainBrep, meshParam)[0]
+        appendContext(terrainMesh, contextIdL, meshParam)
+        terrainPts = list(terrainMesh.Vertices)
+        safeHeightDummy = 10000/unitConversionFactor  # in meters
+        def observerVisibility(observerIndex):
+            # project the observer to terrainMesh, and lift it for its observer height
+            observerPt = observerPts[observerIndex]
+            ray = Rhino.Geometry.Ray3d(Rhino.Geometry.Point3d(observerPt.X, observerPt.Y, (observerPt.Z+safeHeightDummy)), Rhino.Geometry.Vector3d(0,0,-1))
+            locationPt = ray.PointAt(Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray))
+            liftedObserverPt = Rhino.Geometry.Point3d(locationPt.X, locationPt.Y, locationPt.Z + observerHeightsM[observerIndex]/unitConversionFactor)
+            liftedObserverPts[observerIndex] = liftedObserverPt
+            visibility = []
+            for vertex in terrainPts:
+                liftedVertex = Rhino.Geometry.Point3d(vertex.X, vertex.Y, vertex.Z + 0.01)  # lift each mesh vertex due to Intersection.MeshLine
+                intersectionPts, intersectionFaceIndex = Rhino.Geometry.Intersect.Intersection.MeshLine(terrainMesh, Rhino.Geometry.Line(liftedObserverPt, liftedVertex))
+                visibility.append(len(intersectionPts) == 0)
+            visibilities[observerIndex] = visibility
+        for observerIndex in xrange(len(observerPts)):
+            observerVisibility(observerIndex)
+    
+    visibilityCounts = []
+    nearestVisibleDistances = []
+    for index,pt in enumerate(terrainPts):
+        visibilityCount = 0
+        nearestVisibleDistance = 0  # if terrain point can not be seen from any observer, then set the distance to 0
+        for observerIndex in xrange(len(observerPts)):
+            if visibilities[observerIndex][index]:
+                visibilityCount += 1
+                distanceRhinoUnits = liftedObserverPts[observerIndex].DistanceTo(Rhino.Geometry.Point3d(pt))
+                if (nearestVisibleDistance == 0) or (distanceRhinoUnits < nearestVisibleDistance):
+                    nearestVisibleDistance = distanceRhinoUnits
+        visibilityCounts.append(visibilityCount)
+        nearestVisibleDistances.append(nearestVisibleDistance)
+    
+    # terrain points which can not be seen from any observer are gray colored
+    legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, legendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
+    visibilityCounts_seen = [visibilityCount  for visibilityCount in visibilityCounts  if visibilityCount > 0]
+    if len(visibilityCounts_seen) == 0:  # fix when all terrain points can not be seen
+        visibilityCounts_seen = [0]
+    colors_seen = gismo_preparation.numberToColor(visibilityCounts_seen, customColors, minValue, maxValue)
+    colors = []
+    seenIndex = 0
+    for visibilityCount in visibilityCounts:
+        if visibilityCount > 0:
+            colors.append(colors_seen[seenIndex])
+            seenIndex += 1
+        else:
+            colors.append(System.Drawing.Color.FromArgb(70,70,70))  # set it to gray color
     
+    if gridTerrain:
+        terrainMesh = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, terrainPts, colors)
+    else:
+        terrainMesh.VertexColors.Clear()
+        for color in colors:
+            terrainMesh.VertexColors.Add(color)
+    del colors
     
-    #terrainMesh, values, legend values
-    if (analysisType == 0):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, slopeAngles, slopeAngles
-    elif (analysisType == 1):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, gradePercents, gradePercents
-    elif (analysisType == 2):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, slopeDirections, slopeDirections
-    elif (analysisType == 3):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, elevations, elevations
-    elif (analysisType == 4):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, distanceToEachMeshVertex_all, distanceToEachMeshVertex_notHitted
-    elif (analysisType == 5):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, hypsometricallyShadedHillshadeL, hypsometricallyShadedHillshadeL
-    elif (analysisType == 10):
-        del terrainMesh_vertices; del colors
-        return terrainMesh, MeanCurvatures, MeanCurvatures
+    return terrainMesh, visibilityCounts, visibilityCounts_seen, nearestVisibleDistances
 
 
 def joinTerrainStand_withTerrainMesh(terrainId, terrainMesh):
     
     terrainBrep = rs.coercegeometry(terrainId)
+    if isinstance(terrainBrep, Rhino.Geometry.Mesh):
+        # mesh terrain: its stand (if there is one) is already a part of the analysed terrainMesh
+        return terrainMesh
+    
     terrainBrepFaces = list(terrainBrep.Faces)
     if len(terrainBrepFaces) > 1:
         # inputted _terrain has a stand
@@ -910,16 +1489,30 @@ def joinTerrainStand_withTerrainMesh(terrainId, terrainMesh):
         return terrainMesh
 
 
-def createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVector, hypsometricStrength, refine, unitSystem, legendUnit):
+def createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVectors, hypsometricStrength, hillshadeThreshold, TPIradiiM, TPIcircular, refine, unitSystem, legendUnit):
     
     # extract data from legendBakePar_
     legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, customLegendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
     
     # title
-    if (analysisType == 5):
-        titleLabelText = "Terrain %s analysis\nsunVector: (%0.2f,%0.2f,%0.2f), hypsoStrength: %s\nnorth: %s, refine: %s" % (analysisTypeLabel, sunVector.X, sunVector.Y, sunVector.Z, str(hypsometricStrength), str(northD), refine)
+    if (analysisType == 5) and (len(sunVectors) == 1):
+        titleLabelText = "Terrain %s analysis\nsunVector: (%0.2f,%0.2f,%0.2f), hypsoStrength: %s\nnorth: %s, refine: %s" % (analysisTypeLabel, sunVectors[0].X, sunVectors[0].Y, sunVectors[0].Z, str(hypsometricStrength), str(northD), refine)
+    elif (analysisType == 5):
+        titleLabelText = "Terrain %s analysis\nmean of %s sunVectors, hypsoStrength: %s\nnorth: %s, refine: %s" % (analysisTypeLabel, len(sunVectors), str(hypsometricStrength), str(northD), refine)
+    elif (analysisType == 17):
+        titleLabelText = "Terrain %s analysis\n%s sunVectors, hillshadeThreshold: %s, hypsoStrength: %s\nnorth: %s, refine: %s" % (analysisTypeLabel, len(sunVectors), hillshadeThreshold, str(hypsometricStrength), str(northD), refine)
+    elif (analysisType == 18) and (len(sunVectors) == 1):
+        titleLabelText = "Terrain %s analysis\nsunVector: (%0.2f,%0.2f,%0.2f)\nnorth: %s, refine: %s" % (analysisTypeLabel, sunVectors[0].X, sunVectors[0].Y, sunVectors[0].Z, str(northD), refine)
+    elif (analysisType == 18):
+        titleLabelText = "Terrain %s analysis\n%s sunVectors\nnorth: %s, refine: %s" % (analysisTypeLabel, len(sunVectors), str(northD), refine)
+    elif (analysisType == 12) or (analysisType == 13):
+        TPIradiiLabel = ", ".join([str(TPIradius) if (TPIradius != None) else "default"  for TPIradius in (TPIradiiM[:2] if (analysisType == 12) else TPIradiiM)])
+        titleLabelText = "%s analysis\nnorth: %s, refine: %s, %s TPIradii: %s" % (analysisTypeLabel, northD, refine, "circular" if TPIcircular else "rectangular", TPIradiiLabel)
     elif (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9):
-        titleLabelText = "%s analysis\nnorth: %s, refine: %s, for fixed 3x3 cells window" % (analysisTypeLabel, northD, refine)
+        if isinstance(rs.coercegeometry(_terrain), Rhino.Geometry.Mesh):
+            titleLabelText = "%s analysis\nnorth: %s, for each vertex and its neighbouring vertices" % (analysisTypeLabel, northD)
+        else:
+            titleLabelText = "%s analysis\nnorth: %s, refine: %s, for fixed 3x3 cells window" % (analysisTypeLabel, northD, refine)
     else:
         titleLabelText = "Terrain %s analysis\nnorth: %s, refine: %s" % (analysisTypeLabel, northD, refine)
     
@@ -938,12 +1531,18 @@ def createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues,
     return titleLabelMesh, legendMesh, legendStartPlane
 
 
-def bakingGrouping(analysisType, analysisTypeLabel, terrainMesh_withWithoutStand, titleLabelMesh, legendMesh, legendStartPlane, originPt):
+def bakingGrouping(analysisType, analysisTypeLabel, terrainMesh_withWithoutStand, titleLabelMesh, legendMesh, legendStartPlane, originPt, northD, sunVectors, hypsometricStrength, refine):
     
     # baking
-    if (analysisType == 5):
+    if (analysisType == 5) and (len(sunVectors) == 1):
         # for Hillshade
-        layerName = "%s_north=%s_refine=%s_sunVector=%0.2f,%0.2f,%0.2f_hypsoStrength=%s" % (analysisTypeLabel, northD, refine, sunVector.X, sunVector.Y, sunVector.Z, hypsometricStrength)
+        layerName = "%s_north=%s_refine=%s_sunVector=%0.2f,%0.2f,%0.2f_hypsoStrength=%s" % (analysisTypeLabel, northD, refine, sunVectors[0].X, sunVectors[0].Y, sunVectors[0].Z, hypsometricStrength)
+    elif (analysisType == 5) or (analysisType == 17):
+        # for Hillshade of more than one sunVector, and Hillshade hours
+        layerName = "%s_north=%s_refine=%s_sunVectors=%s_hypsoStrength=%s" % (analysisTypeLabel, northD, refine, len(sunVectors), hypsometricStrength)
+    elif (analysisType == 18):
+        # for Cast shadows
+        layerName = "%s_north=%s_refine=%s_sunVectors=%s" % (analysisTypeLabel, northD, refine, len(sunVectors))
     else:
         layerName = "%s_north=%s_refine=%s" % (analysisTypeLabel, northD, refine)
     
@@ -964,7 +1563,7 @@ def bakingGrouping(analysisType, analysisTypeLabel, terrainMesh_withWithoutStand
     groupIndex2 = gismo_preparation.groupGeometry(layerName + "_terrainAnalysis_" + analysisTypeLabel, geometryIds2)
 
 
-def printOutput(analysisType, analysisTypeLabel, originPt, originPtElevation, northD, sunVector, hypsometricStrength, refine, unitSystem):
+def printOutput(analysisType, analysisTypeLabel, originPt, originPtElevation, northD, sunVectors, hypsometricStrength, refine, unitSystem):
     if bakeIt_ == True:
         bakedOrNot = "and baked "
     elif bakeIt_ == False:
@@ -982,7 +1581,7 @@ North (deg.): %s
 SunVector: %s
 Hypsometric strength: %s
 Refine: %s
-    """ % (analysisType, analysisTypeLabel, originPt, unitSystem, originPtElevation, northD, sunVector, hypsometricStrength, refine)
+    """ % (analysisType, analysisTypeLabel, originPt, unitSystem, originPtElevation, northD, sunVectors[0] if (len(sunVectors) == 1) else "%s vectors" % len(sunVectors), hypsometricStrength, refine)
     print resultsCompletedMsg
     print printOutputMsg
 
@@ -994,17 +1593,39 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_mainComponent = sc.sticky["gismo_mainComponent"]()
         gismo_preparation = sc.sticky["gismo_Preparation"]()
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
-        
-        analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg = checkInputData(_analysisType, _terrain, _origin, _elevation, north_, sunVector_, hypsoStrength_, refine_)
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
+        
+        try:  # check if it's a list of numbers
+            analysisTypes = [analysisType  for analysisType in _analysisType  if analysisType != None]
+        except Exception, e:  # a single number
+            analysisTypes = [_analysisType]
+        if (len(analysisTypes) == 0):
+            analysisTypes = [None]
+        
+        analysisTypeLabels = []; legendUnits = []
+        for analysisType in analysisTypes:
+            analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, refine, observerPts, observerHeightsM, TPIradiiM, TPIcircular, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg = checkInputData(analysisType, _terrain, _origin, _elevation, north_, sunVector_, hypsoStrength_, hillshadeThreshold_, hillshadeFile_, observers_, observerHeights_, TPIradii_, TPIwindow_, refine_)
+            if not validInputData:
+                break
+            analysisTypeLabels.append(analysisTypeLabel); legendUnits.append(legendUnit)
         if validInputData:
-            createOutputDescriptions(analysisType, unitSystem)
+            createOutputDescriptions(analysisTypes, unitSystem)
             if _runIt:
-                terrainMesh, values, legendValues = createAnalysedTerrainMesh(analysisType, _terrain, originPt, originPtElevation, context_, northRad, sunVector, hypsometricStrength, refine, exportValues, unitConversionFactor)
-                terrainMesh_withWithoutStand = joinTerrainStand_withTerrainMesh(_terrain, terrainMesh)
-                titleLabelMesh, legendMesh, legendPlane = createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVector, hypsometricStrength, refine, unitSystem, legendUnit)
-                if bakeIt_: bakingGrouping(analysisType, analysisTypeLabel, terrainMesh_withWithoutStand, titleLabelMesh, legendMesh, legendPlane, originPt)
-                printOutput(analysisType, analysisTypeLabel, originPt, originPtElevation, northD, sunVector, hypsometricStrength, refine, unitSystem)
-                analysedTerrain = terrainMesh_withWithoutStand; origin = originPt; title = titleLabelMesh; legend = legendMesh; del legendValues;
+                # all analysis types except Cumulative visibility are calculated in one pass
+                analysedTerrainMeshes = createAnalysedTerrainMesh([analysisType  for analysisType in analysisTypes  if analysisType != 11], _terrain, originPt, originPtElevation, context_, northRad, sunVectors, hypsometricStrength, hillshadeThreshold, hillshadeFilePath, TPIradiiM, TPIcircular, refine, exportValues, unitConversionFactor)
+                analysedTerrain = []; values = Grasshopper.DataTree[object](); title = []; legend = []; legendPlane = []; nearestVisibleDistance = Grasshopper.DataTree[object]()
+                for index, analysisType in enumerate(analysisTypes):
+                    if (analysisType == 11):
+                        terrainMesh, analysisValues, legendValues, nearestVisibleDistances = createCumulativeVisibilityMesh(_terrain, context_, observerPts, observerHeightsM, refine, unitConversionFactor)
+                        nearestVisibleDistance.AddRange(nearestVisibleDistances, Grasshopper.Kernel.Data.GH_Path(index))
+                    else:
+                        terrainMesh, analysisValues, legendValues = analysedTerrainMeshes.pop(0)
+                    terrainMesh_withWithoutStand = joinTerrainStand_withTerrainMesh(_terrain, terrainMesh)
+                    titleLabelMesh, legendMesh, legendStartPlane = createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabels[index], northD, sunVectors, hypsometricStrength, hillshadeThreshold, TPIradiiM, TPIcircular, refine, unitSystem, legendUnits[index])
+                    if bakeIt_: bakingGrouping(analysisType, analysisTypeLabels[index], terrainMesh_withWithoutStand, titleLabelMesh, legendMesh, legendStartPlane, originPt, northD, sunVectors, hypsometricStrength, refine)
+                    analysedTerrain.append(terrainMesh_withWithoutStand); values.AddRange(analysisValues, Grasshopper.Kernel.Data.GH_Path(index)); title.append(titleLabelMesh); legend.append(legendMesh); legendPlane.append(legendStartPlane)
+                printOutput(", ".join([str(analysisType)  for analysisType in analysisTypes]), ", ".join(analysisTypeLabels), originPt, originPtElevation, northD, sunVectors, hypsometricStrength, refine, unitSystem)
+                origin = originPt; del analysedTerrainMeshes; del analysisValues; del legendValues;
             else:
                 print "All inputs are ok. Please set \"_runIt\" to True, in order to run the Terrain analysis component"
         else:
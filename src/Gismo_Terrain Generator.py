@@ -53,12 +53,17 @@ Provided by Gismo 0.0.2
                2 - GMRT: terrain and underwater (sea/river/lake floor) terrain. Sea level is not presented. Terrain and underwater terrain resolution varies from 50 meter to 2000 meters.
                -
                If nothing supplied, 0 will be used as a default (SRTMGL1 terrain only).
-        type_: There are four terrain types:
+        type_: There are six terrain types:
                -
                0 - terrain will be created as a mesh with rectangular edges
                1 - terrain will be created as a mesh with circular edges
                2 - terrain will be created as a surface with rectangular edges
                3 - terrain will be created as a surface with circular edges
+               4 - terrain will be created as an adaptive mesh with rectangular edges
+               5 - terrain will be created as an adaptive mesh with circular edges
+               -
+               Adaptive meshes have large triangles where the terrain is flat, and small ones where it is not. They usually have many times fewer faces than meshes 0 and 1, which speeds up all the components which use the terrain afterwards.
+               Their deviation from the topography data is set by the tinTolerance_ input.
                -
                If nothing supplied, 1 will be used as a default (terrain will be created as a mesh with circular edges).
         origin_: Origin for the final "terrain" output.
@@ -74,10 +79,27 @@ Provided by Gismo 0.0.2
                          -
                          In Rhino document units.
         numOfContours_: Number of elevation contours.
+                        Elevation contours are traced directly from the topography data (for surface terrains: from the heights of the fitted surface, so that the contours lie on it), so even hundreds of them are created quickly, for any type_.
                         If you would not like the elevationContours output to be calculated, set the numOfContours_ input to 0.
                         -
                         If not supplied, default value of 10 elevation contours will be used.
-        legendBakePar_: In case your type_ input is set to 0 or 1, you can use the legendBakePar_ input to control the colors with which the final "terrain" mesh will be colored with based on elevation.
+        horizonMapSectors_: Number of azimuth sectors for which the horizon angles of every terrain grid cell will be calculated. For example 36 sectors means azimuths: 0, 10, 20... 350 degrees.
+                            The result (horizon map) is saved to the gismoFolder_ and its file path is given by the "horizonMap" output. Plug it into the "horizonMap_" input of the "Horizon Angles" component, to get the horizon angles of any number of points on the terrain instantly, without using the "Terrain Shading Mask" component for each point.
+                            Already calculated horizon maps are reused from the gismoFolder_.
+                            -
+                            If not supplied, or set to 0, no horizon map will be calculated.
+        tinTolerance_: The largest vertical deviation of the adaptive mesh (type_ = 4 and 5) from the topography data.
+                       Larger values create terrain meshes with fewer faces. The number of vertices of the mesh is reported in the "readMe!" output.
+                       -
+                       If not supplied, default value of 1 meter will be used.
+                       -
+                       In meters.
+        surfaceControlPoints_: Approximate number of control points of the terrain surface (type_ = 2 and 3).
+                               The surface is fitted to the topography data (least squares), instead of being created through every one of its points. Lower values create lighter surfaces, which speeds up all the components which use the terrain afterwards.
+                               The largest deviation of the surface from the topography data is reported in the "readMe!" output.
+                               -
+                               If not supplied, default value of 10000 control points will be used.
+        legendBakePar_: In case your type_ input is set to 0, 1, 4 or 5, you can use the legendBakePar_ input to control the colors with which the final "terrain" mesh will be colored with based on elevation.
                         Use Gismo "Legend Bake Parameters" component's "customColors_" input to control these colors.
                         Also use its fontName_ and fontSize_ inputs to change the font, size of the "title" output.
         bakeIt_: Set to "True" to bake the terrain geometry into the Rhino scene.
@@ -90,7 +112,7 @@ Provided by Gismo 0.0.2
         readMe!: ...
         terrain: The geometry of the terrain.
                  -
-                 Depening on the type_ input it will be either a mesh (type_ = 0 and 1) or a surface (type_ = 2 and 3)
+                 Depening on the type_ input it will be either a mesh (type_ = 0, 1, 4 and 5) or a surface (type_ = 2 and 3)
         origin: The origin (center) point of the "terrain" geometry. It's the same as "origin_" input point.
                 -
                 Use grasshopper's "Point" parameter to visualize it.
@@ -102,15 +124,22 @@ Provided by Gismo 0.0.2
         elevationContours: Elevation contours.
                            Their number is defined by the numOfContours_ input. Set the numOfContours_ input to 0, if you would not like the elevationContours to be created.
         title: Title geometry with information about location, radius, north angle.
+        horizonMap: File path of the horizon map (horizon angles of every terrain grid cell, for "horizonMapSectors_" number of azimuths).
+                    -
+                    Plug it into the "horizonMap_" input of the "Horizon Angles" component.
+        elevationSampler: Elevations of the terrain, for any number of points.
+                          Plug it into the "elevationSampler_" input of the "Z To Elevation" component, to get the elevations of the terrain below thousands of points instantly, without intersecting the terrain geometry.
+                          -
+                          Elevations are interpolated (bilinearly) from the topography data.
 """
 
 ghenv.Component.Name = "Gismo_Terrain Generator"
 ghenv.Component.NickName = "TerrainGenerator"
-ghenv.Component.Message = "VER 0.0.2\nJUN_16_2017"
+ghenv.Component.Message = "VER 0.0.2\nOCT_18_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.2\nMAY_05_2017
+#compatibleGismoVersion = VER 0.0.2\nOCT_18_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "1"
 except: pass
 
@@ -129,7 +158,7 @@ import os
 import gc
 
 
-def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _type, origin, north, standThickness, numOfContours, downloadTSVLink):
+def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _type, origin, north, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, downloadTSVLink):
     
     # check if MapWinGIS is properly installed
     gismoGismoComponentNotRan = False  # initial value
@@ -137,8 +166,8 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
         mapFolder_ = sc.sticky["gismo_mapwingisFolder"]
         iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, validInputData, printMsg = gismo_mainComponent.mapWinGIS(mapFolder_)
         if not validInputData:
-            maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
-            return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+            maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+            return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
         if sc.sticky.has_key("MapWinGIS"):
             global MapWinGIS
             import MapWinGIS
@@ -148,10 +177,10 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
         gismoGismoComponentNotRan = True
     
     if (gismoGismoComponentNotRan == True):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
         validInputData = False
         printMsg = "The \"Gismo Gismo\" component has not been run. Run it before running this component."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
     
     
     # check inputs
@@ -185,10 +214,14 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
         typeLabel = "surface-rectangular"
     elif (_type == 3):
         typeLabel = "surface-circular"
-    elif (_type < 0) or (_type > 3):
+    elif (_type == 4):
+        typeLabel = "adaptive mesh-rectangular"
+    elif (_type == 5):
+        typeLabel = "adaptive mesh-circular"
+    elif (_type < 0) or (_type > 5):
         _type = 0
         typeLabel = "mesh-rectangular"
-        print "type_ input only supports values 0 to 3.\n" + \
+        print "type_ input only supports values 0 to 5.\n" + \
               "type_ input set to 0 (mesh-rectangular)."
     
     
@@ -213,22 +246,48 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
               "numOfContours_ input set to 0 (no elevation contours will be created)."
     
     
+    if (horizonMapSectors == None):
+        horizonMapSectors = 0  # default, no horizon map
+    elif (horizonMapSectors < 0) or (horizonMapSectors > 360):
+        horizonMapSectors = 0
+        print "horizonMapSectors_ input only supports values from 0 (no horizon map) to 360.\n" + \
+              "horizonMapSectors_ input set to 0 (no horizon map will be calculated)."
+    else:
+        horizonMapSectors = int(horizonMapSectors)
+    
+    
+    if (tinToleranceM == None):
+        tinToleranceM = 1  # default in meters
+    elif (tinToleranceM < 0):
+        tinToleranceM = 1
+        print "tinTolerance_ input can not be lower than 0.\n" + \
+              "tinTolerance_ input set to 1 meter."
+    
+    
+    if (surfaceControlPoints == None):
+        surfaceControlPoints = 10000  # default
+    elif (surfaceControlPoints < 16):
+        surfaceControlPoints = 16
+        print "surfaceControlPoints_ input can not be lower than 16.\n" + \
+              "surfaceControlPoints_ input set to 16."
+    
+    
     if (maxVisibilityRadiusM == None):
         maxVisibilityRadiusM = 200  # default in meters
     elif (maxVisibilityRadiusM >= 20) and (maxVisibilityRadiusM < 200):
         maxVisibilityRadiusM = 200  # values less than 150m can download invalid .tif file from opentopography.org. So the .tif file will always be downloaded with the minimal radius of 200 meters
     elif (maxVisibilityRadiusM < 20):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
         validInputData = False
         printMsg = "radius_ input only supports values equal or larger than 20 meters."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
     elif (maxVisibilityRadiusM > 100000):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
         validInputData = False
         printMsg = "Radii longer than 100 000 meters (100 kilometers) are not supported, due to possibility of crashing the Rhino.\n" + \
                    " \n" + \
                    "ATTENTION!!! Have in mind that even radii of a couple of thousands of meters may require stronger PC configurations and 64 bit version of Rhino 5. Otherwise Rhino 5 may crash."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
     
     #arcAngleD = math.degrees( math.atan( maxVisibilityRadiusM / (6371000+elevation) ) )  # assumption of Earth being a sphere
     #arcLength = (arcAngleD*math.pi*R)/180
@@ -237,12 +296,12 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
     
     if (source == 2)  and  ((locationLatitudeD < -55) or (locationLatitudeD > 59)):
         # SRTMGL1 is limited to -56 to 60 latitude
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
         validInputData = False
         printMsg = "The \"source_ = 2\" input (SRTMGL1) has range limits: from -55 South to 59 North latitude.\n" + \
                    "\"location_\" you chose exceeds these limits.\n" + \
                    "Try using either \"source_ = 0\" input or \"source_ = 1\" inputs, which have higher range limits (both from -81 South to 81 North latitude)."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
     
     
     
@@ -253,10 +312,10 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+                maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
                 validInputData = False
                 printMsg = "Please input north angle value from 0 to 360."
-                return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+                return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -271,12 +330,12 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
     workingSubFolderPath = os.path.join(gismoFolderPath, "terrain_files")
     folderCreatedSuccess = gismo_preparation.createFolder(workingSubFolderPath)
     if folderCreatedSuccess == False:
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = horizonMapSectors = tinToleranceM = surfaceControlPoints = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
         validInputData = False
         printMsg = "The file path you added to \"gismoFolder_\" input of Gismo Gismo component is invalid.\n" + \
                    "Input the string in the following format (example): c:\someFolder\gismo.\n" + \
                    "Or do not input anything, in which case a default Gismo folder will be used instead: C:\gismo."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
     
     if downloadTSVLink == None:
         downloadTSVLink = "https://raw.githubusercontent.com/stgeorges/terrainShadingMask/master/objFiles/0_terrain_shading_masks_download_links.tsv"
@@ -290,7 +349,7 @@ def checkInputData(locationLatitudeD, maxVisibilityRadiusM, gridSize, source, _t
     validInputData = True
     printMsg = "ok"
     
-    return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+    return maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
 
 
 def distanceBetweenTwoPoints(latitude1D, longitude1D, maxVisibilityRadiusM):
@@ -480,15 +539,11 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
     fileName2 = fileNameIncomplete + "_visibility=" + str(round(maxVisibilityRadiusM/1000, 2)) + "KM" + "_source=" + sourceLabel
     objFileNamePlusExtension = fileName + "_" + maskStyleLabel + ".obj"
     rasterFileNamePlusExtension = fileName2 + ".tif"
-    rasterReprojectedFileNamePlusExtension = fileName2 + "_reprojected" + ".tif"
     tsvFileNamePlusExtension = "0_terrain_shading_masks_download_links" + ".tsv"
-    vrtFileNamePlusExtension = fileName + "_" + maskStyleLabel + "_reprojected" + ".vrt"
     
     objFilePath = os.path.join(workingSubFolderPath, objFileNamePlusExtension)
     rasterFilePath = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension)
-    rasterReprojectedFilePath = os.path.join(workingSubFolderPath, rasterReprojectedFileNamePlusExtension)
     tsvFilePath = os.path.join(workingSubFolderPath, tsvFileNamePlusExtension)
-    vrtFilePath = os.path.join(workingSubFolderPath, vrtFileNamePlusExtension)
     
     
     # chronology labels:  I, II, 1, 2, A, B, a, b
@@ -620,30 +675,37 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                     latitudeTopD, dummyLongitudeTopD, latitudeBottomD, dummyLongitudeBottomD, dummyLatitudeLeftD, longitudeLeftD, dummyLatitudeRightD, longitudeRightD = gismo_gis.destinationLatLon(locationLatitudeD, locationLongitudeD, correctedMaskRadiusM)
                     # generate download link for raster region
                     
+                    # new rasterFileNamePlusExtension and rasterFilePath corrected according to new correctedMaskRadiusM
+                    rasterFileNamePlusExtension_withCorrectedMaskRadiusKM = fileNameIncomplete + "_visibility=" + str(round(maxVisibilityRadiusM/1000, 2)) + "KM" + "_source=" + sourceLabel + ".tif"  # IMPORTANT: rasterFileNamePlusExtension_withCorrectedMaskRadiusKM will always be used instead of rasterFilePath from line 647 !!!
+                    rasterFilePath_withCorrectedMaskRadiusKM = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension_withCorrectedMaskRadiusKM)
+                    
                     if source == 0:
-                        # based on: http://www.opentopography.org/developers
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "http://opentopo.sdsc.edu/otr/getdem?demtype=SRTMGL1&west=%s&south=%s&east=%s&north=%s&outputFormat=GTiff" % (longitudeLeftD,latitudeBottomD,longitudeRightD,latitudeTopD)  # SRTM 1 arc second
+                        # assembled from the local 1x1 degree tiles store. Only the missing tiles are downloaded
+                        tifFileDownloaded, skippedTileNames = gismo_gis.rasterFromDEMtiles("SRTMGL1", latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD, rasterFilePath_withCorrectedMaskRadiusKM)  # SRTM 1 arc second
                     elif source == 1:
-                        # based on: http://www.opentopography.org/developers
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "http://opentopo.sdsc.edu/otr/getdem?demtype=AW3D30&west=%s&south=%s&east=%s&north=%s&outputFormat=GTiff" % (longitudeLeftD,latitudeBottomD,longitudeRightD,latitudeTopD)  # ALOS 1 arc second (AW3D30)
+                        # assembled from the local 1x1 degree tiles store. Only the missing tiles are downloaded
+                        tifFileDownloaded, skippedTileNames = gismo_gis.rasterFromDEMtiles("AW3D30", latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD, rasterFilePath_withCorrectedMaskRadiusKM)  # ALOS 1 arc second (AW3D30)
                     elif source == 2:
                         # based on: http://www.marine-geo.org/tools/gridserverinfo.php#!/tools/getGMRTGrid
                         #downloadRasterLink_withCorrectedMaskRadiusKM = "http://www.marine-geo.org/services/GridServer?north=%s&west=%s&east=%s&south=%s&layer=topo&format=geotiff&resolution=high" % (latitudeTopD,longitudeLeftD,longitudeRightD,latitudeBottomD)  # GMRT
                         downloadRasterLink_withCorrectedMaskRadiusKM = "http://www.marine-geo.org/services/GridServer?north=%s&west=%s&east=%s&south=%s&layer=topo&format=geotiff&resolution=max" % (latitudeTopD,longitudeLeftD,longitudeRightD,latitudeBottomD)  # GMRT
-                    
-                    # new rasterFileNamePlusExtension and rasterFilePath corrected according to new correctedMaskRadiusM
-                    rasterFileNamePlusExtension_withCorrectedMaskRadiusKM = fileNameIncomplete + "_visibility=" + str(round(maxVisibilityRadiusM/1000, 2)) + "KM" + "_source=" + sourceLabel + ".tif"  # IMPORTANT: rasterFileNamePlusExtension_withCorrectedMaskRadiusKM will always be used instead of rasterFilePath from line 647 !!!
-                    rasterFilePath_withCorrectedMaskRadiusKM = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension_withCorrectedMaskRadiusKM)
-                    tifFileDownloaded = gismo_preparation.downloadFile(downloadRasterLink_withCorrectedMaskRadiusKM, rasterFilePath_withCorrectedMaskRadiusKM)
+                        tifFileDownloaded = gismo_preparation.downloadFile(downloadRasterLink_withCorrectedMaskRadiusKM, rasterFilePath_withCorrectedMaskRadiusKM)
+                        skippedTileNames = []  # a single bounding box raster
                     if tifFileDownloaded:
                         terrainShadingMask = origin_0_0_0 = None
                         valid_Obj_or_Raster_file = True
                         printMsg = "ok"
+                        if (len(skippedTileNames) > 0):
+                            # the rest of the tiles are used, and the parts of the skipped ones have no data (for example open sea)
+                            skippedTilesMsg = "The following 1x1 degree topography data tiles could not be downloaded from opentopography.org: %s.\n" % ", ".join(skippedTileNames) + \
+                                              "Their parts of the terrain have no data. If they are not supposed to be open sea (without any opentopography.org coverage), delete the \"%s\" file and rerun the component." % rasterFileNamePlusExtension_withCorrectedMaskRadiusKM
+                            print skippedTilesMsg
+                            ghenv.Component.AddRuntimeMessage(Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning, skippedTilesMsg)
                     else:
                         rasterFilePath = "download failed"
                         terrainShadingMask = origin_0_0_0 = elevationM = None
                         valid_Obj_or_Raster_file = False
-                        printMsg = "This component requires topography data to be downloaded from opentopography.org as a prerequisite for creating a terrain. It has just failed to do that. Try the following two fixes:\n" + \
+                        printMsg = "This component requires topography data to be downloaded from opentopography.org as a prerequisite for creating a terrain. It has just failed to do that" + ((" (tiles: %s)" % ", ".join(skippedTileNames)) if (len(skippedTileNames) > 0) else "") + ". Try the following two fixes:\n" + \
                                    " \n" + \
                                    "1) Sometimes due to large number of requests, the component fails to download the topography data even if opentopography.org website and their services are up and running.\n" + \
                                    "In this case, wait a couple of seconds and try reruning the component.\n" + \
@@ -661,56 +723,43 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                     #printMsg - from distanceBetweenTwoPoints function
     
     
-    return terrainShadingMask, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterReprojectedFileNamePlusExtension, vrtFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
+    return terrainShadingMask, origin_0_0_0, fileName, objFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
 
 
-def createTerrainMeshBrep(rasterFilePath, rasterReprojectedFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, unitConversionFactor2):
+def createTerrainMeshBrep(rasterFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, _type, tinToleranceM, surfaceControlPoints, origin, northRad, unitConversionFactor2):
     
     # create "terrainMesh" and "terrrainBrep" from Opentopography data
     
     # output crs data: outputCRS_UTMzone, northOrsouth
     CRS_EPSG_code, outputCRS_UTMzone, northOrsouth = gismo_gis.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
     
-    # reproject raster
-    utils = MapWinGIS.UtilsClass()
-    resamplingMethod = "-r bilinear"
-    bstrOptions = '-s_srs EPSG:4326 -t_srs "+proj=utm +zone=%s +%s +datum=WGS84 +ellps=WGS84" %s' % (outputCRS_UTMzone, northOrsouth, resamplingMethod)
-    reprojectGridResult = MapWinGIS.UtilsClass.GDALWarp(utils, rasterFilePath, rasterReprojectedFilePath, bstrOptions, None)
-    if (reprojectGridResult != True):
-        convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-        convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-        convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-        print "convertErrorNo: ", convertErrorNo
-        print "convertErrorMsg: ", convertErrorMsg
-        print "convertErrorType: ", convertErrorType
-    
-    # open the reprojected raster
-    grid = MapWinGIS.GridClass()
-    dataType = MapWinGIS.GridDataType.DoubleDataType
-    fileTypeExtension = MapWinGIS.GridFileType.UseExtension
-    inRam = True
-    openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterReprojectedFilePath, dataType, inRam, fileTypeExtension, None)
-    if (openGridSuccess != True):
-        gridErrorMsg = grid.ErrorMsg
-        print "gridErrorMsg: ", gridErrorMsg
+    # reproject the downloaded (latitude-longitude) raster to the UTM zone directly in memory (no reprojected .tif file is written and read back), strip by strip
+    # reprojected heights are cached next to the raster (float32 .bin file and .json header), and reopened on the following runs
+    demCacheFilePath = os.path.splitext(rasterFilePath)[0] + "_UTM.json"
+    if not os.path.exists(demCacheFilePath):
+        demHeader = gismo_gis.reprojectRasterToDEMcache(rasterFilePath, demCacheFilePath, CRS_EPSG_code, outputCRS_UTMzone, northOrsouth, "bilinear")
+    heights, demHeader = gismo_gis.readDEMcache(demCacheFilePath)
+    numOfRows = demHeader["numOfRows"]
+    numOfColumns = demHeader["numOfColumns"]
+    cellsizeM = demHeader["cellsizeM"]
+    upperLeftCornerXcoord = demHeader["upperLeftCornerX"]
+    upperLeftCornerYcoord = demHeader["upperLeftCornerY"]
+    heightsWithNoData = heights  # no data heights (float("nan")) are kept for the elevationSampler, so that its elevations over them are None
+    heights = [0 if math.isnan(height) else height  for height in heights]  # no data heights are set to 0 for the terrain geometry
     
     # numOfRows, numOfColumns, cellsizeX, cellsizeY
-    header = grid.Header
-    numOfRows = header.NumberRows
-    numOfColumns = header.NumberCols
     numOfCellsInX = numOfColumns
     numOfCellsInY = numOfRows
-    cellsizeX = header.dX
-    cellsizeY = header.dY
+    cellsizeX = cellsizeM
+    cellsizeY = cellsizeM
     
     # calculate the starting point (upper left corner) of terrain mesh
     scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
-    lowerLeftCornerCellCentroidXcoord = header.XllCenter
-    lowerLeftCornerCellCentroidYcoord = header.YllCenter
-    lowerLeftCornerXcoord = lowerLeftCornerCellCentroidXcoord - (cellsizeX/2)
-    lowerLeftCornerYcoord = lowerLeftCornerCellCentroidYcoord - (cellsizeY/2)
+    lowerLeftCornerXcoord = upperLeftCornerXcoord
+    lowerLeftCornerYcoord = upperLeftCornerYcoord - (cellsizeY*numOfRows)
     
-    originPtProjected = gismo_gis.projectedLocationCoordinates(locationLatitudeD, locationLongitudeD)  # find the "origin" projected in Rhino document units for specific UTMzone
+    originX, originY = gismo_gis.latLonToUTM(locationLatitudeD, locationLongitudeD, outputCRS_UTMzone, northOrsouth)  # find the "origin" projected for specific UTMzone (the same projection as the one used for the raster)
+    originPtProjected = Rhino.Geometry.Point3d(originX, originY, 0)
     
     terrainMeshLeftBottomPtX = (lowerLeftCornerXcoord/unitConversionFactor2) - (originPtProjected.X/unitConversionFactor2)
     terrainMeshLeftBottomPtY = (lowerLeftCornerYcoord/unitConversionFactor2) - (originPtProjected.Y/unitConversionFactor2)
@@ -718,36 +767,56 @@ def createTerrainMeshBrep(rasterFilePath, rasterReprojectedFilePath, locationLat
     terrainMeshStartPtX = ( terrainMeshLeftBottomPtX )*scaleFactor
     terrainMeshStartPtY = ( terrainMeshLeftBottomPtY + ((abs(cellsizeX)/unitConversionFactor2)*numOfRows) )*scaleFactor
     
-    pts = []
-    # create terrainMesh from 1 arc-second format
-    for k in xrange(numOfCellsInY):
-        for i in xrange(numOfCellsInX):
-            ptZ = grid.Value(i,k)
-            if math.isnan(ptZ):  # ptZ is float("nan")
-                ptZ = 0
-            pt = Rhino.Geometry.Point3d(terrainMeshStartPtX+(i*abs(cellsizeX/unitConversionFactor2)*scaleFactor), terrainMeshStartPtY-(k*abs(cellsizeY/unitConversionFactor2)*scaleFactor), ptZ/unitConversionFactor2*scaleFactor)
-            pts.append(pt)
-    
-    closeGridSuccess = grid.Close()
+    # mesh terrain is created already cropped, from the heights grid (in "split_createStand_colorTerrain" function). Only the triangulation of the adaptive mesh is needed here
+    if (_type == 4) or (_type == 5):
+        # adaptive mesh: large triangles where the terrain is flat, small ones where it is not, within tinToleranceM
+        triangulation = gismo_terrain.adaptiveTriangulation(heights, numOfRows, numOfColumns, tinToleranceM)
+    else:
+        triangulation = None  # grid cells
+    
+    # terrain brep is only needed for surface terrain types
+    if (_type == 2) or (_type == 3):
+        # least squares fit of a surface with about surfaceControlPoints control points (instead of a surface through all the heights)
+        numOfControlRows = min(max(int(round(math.sqrt(surfaceControlPoints*numOfCellsInY/float(numOfCellsInX)))), 4), numOfCellsInY)
+        numOfControlColumns = min(max(int(round(surfaceControlPoints/float(numOfControlRows))), 4), numOfCellsInX)
+        controlHeights, knotsRows, knotsColumns, surfaceDeviationM, fittedHeights = gismo_terrain.splineFit(heights, numOfRows, numOfColumns, numOfControlRows, numOfControlColumns)
+        uDegree = min(3, numOfControlRows - 1)
+        vDegree = min(3, numOfControlColumns - 1)
+        terrainSurface = Rhino.Geometry.NurbsSurface.Create(3, False, uDegree+1, vDegree+1, numOfControlRows, numOfControlColumns)
+        for knotIndex, knot in enumerate(knotsRows[1:-1]):  # Rhino knot vectors do not have the first and last knot
+            terrainSurface.KnotsU[knotIndex] = knot
+        for knotIndex, knot in enumerate(knotsColumns[1:-1]):
+            terrainSurface.KnotsV[knotIndex] = knot
+        
+        # control points are placed at the knots' averages (Greville abscissae), so that the surface X and Y coordinates follow the heights grid uniformly
+        stepX = abs(cellsizeX/unitConversionFactor2)*scaleFactor
+        stepY = abs(cellsizeY/unitConversionFactor2)*scaleFactor
+        controlRowsY = [terrainMeshStartPtY - sum(knotsRows[controlRow+1 : controlRow+uDegree+1])/uDegree * (numOfRows-1)*stepY  for controlRow in xrange(numOfControlRows)]
+        controlColumnsX = [terrainMeshStartPtX + sum(knotsColumns[controlColumn+1 : controlColumn+vDegree+1])/vDegree * (numOfColumns-1)*stepX  for controlColumn in xrange(numOfControlColumns)]
+        for controlRow in xrange(numOfControlRows):
+            for controlColumn in xrange(numOfControlColumns):
+                controlHeight = controlHeights[controlRow*numOfControlColumns + controlColumn]
+                terrainSurface.Points.SetControlPoint(controlRow, controlColumn, Rhino.Geometry.ControlPoint(controlColumnsX[controlColumn], controlRowsY[controlRow], controlHeight*scaleFactor/unitConversionFactor2))
+        terrainBrep = terrainSurface.ToBrep()
+        surfaceFit = [numOfControlRows*numOfControlColumns, surfaceDeviationM, fittedHeights]  # number of control points, largest deviation, surface heights at the heights grid points
+        del controlHeights
+    else:
+        terrainBrep = None
+        surfaceFit = None
     
-    # always create a terrain mesh regardless of type_ input so that "elevationM" can be calculated on a mesh
-    terrainMesh = gismo_geometry.meshFromPoints(numOfRows, numOfColumns, pts)
     
-    # always create a terrain brep
-    uDegree = min(3, numOfCellsInY - 1)
-    vDegree = min(3, numOfCellsInX - 1)
-    uClosed = False; vClosed = False
-    terrainSurface = Rhino.Geometry.NurbsSurface.CreateThroughPoints(pts, numOfCellsInY, numOfCellsInX, uDegree, vDegree, uClosed, vClosed)
-    terrainBrep = terrainSurface.ToBrep()
+    # heights grid: location's position as fractional column and row indices
+    cellsizeM = abs(cellsizeX)
+    locationColumn = (0 - terrainMeshLeftBottomPtX*unitConversionFactor2) / cellsizeM
+    locationRow = (terrainMeshLeftBottomPtY*unitConversionFactor2 + (cellsizeM*numOfRows)) / cellsizeM
+    heightsGrid = [heights, numOfRows, numOfColumns, cellsizeM, locationColumn, locationRow]
     
+    # elevations of any points on the final (moved, rotated) terrain are sampled from the heights grid, instead of intersecting the terrain geometry
+    elevationSampler = gismo_elevationSampler(heightsWithNoData, numOfRows, numOfColumns, cellsizeM, locationColumn, locationRow, origin, northRad, unitConversionFactor2, upperLeftCornerXcoord, upperLeftCornerYcoord, outputCRS_UTMzone, northOrsouth)
     
-    # project origin_0_0_0 (locationPt) to terrainMesh
-    safeHeightDummy = 10000/unitConversionFactor2  # in meters
+    # project origin_0_0_0 (locationPt) to the terrain
     origin_0_0_0 = Rhino.Geometry.Point3d(0,0,0)  # always center the terrainMesh to 0,0,0 point
-    elevatedOrigin = Rhino.Geometry.Point3d(origin_0_0_0.X, origin_0_0_0.Y, (origin_0_0_0.Z+safeHeightDummy)*scaleFactor)  # project origin_0_0_0 to terrainMesh
-    ray = Rhino.Geometry.Ray3d(elevatedOrigin, Rhino.Geometry.Vector3d(0,0,-1))
-    rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
-    locationPt = ray.PointAt(rayIntersectParam)
+    locationPt = Rhino.Geometry.Point3d(origin_0_0_0.X, origin_0_0_0.Y, elevationSampler.locationHeightM/unitConversionFactor2*scaleFactor)
     
     elevationM = locationPt.Z/scaleFactor  # in rhino document units (not meters)
     elevationM = round(elevationM,2)
@@ -755,11 +824,9 @@ def createTerrainMeshBrep(rasterFilePath, rasterReprojectedFilePath, locationLat
     
     # deleting
     #os.remove(rasterFilePath)  # downloaded .tif file
-    os.remove(rasterReprojectedFilePath)  # reprojected .tif file
-    del pts
     gc.collect()
     
-    return terrainMesh, terrainBrep, locationPt, elevationM
+    return triangulation, terrainBrep, locationPt, elevationM, heightsGrid, surfaceFit, elevationSampler
 
 
 def colorMesh(terrainMesh):
@@ -780,54 +847,55 @@ def colorMesh(terrainMesh):
     return terrainMesh  # colored mesh
 
 
-def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin, standThickness, unitConversionFactor2):
+def split_createStand_colorTerrain(terrainBrep, triangulation, heightsGrid, locationPt, standThickness, unitConversionFactor2):
     
     scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
     tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
     
-    #if (radius_ < (200/unitConversionFactor2)):
-    if (radius_ < 200):
-        # always reduce the cutting "radius_" unless radius_ is < 200
-        cuttingRadiusScaled = radius_ / unitConversionFactor2 * scaleFactor
-    else:
-        cuttingRadiusScaled = (radius_*0.9) / unitConversionFactor2 * scaleFactor  # 0.9 to avoid the cutting sphere getting out of the terrainMesh/terrainBrep edges
+    cuttingRadiusScaled = cuttingRadius(unitConversionFactor2)
+    standThickness = standThickness/100  # due to scalling of the terrain_Mesh_colored 100 times
     
-    # always perform the cutting of either a mesh or surface regardless if type_ is 0,1,2,3
-    if (_type == 0) or (_type == 1):
-        # splitting of mesh
-        if (_type == 0):
-           # split with a cuboid
-            boxInterval = Rhino.Geometry.Interval(-cuttingRadiusScaled, cuttingRadiusScaled)
-            boxIntervalZ = Rhino.Geometry.Interval(-cuttingRadiusScaled*8, cuttingRadiusScaled*8)  # always use "8"
-            boxBrep = Rhino.Geometry.Box(Rhino.Geometry.Plane(locationPt, Rhino.Geometry.Vector3d(0,0,1)), boxInterval, boxInterval, boxIntervalZ).ToBrep()
-            boxMeshes = Rhino.Geometry.Mesh.CreateFromBrep(boxBrep)
-            boxMesh = Rhino.Geometry.Mesh();
-            for mesh in boxMeshes:
-                boxMesh.Append(mesh)
-            terrainMeshesSplitted = terrainMesh.Split(boxMesh)
+    if (_type == 0) or (_type == 1) or (_type == 4) or (_type == 5):
+        # mesh terrain is cropped with a square (type_ 0, 4) or a circle (type_ 1, 5) directly on the heights grid, and its stand (side walls and bottom) is created from the cropped terrain's boundary: one closed mesh, without any mesh splitting or lofting
+        heights, numOfRows, numOfColumns, cellsizeM, locationColumn, locationRow = heightsGrid
+        cellsizeScaled = cellsizeM / unitConversionFactor2 * scaleFactor
+        circular = (_type == 1) or (_type == 5)
+        if (triangulation != None):
+            vertices, triangles = triangulation
+        else:
+            vertices = triangles = None  # grid cells
+        croppedVertices, croppedFaces, boundary = gismo_terrain.cropTriangulation(heights, numOfRows, numOfColumns, locationColumn, locationRow, cuttingRadiusScaled/cellsizeScaled, circular, vertices, triangles)
+        terrainMesh = gismo_geometry.meshFromCroppedGrid(croppedVertices, croppedFaces, boundary, -locationColumn*cellsizeScaled, locationRow*cellsizeScaled, cellsizeScaled, cellsizeScaled, scaleFactor/unitConversionFactor2, standThickness)
         
-        elif (_type == 1):
-            # split with a sphere
-            meshSphere = Rhino.Geometry.Mesh.CreateFromSphere(Rhino.Geometry.Sphere(locationPt, cuttingRadiusScaled), 48, 40)
-            terrainMeshesSplitted = terrainMesh.Split(meshSphere)
-    
-    
-    elif (_type == 2) or (_type == 3):
-        # splitting of surface
-        if (_type == 2):
-            # split with a cuboid
-            boxInterval = Rhino.Geometry.Interval(-cuttingRadiusScaled, cuttingRadiusScaled)
-            boxIntervalZ = Rhino.Geometry.Interval(-cuttingRadiusScaled*5, cuttingRadiusScaled*5)  # always use "5"
-            boxBrep = Rhino.Geometry.Box(Rhino.Geometry.Plane(locationPt, Rhino.Geometry.Vector3d(0,0,1)), boxInterval, boxInterval, boxIntervalZ).ToBrep()
-            terrainBrepsSplitted = terrainBrep.Split(boxBrep, tol/(1/scaleFactor))  # divide the "tol" with "1/scaleFactor" to account for the 100 times scalling in "title_scalingRotating" function
+        # number of the cropped terrain vertices (without the stand), and of the cropped grid cells vertices (type_ 0, 1) for comparison with the adaptive mesh (type_ 4, 5)
+        numOfMeshVertices = len(croppedVertices)
+        if (triangulation != None):
+            numOfGridVertices = len(gismo_terrain.cropTriangulation(heights, numOfRows, numOfColumns, locationColumn, locationRow, cuttingRadiusScaled/cellsizeScaled, circular)[0])
+        else:
+            numOfGridVertices = numOfMeshVertices
+        del croppedVertices; del croppedFaces
         
-        elif (_type == 3):
-            # split with a sphere
-            brepSphere = Rhino.Geometry.Sphere(locationPt, cuttingRadiusScaled).ToBrep()
-            terrainBrepsSplitted = terrainBrep.Split(brepSphere, tol/(1/scaleFactor))  # divide the "tol" with "1/scaleFactor" to account for the 100 times scalling in "title_scalingRotating" function
+        # color the mesh
+        terrain_Mesh_colored = colorMesh(terrainMesh)
         
-        [splittedBrep.Faces.ShrinkFaces() for splittedBrep in terrainBrepsSplitted]
-        terrainMeshesSplitted = [Rhino.Geometry.Mesh.CreateFromBrep(splittedBrep)[0]  for splittedBrep in terrainBrepsSplitted]  # convert terrainBrepsSplitted to meshes for quicker calculation
+        return terrain_Mesh_colored, numOfMeshVertices, numOfGridVertices
+    
+    
+    # splitting of surface
+    if (_type == 2):
+        # split with a cuboid
+        boxInterval = Rhino.Geometry.Interval(-cuttingRadiusScaled, cuttingRadiusScaled)
+        boxIntervalZ = Rhino.Geometry.Interval(-cuttingRadiusScaled*5, cuttingRadiusScaled*5)  # always use "5"
+        boxBrep = Rhino.Geometry.Box(Rhino.Geometry.Plane(locationPt, Rhino.Geometry.Vector3d(0,0,1)), boxInterval, boxInterval, boxIntervalZ).ToBrep()
+        terrainBrepsSplitted = terrainBrep.Split(boxBrep, tol/(1/scaleFactor))  # divide the "tol" with "1/scaleFactor" to account for the 100 times scalling in "title_scalingRotating" function
+    
+    elif (_type == 3):
+        # split with a sphere
+        brepSphere = Rhino.Geometry.Sphere(locationPt, cuttingRadiusScaled).ToBrep()
+        terrainBrepsSplitted = terrainBrep.Split(brepSphere, tol/(1/scaleFactor))  # divide the "tol" with "1/scaleFactor" to account for the 100 times scalling in "title_scalingRotating" function
+    
+    [splittedBrep.Faces.ShrinkFaces() for splittedBrep in terrainBrepsSplitted]
+    terrainMeshesSplitted = [Rhino.Geometry.Mesh.CreateFromBrep(splittedBrep)[0]  for splittedBrep in terrainBrepsSplitted]  # convert terrainBrepsSplitted to meshes for quicker calculation
     
     
     # calculate the distance from projected centroids of the meshes from terrainMeshesSplitted to locationPt
@@ -840,30 +908,16 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
         tupleDistanceToLocationPtL.append(tupleDistanceToLocationPt)
     tupleDistanceToLocationPtL.sort()
     
-    if (_type == 0) or (_type == 1):
-        terrain_MeshOrBrep_Splitted = terrainMeshesSplitted[tupleDistanceToLocationPtL[0][1]]
-        terrainOutlines = [polyline.ToNurbsCurve() for polyline in terrain_MeshOrBrep_Splitted.GetNakedEdges()]
-    elif (_type == 2) or (_type == 3):
-        terrain_MeshOrBrep_Splitted = terrainBrepsSplitted[tupleDistanceToLocationPtL[0][1]]
-        nakedOnly = True
-        terrainOutlines = terrain_MeshOrBrep_Splitted.DuplicateEdgeCurves(nakedOnly)
+    terrain_MeshOrBrep_Splitted = terrainBrepsSplitted[tupleDistanceToLocationPtL[0][1]]
+    nakedOnly = True
+    terrainOutlines = terrain_MeshOrBrep_Splitted.DuplicateEdgeCurves(nakedOnly)
     
     
     
     # stand
-    standThickness = standThickness/100  # due to scalling of the terrain_Mesh_colored 100 times
     if (standThickness == 0):
         # stand should not be created
-        if (_type == 0) or (_type == 1):
-            # just color the mesh
-            terrain_Mesh_colored = colorMesh(terrain_MeshOrBrep_Splitted)
-            del terrainBrep
-            
-            return terrain_Mesh_colored
-        elif (_type == 2) or (_type == 3):
-            del terrainMesh
-            
-            return terrain_MeshOrBrep_Splitted
+        return terrain_MeshOrBrep_Splitted, None, None
     
     elif (standThickness > 0):
         # create stand
@@ -871,7 +925,6 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
         terrainBB = terrain_MeshOrBrep_Splitted.GetBoundingBox(accurate)
         lowestZcoordinatePt = terrainBB.Min  # point with the lowest Z coordinate
         terrainLowestVertexPlane = Rhino.Geometry.Plane(lowestZcoordinatePt, Rhino.Geometry.Vector3d(0,0,1))
-        terrainLowestVertexPlane2 = Rhino.Geometry.Plane(terrainLowestVertexPlane.Origin, Rhino.Geometry.Vector3d(0,0,1))
         terrainLowestVertexPlane.Origin = Rhino.Geometry.Point3d(terrainLowestVertexPlane.Origin.X, terrainLowestVertexPlane.Origin.Y, terrainLowestVertexPlane.Origin.Z - standThickness)
         
         terrainOutline = Rhino.Geometry.Curve.JoinCurves(terrainOutlines)[0]
@@ -881,78 +934,118 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
         loftedTerrain_Outline_and_OutlineProjected_Brep = Rhino.Geometry.Brep.CreateFromLoft([terrainOutline, terrainOutlineProjected], Rhino.Geometry.Point3d.Unset, Rhino.Geometry.Point3d.Unset, loftType, closedLoft)[0]
         
         terrainOutlineProjected_Brep = Rhino.Geometry.Brep.CreatePlanarBreps([terrainOutlineProjected])[0]
-        loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep = Rhino.Geometry.Brep.JoinBreps([loftedTerrain_Outline_and_OutlineProjected_Brep, terrainOutlineProjected_Brep],0.001)[0]
         
+        # surface, no coloring should be performed
+        loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep__and__terrain = Rhino.Geometry.Brep.JoinBreps([terrain_MeshOrBrep_Splitted, loftedTerrain_Outline_and_OutlineProjected_Brep, terrainOutlineProjected_Brep],0.001)[0]
         
-        if (_type == 2) or (_type == 3):
-            # surface, no coloring should be performed
-            loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep__and__terrain = Rhino.Geometry.Brep.JoinBreps([terrain_MeshOrBrep_Splitted, loftedTerrain_Outline_and_OutlineProjected_Brep, terrainOutlineProjected_Brep],0.001)[0]
-            del terrainMesh
-            
-            return loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep__and__terrain
-        elif (_type == 0) or (_type == 1):
-            # mesh, color the meshes
-            meshParam = Rhino.Geometry.MeshingParameters()
-            # setting the meshParam so that it does not crash Rhino
-            if (radius_ <= 300):
-                meshParam.MaximumEdgeLength = 0.1
-            elif (radius_ > 300) and (radius_ <= 400):
-                meshParam.MaximumEdgeLength = 0.2
-            elif (radius_ > 400) and (radius_ <= 500):
-                meshParam.MaximumEdgeLength = 0.3
-            elif (radius_ > 500) and (radius_ <= 1000):
-                meshParam.MaximumEdgeLength = 0.4
-            elif (radius_ > 1000) and (radius_ <= 2000):
-                meshParam.MaximumEdgeLength = 0.5
-            elif (radius_ > 2000) and (radius_ <= 3000):
-                meshParam.MaximumEdgeLength = 0.7
-            elif (radius_ > 3000) and (radius_ <= 4000):
-                meshParam.MaximumEdgeLength = 0.9
-            elif (radius_ > 4000):
-                meshParam.MaximumEdgeLength = 10
-            
-            loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep_Mesh = Rhino.Geometry.Mesh.CreateFromBrep(loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep, meshParam)  # it can contain more than one mesh
-            terrain_withStand = Rhino.Geometry.Mesh()  # for scaling of terrainShadingMask
-            for meshMaskPart in loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep_Mesh:
-                terrain_withStand.Append(meshMaskPart)
-            terrain_withStand.Append(terrain_MeshOrBrep_Splitted)
-            
-            terrain_withStand_colored = colorMesh(terrain_withStand)
-            del terrainBrep
-            
-            return terrain_withStand_colored
+        return loftedTerrain_Outline_and_OutlineProjected_Brep__and__terrainOutlineProjected_Brep__and__terrain, None, None
 
 
-def createElevationContours(terrainUnoriginUnscaledUnrotated, numOfContours, _type):
+def createElevationContours(terrainUnoriginUnscaledUnrotated, heightsGrid, surfaceFit, locationPt, numOfContours, _type, unitConversionFactor2):
     
+    # elevation contours are traced directly on the heights grid (marching squares), for all terrain types
+    # surface terrain is a least squares fit which deviates from the heights, so its contours are traced on the heights of the surface at the heights grid points. That way they lie on the surface
     scaleFactor = 0.01
-    tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
+    heights, numOfRows, numOfColumns, cellsizeM, locationColumn, locationRow = heightsGrid
+    if (surfaceFit != None):
+        heights = surfaceFit[2]
+    cellsizeScaled = cellsizeM / unitConversionFactor2 * scaleFactor
     
-    # create intersection planes
+    # contour heights: equally divided height of the terrain bounding box
     accurate = True
-    terrainBB_edges = terrainUnoriginUnscaledUnrotated.GetBoundingBox(accurate).GetEdges()
-    terrainBB_verticalEdge = terrainBB_edges[8]  # "Rhino.Geometry.Line" type
-    includeEnds = False
-    terrainBB_edges_t_parameters = terrainBB_verticalEdge.ToNurbsCurve().DivideByCount(numOfContours, includeEnds)
-    elevationContours_planeOrigins = [Rhino.Geometry.Line.PointAt(terrainBB_verticalEdge, t)  for t in terrainBB_edges_t_parameters]
-    elevationContours_planes = [Rhino.Geometry.Plane(origin, Rhino.Geometry.Vector3d(0,0,1))  for origin in elevationContours_planeOrigins]
-    
-    if (_type == 0) or (_type == 1):
-        elevationContours_Polylines = list(Rhino.Geometry.Intersect.Intersection.MeshPlane(terrainUnoriginUnscaledUnrotated, elevationContours_planes))
-        elevationContours = [crv.ToNurbsCurve()  for crv in elevationContours_Polylines]  # curves
-    elif (_type == 2) or (_type == 3):
-        elevationContours = []
-        for plane in elevationContours_planes:
-            success, elevationContoursSubList, elevationContourPointsSubList = Rhino.Geometry.Intersect.Intersection.BrepPlane(terrainUnoriginUnscaledUnrotated, plane, tol/(1/scaleFactor))  # divide the "tol" with "1/scaleFactor" to account for the 100 times scalling in "title_scalingRotating" function
-            #elevationContoursSubList_closedCrvs = [crv  for crv in elevationContoursSubList  if crv.IsClosed] # remove elevationContours crvs which are not closed
-            elevationContoursSubList_closedCrvs = [crv  for crv in elevationContoursSubList]
-            if len(elevationContoursSubList_closedCrvs) > 0:  # or success == True
-                elevationContours.extend(elevationContoursSubList_closedCrvs)
+    terrainBB = terrainUnoriginUnscaledUnrotated.GetBoundingBox(accurate)
+    contourStepZ = (terrainBB.Max.Z - terrainBB.Min.Z) / numOfContours
+    contoursZ = [terrainBB.Min.Z + contourStepZ*i  for i in xrange(1, numOfContours)]
+    contourHeightsM = [contourZ / scaleFactor * unitConversionFactor2  for contourZ in contoursZ]
+    
+    # only the parts of the contours inside of the cutting cuboid (type_ 0, 2) or sphere (type_ 1, 3) are kept
+    cuttingRadiusScaled = cuttingRadius(unitConversionFactor2)
+    if (_type == 0) or (_type == 2) or (_type == 4):
+        insideCutting = lambda pt: (abs(pt.X - locationPt.X) <= cuttingRadiusScaled) and (abs(pt.Y - locationPt.Y) <= cuttingRadiusScaled)
+    elif (_type == 1) or (_type == 3) or (_type == 5):
+        insideCutting = lambda pt: pt.DistanceTo(locationPt) <= cuttingRadiusScaled
+    
+    elevationContours = []
+    contourPolylines = gismo_terrain.contourLines(heights, numOfRows, numOfColumns, contourHeightsM)
+    for contourZ, polylines in zip(contoursZ, contourPolylines):
+        for polyline in polylines:
+            pts = [Rhino.Geometry.Point3d((column - locationColumn)*cellsizeScaled, (locationRow - row)*cellsizeScaled, contourZ)  for column, row in polyline]
+            
+            # split the polyline where it crosses the cutting cuboid/sphere
+            clippedPolylines = []
+            clippedPts = []
+            previousPt = None
+            for pt in pts:
+                ptInside = insideCutting(pt)
+                if (previousPt != None) and (ptInside != previousPtInside):
+                    # find the crossing by halving the segment
+                    insidePt, outsidePt = (pt, previousPt) if ptInside else (previousPt, pt)
+                    for i in xrange(20):
+                        middlePt = (insidePt + outsidePt) / 2
+                        if insideCutting(middlePt):
+                            insidePt = middlePt
+                        else:
+                            outsidePt = middlePt
+                    clippedPts.append(insidePt)
+                    if not ptInside:
+                        clippedPolylines.append(clippedPts)
+                        clippedPts = []
+                if ptInside:
+                    clippedPts.append(pt)
+                previousPt = pt
+                previousPtInside = ptInside
+            clippedPolylines.append(clippedPts)
+            
+            # a closed polyline which starts outside, and ends inside, continues at its start
+            if (len(clippedPolylines) > 1) and (pts[0] == pts[-1]) and insideCutting(pts[0]):
+                clippedPolylines[0] = clippedPolylines.pop()[:-1] + clippedPolylines[0]
+            elevationContours.extend([Rhino.Geometry.PolylineCurve(clippedPts)  for clippedPts in clippedPolylines  if len(clippedPts) > 1])
     
     return elevationContours
 
 
-def title_scalingRotating(terrainUnoriginUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, unitConversionFactor):
+def cuttingRadius(unitConversionFactor2):
+    
+    # radius of the cuboid/sphere with which the terrain is cut (scaled 100 times)
+    scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
+    if (radius_ < 200):
+        # always reduce the cutting "radius_" unless radius_ is < 200
+        cuttingRadiusScaled = radius_ / unitConversionFactor2 * scaleFactor
+    else:
+        cuttingRadiusScaled = (radius_*0.9) / unitConversionFactor2 * scaleFactor  # 0.9 to avoid the cutting sphere getting out of the terrainMesh/terrainBrep edges
+    
+    return cuttingRadiusScaled
+
+
+def createHorizonMap(heightsGrid, horizonMapFilePath, horizonMapSectors, locationLatitudeD, locationLongitudeD, origin, northRad, unitConversionFactor2):
+    
+    # horizon angles of all terrain grid cells, for horizonMapSectors azimuths. Saved to horizonMapFilePath, so that "Horizon Angles" component can read them for any point on the terrain
+    heights, numOfRows, numOfColumns, cellsizeM, locationColumn, locationRow = heightsGrid
+    
+    azimuthsD = [sectorIndex * 360.0/horizonMapSectors  for sectorIndex in xrange(horizonMapSectors)]
+    horizonMap = gismo_terrain.horizonMap(heights, numOfRows, numOfColumns, cellsizeM, azimuthsD)
+    
+    # everything needed to find the grid cell of a point from the final (moved, rotated) "terrain" output
+    header = {
+    "numOfRows": numOfRows,
+    "numOfColumns": numOfColumns,
+    "cellsizeM": cellsizeM,
+    "azimuthsD": azimuthsD,
+    "locationColumn": locationColumn,
+    "locationRow": locationRow,
+    "latitude": locationLatitudeD,
+    "longitude": locationLongitudeD,
+    "origin": [origin.X, origin.Y, origin.Z],
+    "northRad": northRad,
+    "unitConversionFactor": unitConversionFactor2
+    }
+    gismo_terrain.writeHorizonMap(horizonMapFilePath, horizonMap, header)
+    
+    del horizonMap
+    gc.collect()
+
+
+def title_scalingRotating(terrainUnoriginUnscaledUnrotated, heightsGrid, surfaceFit, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, unitConversionFactor, unitConversionFactor2):
     
     # scaling, rotating
     originTransformMatrix = Rhino.Geometry.Transform.PlaneToPlane(  Rhino.Geometry.Plane(locationPt, Rhino.Geometry.Vector3d(0,0,1)), Rhino.Geometry.Plane(origin, Rhino.Geometry.Vector3d(0,0,1)) )  # move the terrain from "locationPt" to "origin"
@@ -963,7 +1056,7 @@ def title_scalingRotating(terrainUnoriginUnscaledUnrotated, locationName, locati
     
     if numOfContours_ > 0:
         # create elevationContours
-        elevationContours_UnoriginUnscaledUnrotated = createElevationContours(terrainUnoriginUnscaledUnrotated, numOfContours, _type)
+        elevationContours_UnoriginUnscaledUnrotated = createElevationContours(terrainUnoriginUnscaledUnrotated, heightsGrid, surfaceFit, locationPt, numOfContours, _type, unitConversionFactor2)
     else:
         # no elevationContours will be created
         elevationContours_UnoriginUnscaledUnrotated = []
@@ -1014,11 +1107,19 @@ def bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, maxVisib
     groupIndex2 = gismo_preparation.groupGeometry(layerName + "_terrainGenerator", geometryIds2)
 
 
-def printOutput(northDeg, latitude, longitude, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, workingSubFolderPath, standThickness, numOfContours):
+def printOutput(northDeg, latitude, longitude, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, tinToleranceM, surfaceControlPoints, origin, workingSubFolderPath, standThickness, numOfContours, numOfMeshVertices, numOfGridVertices, surfaceFit):
     if bakeIt_ == True:
         bakedOrNot = "and baked "
     elif bakeIt_ == False:
         bakedOrNot = ""
+    if (_type == 4) or (_type == 5):
+        meshVerticesLabel = "%s of %s grid vertices (%sx fewer, within %s m)" % (numOfMeshVertices, numOfGridVertices, round(numOfGridVertices/float(max(numOfMeshVertices, 1)), 1), tinToleranceM)
+    else:
+        meshVerticesLabel = numOfMeshVertices
+    if (_type == 2) or (_type == 3):
+        surfaceLabel = "%s control points (max. deviation from the topography data: %s m)" % (surfaceFit[0], round(surfaceFit[1], 2))
+    else:
+        surfaceLabel = "-"
     resultsCompletedMsg = "Terrain generator component results successfully completed %s!" % bakedOrNot
     printOutputMsg = \
     """
@@ -1037,7 +1138,10 @@ Stand thickness (rhino doc. units): %s
 Number of elevation contours: %s
 
 Working folder: %s
-    """ % (locationName, latitude, longitude, northDeg, maxVisibilityRadiusM, source, sourceLabel, _type, typeLabel, origin, standThickness, numOfContours, workingSubFolderPath)
+
+Terrain mesh vertices: %s
+Terrain surface: %s
+    """ % (locationName, latitude, longitude, northDeg, maxVisibilityRadiusM, source, sourceLabel, _type, typeLabel, origin, standThickness, numOfContours, workingSubFolderPath, meshVerticesLabel, surfaceLabel)
     print resultsCompletedMsg
     print printOutputMsg
 
@@ -1050,22 +1154,34 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_preparation = sc.sticky["gismo_Preparation"]()
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
         gismo_gis = sc.sticky["gismo_GIS"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
+        gismo_elevationSampler = sc.sticky["gismo_ElevationSampler"]
         
         locationName, locationLatitudeD, locationLongitudeD, timeZone, elevation, validLocationData, printMsg = gismo_preparation.checkLocationData(_location)
         if validLocationData:
             fileNameIncomplete = locationName + "_" + str(locationLatitudeD) + "_" + str(locationLongitudeD) + "_TERRAIN"  # incomplete due to missing "_visibility=2KM_source=AW3D30" part (for example)
             heightM = 0; minVisibilityRadiusM = 0; maskStyle = 0; maskStyleLabel = "sph"; downloadUrl_ = None; downloadTSVLink = None;   gridSize_ = 10  # dummy value
-            maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg = checkInputData(locationLatitudeD, radius_, gridSize_, source_, type_, origin_, north_, standThickness_, numOfContours_, downloadTSVLink)
+            maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, horizonMapSectors, tinToleranceM, surfaceControlPoints, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg = checkInputData(locationLatitudeD, radius_, gridSize_, source_, type_, origin_, north_, standThickness_, numOfContours_, horizonMapSectors_, tinTolerance_, surfaceControlPoints_, downloadTSVLink)
             if validInputData:
                 if _runIt:
-                    terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterReprojectedFileNamePlusExtension, vrtFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, source, sourceLabel)
+                    terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, objFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, source, sourceLabel)
                     if valid_Obj_or_Raster_file:
                         if (rasterFilePath != "needless") and (rasterFilePath != "download failed"):  # terrain shading mask NEEDS to be created
-                            terrainMesh, terrainBrep, locationPt, elevationM = createTerrainMeshBrep(rasterFilePath, rasterReprojectedFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, unitConversionFactor2)
-                            terrainUnoriginUnscaledUnrotated = split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin, standThickness, unitConversionFactor2)
-                        terrain, title, elevationContours = title_scalingRotating(terrainUnoriginUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, unitConversionFactor)
+                            triangulation, terrainBrep, locationPt, elevationM, heightsGrid, surfaceFit, elevationSampler = createTerrainMeshBrep(rasterFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, _type, tinToleranceM, surfaceControlPoints, origin, northRad, unitConversionFactor2)
+                            terrainUnoriginUnscaledUnrotated, numOfMeshVertices, numOfGridVertices = split_createStand_colorTerrain(terrainBrep, triangulation, heightsGrid, locationPt, standThickness, unitConversionFactor2)
+                            if (numOfMeshVertices == None):
+                                # surface terrain
+                                numOfMeshVertices = numOfGridVertices = heightsGrid[1]*heightsGrid[2]
+                            del triangulation
+                            if horizonMapSectors > 0:
+                                horizonMapFilePath = os.path.join(workingSubFolderPath, fileName + "_origin=%s,%s,%s_north=%s_sectors=%s_horizonMap.json" % (round(origin.X,2), round(origin.Y,2), round(origin.Z,2), northDeg, horizonMapSectors))
+                                if not os.path.exists(horizonMapFilePath):
+                                    createHorizonMap(heightsGrid, horizonMapFilePath, horizonMapSectors, locationLatitudeD, locationLongitudeD, origin, northRad, unitConversionFactor2)
+                                horizonMap = horizonMapFilePath
+                        terrain, title, elevationContours = title_scalingRotating(terrainUnoriginUnscaledUnrotated, heightsGrid, surfaceFit, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, unitConversionFactor, unitConversionFactor2)
+                        del heightsGrid
                         if bakeIt_: bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, sourceLabel, typeLabel, standThickness, terrain, title, elevationContours, origin)
-                        printOutput(northDeg, locationLatitudeD, locationLongitudeD, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, workingSubFolderPath, standThickness, numOfContours)
+                        printOutput(northDeg, locationLatitudeD, locationLongitudeD, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, tinToleranceM, surfaceControlPoints, origin, workingSubFolderPath, standThickness, numOfContours, numOfMeshVertices, numOfGridVertices, surfaceFit)
                         elevation = elevationM
                     else:
                         print printMsg
@@ -19,8 +19,8 @@ Use this component to create a 3D Terrain shading mask for a particular location
 It's a diagram which maps the silhouette of the surrounding terrain (hills, valleys, mountains, tree tops...) in 360 degrees directions seen from above the astronomical horizon.
 It can be used as a "context_" input in mountainous or higher latitude regions for any kind of sun related analysis: sunlight hours analysis, solar radiation analysis, view analysis, photovoltaics/solar water heating sunpath shading ...
 -
-!!! ATTENTION !!!   This component may crash Rhino 5 application due to requirement to generate large topography data! To prevent this, it is suggested to own a 64 bit version of Rhino 5 and have strong enough PC configuration. If you do not have either of these two, it is recommended to keep the maxVisibilityRadius_ value to default value of 100 to prevent the crash of Rhino.
-Also try saving your .gh definition before running this component!
+The topography data is processed in strips, so that the memory used by the component stays within the memoryLimit_ regardless of the maxVisibilityRadius_. Large maxVisibilityRadius_ values (up to 400 km) only take longer to calculate.
+Distant terrain is read at coarser resolutions, within the maxHorizonError_.
 -
 Component requires that you are connected to the Internet, as it has to download the topography data.
 It also requires MapWinGIS application to be installed.
@@ -104,12 +104,25 @@ Provided by Gismo 0.0.2
                       -
                       If not supplied, the following default downloadUrl_ input will be used
                       raw.githubusercontent.com/stgeorges/terrainShadingMask/master/objFiles/0_terrain_shading_masks_download_links.tsv
+        memoryLimit_: Approximate amount of memory which the component may use for the topography data, while creating a Terrain shading mask.
+                      The topography data is reprojected and scanned for the horizon in strips which fit into this amount of memory, so the maxVisibilityRadius_ does not affect the memory used.
+                      Lower values make the component slightly slower.
+                      -
+                      If not supplied, default value of 512 MB will be used.
+                      -
+                      In megabytes.
+        maxHorizonError_: The largest error of the horizon angles which is allowed, in order to speed up the creation of a Terrain shading mask.
+                          The distant terrain is read from coarser versions of the topography data (each one with 2 times larger cells), starting from the distance at which it can not change the horizon angles by more than maxHorizonError_. The terrain closer than that is read at full resolution.
+                          The horizon angles error which has been achieved is reported in the "readMe!" output.
+                          Larger values create the Terrain shading mask faster. Values larger than 2 are not supported.
+                          -
+                          If not supplied, default value of 0.25 degrees will be used.
+                          -
+                          In degrees.
         bakeIt_: Set to "True" to bake the Terrain shading mask results into the Rhino scene.
                  -
                  If not supplied default value "False" will be used.
-        _runIt: !!! ATTENTION !!!   This component may crash Rhino 5 application due to requirement to generate large topography data! To prevent this, it is suggested to own a 64 bit version of Rhino 5 and have strong enough PC configuration.
-                If you do not have either of these two, try keeping the maxVisibilityRadius_ value to its default value: 100.
-                Also try saving your .gh definition before running this component.
+        _runIt: Set to "True" to run the component and create a Terrain shading mask.
     
     output:
         readMe!: ...
@@ -147,11 +160,11 @@ Provided by Gismo 0.0.2
 
 ghenv.Component.Name = "Gismo_Terrain Shading Mask"
 ghenv.Component.NickName = "TerrainShadingMask"
-ghenv.Component.Message = "VER 0.0.2\nMAY_05_2017"
+ghenv.Component.Message = "VER 0.0.2\nOCT_18_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.2\nMAY_05_2017
+#compatibleGismoVersion = VER 0.0.2\nOCT_18_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -169,7 +182,7 @@ import os
 import gc
 
 
-def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyle, workingFolderPath, downloadTSVLink):
+def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyle, workingFolderPath, downloadTSVLink, memoryLimitMB, maxHorizonErrorD):
     
     # check if MapWinGIS is properly installed
     gismoGismoComponentNotRan = False  # initial value
@@ -177,8 +190,8 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
         mapFolder_ = sc.sticky["gismo_mapwingisFolder"]
         iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, validInputData, printMsg = gismo_mainComponent.mapWinGIS(mapFolder_)
         if not validInputData:
-            heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
-            return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+            heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
+            return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
         if sc.sticky.has_key("MapWinGIS"):
             global MapWinGIS
             import MapWinGIS
@@ -188,10 +201,10 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
         gismoGismoComponentNotRan = True
     
     if (gismoGismoComponentNotRan == True):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
         validInputData = False
         printMsg = "The \"Gismo Gismo\" component has not been run. Run it before running this component."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
     
     
     
@@ -212,17 +225,17 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
         print "minVisibilityRadius_ input only supports values equal or larger than 0 kilometer.\n" + \
               "minVisibilityRadius_ input set to 0 kilometer."
     elif (minVisibilityRadiusKM > 10):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
         validInputData = False
         printMsg = "minVisibilityRadius_ values longer than 10 are not supported.\n" + \
                    "Please set the minVisibilityRadius_ to some value from 0 to 10 (0 being recommended unless you are doing an analysis of big parts of a city)."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
     if (3 * minVisibilityRadiusKM > maxVisibilityRadiusKM):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
         validInputData = False
         printMsg = "minVisibilityRadius_ value can not be longer than one third of maxVisibilityRadius_.\n" + \
                    "Please set the minVisibilityRadius_ to some value from 0 to 10 so that the minVisibilityRadius_ is equal or less than 0.3*maxVisibilityRadius_."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
     minVisibilityRadiusKM_rounded = round(minVisibilityRadiusKM,1)  # round the "minVisibilityRadius_" input to 0.1 value
     minVisibilityRadiusM = minVisibilityRadiusKM_rounded * 1000  # convert to meters
     
@@ -236,19 +249,16 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
         print "maxVisibilityRadius_ input only supports values equal or larger than 1 kilometer.\n" + \
               "maxVisibilityRadius_ input set to 1 kilometer."
     elif (maxVisibilityRadiusKM > 400):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
         validInputData = False
         printMsg = "Radii longer than 400 are not supported, due to the following reason:\n" + \
                    "The longest recorded horizontal visibility distance (which is the maxVisibilityRadius_ in our case) during daylight is 388 km.\n" + \
                    " \n" + \
                    "In general visibility distances over 100 km can be rare, and may happen in specific cases once or twice a year.\n" + \
                    " \n" + \
-                   "It is advicable to take 100 as the default maxVisibilityRadius_ value for all locations. Then you can try to increase it to 200, or 300 and see if affects the Terrain mask in a significant way. Sometimes the higher \"maxVisibilityRadius_\" values (200,300) are not even required.\n" + \
-                   " \n" + \
-                   "ATTENTION!!! Have in mind that even radii above 100 km may require stronger PC configurations and 64 bit version of Rhino 5. Otherwise Rhino 5 may crash.\n" + \
-                   "If this happens (Rhino 5 crashes) get back to the \"maxVisibilityRadius_\" input of 100."
+                   "It is advicable to take 100 as the default maxVisibilityRadius_ value for all locations. Then you can try to increase it to 200, or 300 and see if affects the Terrain mask in a significant way. Sometimes the higher \"maxVisibilityRadius_\" values (200,300) are not even required."
         
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
     maxVisibilityRadiusM = maxVisibilityRadiusKM * 1000  # convert to meters
     #arcAngleD = math.degrees( math.atan( maxVisibilityRadiusM / (6371000+elevation) ) )  # assumption of Earth being a sphere
     #arcLength = (arcAngleD*math.pi*R)/180
@@ -262,10 +272,10 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+                heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
                 validInputData = False
                 printMsg = "Please input north angle value from 0 to 360."
-                return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, GDAL_librariesFolderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+                return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, GDAL_librariesFolderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -294,12 +304,12 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
         workingSubFolderPath = os.path.join(workingFolderPath, "terrain_shading_masks")
     folderCreated = gismo_preparation.createFolder(workingSubFolderPath)
     if folderCreated == False:
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = memoryLimitMB = maxHorizonErrorD = None
         validInputData = False
         printMsg = "workingFolder_ input is invalid.\n" + \
                    "Input the string in the following format (example): c:\someFolder.\n" + \
                    "Or do not input anything, in which case a default Gismo folder will be used instead: \"c:\gismo\\terrain_shading_masks\"."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
     
     if downloadTSVLink == None:
         downloadTSVLink = "https://raw.githubusercontent.com/stgeorges/terrainShadingMask/master/objFiles/0_terrain_shading_masks_download_links.tsv"
@@ -308,10 +318,29 @@ def checkInputData(minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyl
     unitConversionFactor = 1  # unitConversionFactor is always fixed to "1" to avoid problems when .obj files are exported from Rhino document (session) in one Units, and then imported in some other Rhino document (session) with different Units
     
     
+    if (memoryLimitMB == None):
+        memoryLimitMB = 512  # default in megabytes
+    elif (memoryLimitMB < 64):
+        memoryLimitMB = 64
+        print "memoryLimit_ input only supports values equal or larger than 64 megabytes.\n" + \
+              "memoryLimit_ input set to 64 megabytes."
+    
+    if (maxHorizonErrorD == None):
+        maxHorizonErrorD = 0.25  # default in degrees
+    elif (maxHorizonErrorD <= 0):
+        maxHorizonErrorD = 0.25
+        print "maxHorizonError_ input only supports values larger than 0 degrees.\n" + \
+              "maxHorizonError_ input set to 0.25 degrees."
+    elif (maxHorizonErrorD > 2):
+        maxHorizonErrorD = 2
+        print "maxHorizonError_ input only supports values equal or smaller than 2 degrees.\n" + \
+              "maxHorizonError_ input set to 2 degrees."
+    
+    
     validInputData = True
     printMsg = "ok"
     
-    return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+    return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg
 
 
 def distanceBetweenTwoPoints(latitude1D, longitude1D, maxVisibilityRadiusM):
@@ -507,14 +536,10 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
     fileName2 = fileNameIncomplete + "_visibility=" + str(int(maxVisibilityRadiusM/1000)) + "KM"
     objFileNamePlusExtension = fileName + "_" + maskStyleLabel + ".obj"
     rasterFileNamePlusExtension = fileName2 + ".tif"
-    rasterReprojectedFileNamePlusExtension = fileName2 + "_reprojected" + ".tif"
-    rasterTranslatedFileNamePlusExtension = fileName2 + "_translated" + ".tif"
     tsvFileNamePlusExtension = "0_terrain_shading_masks_download_links" + ".tsv"
     
     objFilePath = os.path.join(workingSubFolderPath, objFileNamePlusExtension)
     rasterFilePath = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension)
-    rasterReprojectedFilePath = os.path.join(workingSubFolderPath, rasterReprojectedFileNamePlusExtension)
-    rasterTranslatedFilePath = os.path.join(workingSubFolderPath, rasterTranslatedFileNamePlusExtension)
     tsvFilePath = os.path.join(workingSubFolderPath, tsvFileNamePlusExtension)
     
     
@@ -649,22 +674,27 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                     # (correctedMaskRadiusM >= maxVisibilityRadiusM)
                     # generate download link for raster region
                     latitudeTopD, dummyLongitudeTopD, latitudeBottomD, dummyLongitudeBottomD, dummyLatitudeLeftD, longitudeLeftD, dummyLatitudeRightD, longitudeRightD = gismo_gis.destinationLatLon(locationLatitudeD, locationLongitudeD, correctedMaskRadiusM)
-                    # based on: http://www.opentopography.org/developers
-                    downloadRasterLink_withCorrectedMaskRadiusKM = "http://opentopo.sdsc.edu/otr/getdem?demtype=SRTMGL3&west=%s&south=%s&east=%s&north=%s&outputFormat=GTiff" % (longitudeLeftD,latitudeBottomD,longitudeRightD,latitudeTopD)  # 3 arc-second SRTMGL3
                     
                     # new rasterFileNamePlusExtension and rasterFilePath corrected according to new correctedMaskRadiusM
                     rasterFileNamePlusExtension_withCorrectedMaskRadiusKM = fileNameIncomplete + "_visibility=" + str(int(maxVisibilityRadiusM/1000)) + "KM" + ".tif"  # rasterFileNamePlusExtension_withCorrectedMaskRadiusKM will always be used instead of rasterFilePath from line 647 !!!
                     rasterFilePath_withCorrectedMaskRadiusKM = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension_withCorrectedMaskRadiusKM)
-                    tifFileDownloaded = gismo_preparation.downloadFile(downloadRasterLink_withCorrectedMaskRadiusKM, rasterFilePath_withCorrectedMaskRadiusKM)
+                    # assembled from the local 1x1 degree tiles store. Only the missing tiles are downloaded (based on: http://www.opentopography.org/developers)
+                    tifFileDownloaded, skippedTileNames = gismo_gis.rasterFromDEMtiles("SRTMGL3", latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD, rasterFilePath_withCorrectedMaskRadiusKM)  # 3 arc-second SRTMGL3
                     if tifFileDownloaded:
                         terrainShadingMask = origin_0_0_0 = None
                         valid_Obj_or_Raster_file = True
                         printMsg = "ok"
+                        if (len(skippedTileNames) > 0):
+                            # the rest of the tiles are used, and the parts of the skipped ones have no data (for example open sea)
+                            skippedTilesMsg = "The following 1x1 degree topography data tiles could not be downloaded from opentopography.org: %s.\n" % ", ".join(skippedTileNames) + \
+                                              "Their parts of the Terrain shading mask have no data. If they are not supposed to be open sea (without any opentopography.org coverage), delete the \"%s\" file and rerun the component." % rasterFileNamePlusExtension_withCorrectedMaskRadiusKM
+                            print skippedTilesMsg
+                            ghenv.Component.AddRuntimeMessage(Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning, skippedTilesMsg)
                     else:
                         rasterFilePath = "download failed"
                         terrainShadingMask = origin_0_0_0 = elevationM = None
                         valid_Obj_or_Raster_file = False
-                        printMsg = "This component requires topography data to be downloaded from opentopography.org as a prerequisite for creating a Terrain shading mask. It has just failed to do that. Try the following two fixes:\n" + \
+                        printMsg = "This component requires topography data to be downloaded from opentopography.org as a prerequisite for creating a Terrain shading mask. It has just failed to do that" + ((" (tiles: %s)" % ", ".join(skippedTileNames)) if (len(skippedTileNames) > 0) else "") + ". Try the following two fixes:\n" + \
                                    " \n" + \
                                    "1) Sometimes due to large number of requests, the component fails to download the topography data even if opentopography.org website and their services are up and running.\n" + \
                                    "In this case, wait a couple of seconds and try reruning the component.\n" + \
@@ -682,80 +712,41 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                     #printMsg - from distanceBetweenTwoPoints function
     
     
-    return terrainShadingMask, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
+    return terrainShadingMask, origin_0_0_0, fileName, objFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
 
 
-def ptZcorrectedHeight(locationPt, meshPt, scaleFactor):
-    # Correcting mesh vertices for Earth's curvature and refraction  
-    # source: "Surveying And Levelling" second edition, N.N. Basak, McGraw Hill Education (India) Private Limited, p161
-    
-    meshPtDistanceFromOriginMeters = locationPt.DistanceTo(meshPt)  # in Rhino units (meters if Rhino document is set to meters)
-    meshPtDistanceFromOriginMeters = meshPtDistanceFromOriginMeters/scaleFactor
-    meshPtDistanceFromOriginKM = meshPtDistanceFromOriginMeters/1000  # in km
-    ptZCorrection = (0.0675 * (meshPtDistanceFromOriginKM**2))  # refraction and curvature correction (in meters)
-    
-    return ptZCorrection
-
-
-def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, context, unitConversionFactor):
+def createTerrainShadingMask(objFilePath, rasterFilePath, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, context, memoryLimitMB, maxHorizonErrorD, unitConversionFactor):
     
     # output crs data: outputCRS_UTMzone, northOrsouth
     CRS_EPSG_code, outputCRS_UTMzone, northOrsouth = gismo_gis.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
     
-    # reproject raster
-    utils = MapWinGIS.UtilsClass()
-    resamplingMethod = "-r bilinear"
-    bstrOptions = '-s_srs EPSG:4326 -t_srs "+proj=utm +zone=%s +%s +datum=WGS84 +ellps=WGS84" %s' % (outputCRS_UTMzone, northOrsouth, resamplingMethod)
-    reprojectGridResult = MapWinGIS.UtilsClass.GDALWarp(utils, rasterFilePath, rasterReprojectedFilePath, bstrOptions, None)
-    if (reprojectGridResult != True):
-        convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-        convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-        convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-        print "convertErrorNo: ", convertErrorNo
-        print "convertErrorMsg: ", convertErrorMsg
-        print "convertErrorType: ", convertErrorType
-    
-    # resample the raster to 50 size%
-    utils2 = MapWinGIS.UtilsClass()
-    bstrOptions2 = "-outsize 50% 50%"
-    translateGridResult = MapWinGIS.UtilsClass.TranslateRaster(utils2, rasterReprojectedFilePath, rasterTranslatedFilePath, bstrOptions2, None)
-    if (translateGridResult != True):
-        convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-        convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-        convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-        print "convertErrorNo: ", convertErrorNo
-        print "convertErrorMsg: ", convertErrorMsg
-        print "convertErrorType: ", convertErrorType
-    
-    # open the reprojected raster
-    grid = MapWinGIS.GridClass()
-    dataType = MapWinGIS.GridDataType.DoubleDataType
-    fileTypeExtension = MapWinGIS.GridFileType.UseExtension
-    inRam = True
-    #openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterReprojectedFilePath, dataType, inRam, fileTypeExtension, None)
-    openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterTranslatedFilePath, dataType, inRam, fileTypeExtension, None)
-    if (openGridSuccess != True):
-        gridErrorMsg = grid.ErrorMsg
-        print "gridErrorMsg: ", gridErrorMsg
+    # reproject the downloaded (latitude-longitude) raster to the UTM zone directly in memory (no reprojected or translated .tif files are written and read back), strip by strip within the memoryLimitMB
+    # reprojected heights are cached next to the raster (float32 .bin file and .json header), and reopened on the following runs
+    demCacheFilePath = os.path.splitext(rasterFilePath)[0] + "_UTM.json"
+    if os.path.exists(demCacheFilePath):
+        demHeader = gismo_gis.readDEMcache(demCacheFilePath, 0, 0, 0, 0)[1]  # header only
+    else:
+        demHeader = gismo_gis.reprojectRasterToDEMcache(rasterFilePath, demCacheFilePath, CRS_EPSG_code, outputCRS_UTMzone, northOrsouth, "bilinear", 1, memoryLimitMB)
+    numOfRows = demHeader["numOfRows"]
+    numOfColumns = demHeader["numOfColumns"]
+    cellsizeM = demHeader["cellsizeM"]
+    upperLeftCornerXcoord = demHeader["upperLeftCornerX"]
+    upperLeftCornerYcoord = demHeader["upperLeftCornerY"]
     
     # numOfRows, numOfColumns, cellsizeX, cellsizeY
-    header = grid.Header
-    numOfRows = header.NumberRows
-    numOfColumns = header.NumberCols
     numOfCellsInX = numOfColumns
     numOfCellsInY = numOfRows
-    cellsizeX = header.dX
-    cellsizeY = header.dY
+    cellsizeX = cellsizeM
+    cellsizeY = cellsizeM
     
     # calculate the starting point (upper left corner) of terrain mesh
     scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
     origin_0_0_0 = Rhino.Geometry.Point3d(0,0,0)  # always center the terrainMesh to 0,0,0 point
-    lowerLeftCornerCellCentroidXcoord = header.XllCenter
-    lowerLeftCornerCellCentroidYcoord = header.YllCenter
-    lowerLeftCornerXcoord = lowerLeftCornerCellCentroidXcoord - (cellsizeX/2)
-    lowerLeftCornerYcoord = lowerLeftCornerCellCentroidYcoord - (cellsizeY/2)
+    lowerLeftCornerXcoord = upperLeftCornerXcoord
+    lowerLeftCornerYcoord = upperLeftCornerYcoord - (cellsizeY*numOfRows)
     
-    originPtProjected = gismo_gis.projectedLocationCoordinates(locationLatitudeD, locationLongitudeD)  # find the "origin" projected in Rhino document units for specific UTMzone
+    originX, originY = gismo_gis.latLonToUTM(locationLatitudeD, locationLongitudeD, outputCRS_UTMzone, northOrsouth)  # find the "origin" projected for specific UTMzone (the same projection as the one used for the raster)
+    originPtProjected = Rhino.Geometry.Point3d(originX, originY, 0)
     
     #terrainMeshLeftBottomPtX = (lowerLeftCornerXcoord/unitConversionFactor2) - (originPtProjected.X/unitConversionFactor2)
     #terrainMeshLeftBottomPtY = (lowerLeftCornerYcoord/unitConversionFactor2) - (originPtProjected.Y/unitConversionFactor2)
@@ -766,97 +757,99 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     #terrainMeshStartPtY = ( terrainMeshLeftBottomPtY + ((abs(cellsizeX)/unitConversionFactor2)*numOfRows) )*scaleFactor
     terrainMeshStartPtY = ( terrainMeshLeftBottomPtY + (abs(cellsizeX)*numOfRows) )*scaleFactor
     
-    pts = []
-    # create terrainMesh from 1 arc-second format
-    for k in xrange(numOfCellsInY):
-        for i in xrange(numOfCellsInX):
-            ptZ = grid.Value(i,k)
-            pt_ZcoordZero = Rhino.Geometry.Point3d(terrainMeshStartPtX+(i*abs(cellsizeX)*scaleFactor), terrainMeshStartPtY-(k*abs(cellsizeY)*scaleFactor), 0)
-            ptZCorrection = ptZcorrectedHeight(origin_0_0_0, pt_ZcoordZero, scaleFactor)  # in meters, unscaled
-            ptCorrected = Rhino.Geometry.Point3d(pt_ZcoordZero.X, pt_ZcoordZero.Y, (ptZ-ptZCorrection)*scaleFactor)
-            pts.append(ptCorrected)
-    
-    closeGridSuccess = grid.Close()
     
-    terrainMesh = gismo_geometry.meshFromPoints(numOfCellsInY, numOfCellsInX, pts)
+    # position of the origin_0_0_0 (locationPt) in the raster, as fractional column and row indices. No terrainMesh is created, the horizon is found directly from the heights
+    cellsize = abs(cellsizeX)
+    originColumn = (0 - terrainMeshLeftBottomPtX) / cellsize
+    originRow = (terrainMeshLeftBottomPtY + (cellsize*numOfRows)) / cellsize
     
-    # deleting
-    #os.remove(rasterFilePath)  # downloaded .tif file
-    os.remove(rasterReprojectedFilePath)
-    os.remove(rasterTranslatedFilePath)
-    del grid
-    del pts
-    
-    
-    # project origin_0_0_0 (locationPt) to terrainMesh
-    safeHeightDummy = 10000  # in meters
-    elevatedOrigin = Rhino.Geometry.Point3d(origin_0_0_0.X, origin_0_0_0.Y, (origin_0_0_0.Z+safeHeightDummy)*scaleFactor)  # project origin_0_0_0 to terrainMesh
-    ray = Rhino.Geometry.Ray3d(elevatedOrigin, Rhino.Geometry.Vector3d(0,0,-1))
-    rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
-    locationPt = ray.PointAt(rayIntersectParam)
+    # project origin_0_0_0 (locationPt) to the terrain (only the 2x2 heights around it are read)
+    windowColumnStart = min(max(int(originColumn), 0), numOfColumns-2)
+    windowRowStart = min(max(int(originRow), 0), numOfRows-2)
+    windowHeights = gismo_gis.readDEMcache(demCacheFilePath, windowColumnStart, windowRowStart, 2, 2)[0]
+    locationTerrainElevationM = gismo_terrain.heightAt(windowHeights, 2, 2, originColumn-windowColumnStart, originRow-windowRowStart)
+    if math.isnan(locationTerrainElevationM):
+        locationTerrainElevationM = 0  # no data at the _location (sea)
+    locationPt = Rhino.Geometry.Point3d(origin_0_0_0.X, origin_0_0_0.Y, locationTerrainElevationM*scaleFactor)
     
     heightScaled = heightM * scaleFactor
     locationPt.Z = locationPt.Z + heightScaled  # lifting up the locationPt for "height_" input (minimum 2 meters)
     elevationM = locationPt.Z/scaleFactor  # in meters
+    observerHeightM = elevationM
     elevationM = round(elevationM,2)
     
     
-    minVisibilityRadiusScaled = minVisibilityRadiusM * scaleFactor
-    if minVisibilityRadiusM > 0:
-        # split the terrainMesh with a sphere to exclude the terrainMesh area minVisibilityRadiusKM around the locationPt
-        meshSphere = Rhino.Geometry.Mesh.CreateFromSphere(Rhino.Geometry.Sphere(locationPt, minVisibilityRadiusScaled), 12, 10)
-        terrainMeshSplitted = terrainMesh.Split(meshSphere)[0]
-    else:
-        # minVisibilityRadius_ input == 0. No splitting of the terrainMesh
-        terrainMeshSplitted = terrainMesh
-    
-    
     # create skyDome
     skyDomeRadius = 200 / unitConversionFactor  # in meters
     skyDomeSphere = Rhino.Geometry.Sphere(locationPt, skyDomeRadius)
     skyDomeSrf = skyDomeSphere.ToBrep().Faces[0]
     
-    # small number of rays (for example: precisionU = 30, precisionV = 10) can result in rays missing the terrainMesh, thererfor the shadingMaskSrf will not be created
-    precisionU = 3600  # rays shot per 0.1 degrees (10th of a degree)
-    precisionV = 1200  # rays shot per 0.075 degrees - more denser than precisionU
+    precisionU = 3600  # horizon angles calculated per 0.1 degrees (10th of a degree)
     
     halvedSkyDomeSrf = skyDomeSrf.Trim(Rhino.Geometry.Interval(skyDomeSrf.Domain(0)[0], skyDomeSrf.Domain(0)[1]), Rhino.Geometry.Interval(0, skyDomeSrf.Domain(1)[1])) # split the skyDome sphere in half
     halvedSkyDomeSrf.SetDomain(1, Rhino.Geometry.Interval(0, halvedSkyDomeSrf.Domain(1)[1]))  # shrink the halvedSkyDomeSrf V start domain
     skyDomeDomainUmin, skyDomeDomainUmax = halvedSkyDomeSrf.Domain(0)
     skyDomeDomainVmin, skyDomeDomainVmax = halvedSkyDomeSrf.Domain(1)
     stepU = (skyDomeDomainUmax - skyDomeDomainUmin)/precisionU
-    stepV = (skyDomeDomainVmax - skyDomeDomainVmin)/precisionV
     
-    # check for intersection between the terrainMesh and rays
+    # calculate the horizon angles by marching each azimuth through the heights (corrected for Earth's curvature and refraction, excluding the terrain closer than minVisibilityRadiusM)
+    # halvedSkyDomeSrf U direction starts at X axis and goes counterclockwise. Azimuths go clockwise from the Y axis
+    azimuthsD = [90 - (360.0 * i / precisionU) for i in xrange(precisionU)]
+    # the terrain is scanned from a pyramid of the heights: full resolution near the location, and coarser levels (each one with 2x larger cells) with the distance.
+    # a level is used from the distance at which its largest height error (maxHeightRangeM) can not change the horizon angles by more than maxHorizonErrorD
+    numOfLevels = max(0, min(6, int(math.log(min(numOfRows, numOfColumns), 2)) - 2))
+    levelFilePaths = [os.path.splitext(demCacheFilePath)[0] + "_level%s.json" % level  for level in xrange(1, numOfLevels+1)]
+    if (numOfLevels > 0) and (not os.path.exists(levelFilePaths[-1])):
+        levelFilePaths = gismo_gis.demCachePyramid(demCacheFilePath, numOfLevels)
+    levelHeaders = [demHeader] + [gismo_gis.readDEMcache(levelFilePath, 0, 0, 0, 0)[1]  for levelFilePath in levelFilePaths]
+    levelCacheFilePaths = [demCacheFilePath] + levelFilePaths
+    scanRadiusM = math.sqrt(numOfRows**2 + numOfColumns**2) * cellsize  # up to the grid's edge
+    maxHorizonErrorTangent = math.tan(math.radians(maxHorizonErrorD))
+    levelStartsM = [0]
+    for levelHeader in levelHeaders[1:]:
+        levelStartM = max(levelStartsM[-1], levelHeader["maxHeightRangeM"]/maxHorizonErrorTangent)
+        levelStartsM.append(levelStartM)
+    
+    # the heights of each level are read and scanned in strips of rows which fit into the memoryLimitMB (4 bytes per height). Neighbouring strips share a row, so that no sample falls in between them
+    # only the rows and columns within the distance scanned at that level are read
+    horizonAnglesD = [-90] * precisionU
+    horizonErrorD = 0
+    for level, levelHeader in enumerate(levelHeaders):
+        levelStartM = max(levelStartsM[level], minVisibilityRadiusM)
+        levelEndM = min(levelStartsM[level+1], scanRadiusM) if (level+1 < len(levelStartsM)) else scanRadiusM
+        if (levelStartsM[level] >= scanRadiusM) or (levelStartM >= levelEndM):
+            continue
+        if level > 0:
+            horizonErrorD = max(horizonErrorD, math.degrees(math.atan(levelHeader["maxHeightRangeM"] / levelStartsM[level])))
+        levelCellsize = levelHeader["cellsizeM"]
+        levelObserverColumn = (originColumn + 0.5) / 2**level - 0.5  # cell centers of a level are at the centers of its 2x2 cells of the previous level
+        levelObserverRow = (originRow + 0.5) / 2**level - 0.5
+        levelEndCells = levelEndM / levelCellsize
+        columnStart = min(max(int(math.floor(levelObserverColumn - levelEndCells)) - 1, 0), levelHeader["numOfColumns"]-1)
+        columnEnd = min(max(int(math.ceil(levelObserverColumn + levelEndCells)) + 1, 0), levelHeader["numOfColumns"]-1)
+        rowStart = min(max(int(math.floor(levelObserverRow - levelEndCells)) - 1, 0), levelHeader["numOfRows"]-1)
+        rowEnd = min(max(int(math.ceil(levelObserverRow + levelEndCells)) + 1, 0), levelHeader["numOfRows"]-1)
+        numOfWindowColumns = columnEnd - columnStart + 1
+        numOfWindowRows = rowEnd - rowStart + 1
+        numOfStripRows = min(max(int(memoryLimitMB*1024*1024 / (4*numOfWindowColumns)), 2), numOfWindowRows)
+        for stripRowStart in xrange(rowStart, rowStart + max(numOfWindowRows-1, 1), numOfStripRows-1):
+            numOfStripRows_ = min(numOfStripRows, rowEnd+1-stripRowStart)
+            heights = gismo_gis.readDEMcache(levelCacheFilePaths[level], columnStart, stripRowStart, numOfWindowColumns, numOfStripRows_)[0]
+            stripHorizonAnglesD = gismo_terrain.horizonScan(heights, numOfStripRows_, numOfWindowColumns, levelCellsize, levelObserverColumn-columnStart, levelObserverRow-stripRowStart, observerHeightM, azimuthsD, levelStartM, levelEndM)
+            horizonAnglesD = [max(horizonAngleD, stripHorizonAngleD)  for horizonAngleD, stripHorizonAngleD in zip(horizonAnglesD, stripHorizonAnglesD)]
+            del heights
+    horizonErrorD = round(horizonErrorD, 3)
+    
     lines = []
     lastRowPoints = []
-    
-    hitted = False  # initial switch
     for i in xrange(0,precisionU):
-        for k in xrange(0,precisionV):
-            u = skyDomeDomainUmin + stepU*i
-            v = skyDomeDomainVmin + stepV*k
-            skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
-            rayVector = skyDomePt-locationPt
-            ray = Rhino.Geometry.Ray3d(locationPt, rayVector)
-            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMeshSplitted,ray)
-            if rayIntersectParam >= 0:
-                # ray hitted something in that column
-                hitted = True
-                lastRowPt = skyDomePt
-                continue
-            else:
-                # ray did not hit anything in that column
-                pass
-        if hitted == False:
-            lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
+        u = skyDomeDomainUmin + stepU*i
+        horizonAngleR = math.radians(max(horizonAnglesD[i], 0))  # the terrain below the astronomical horizon does not shade
+        v = skyDomeDomainVmin + (skyDomeDomainVmax - skyDomeDomainVmin) * horizonAngleR / (math.pi/2)
+        lastRowPt = halvedSkyDomeSrf.PointAt(u,v)
         line = Rhino.Geometry.Line(locationPt, lastRowPt)
         lines.append(line.ToNurbsCurve())
         lastRowPoints.append(lastRowPt)
-        hitted = False  # reset the hitted switch
-    
-    del terrainMesh
-    del terrainMeshSplitted
     
     tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
     if maskStyle == 0:  # spherical terrain shading mask
@@ -874,7 +867,7 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     
     
     if len(shadingMaskBreps) == 0:
-        # no intersection between rays and mesh (low precisionU and precisionV values may result in this too)
+        # the terrain does not rise above the astronomical horizon in any direction
         terrainShadingMaskUnscaledUnrotated = None
         level = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
         printMsg = "There is no shading from terrain. This could be due to two reasons:\n" + \
@@ -884,7 +877,7 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
         ghenv.Component.AddRuntimeMessage(level, printMsg)
         print printMsg
     else:
-        # there is an intersection between rays and mesh
+        # the terrain rises above the astronomical horizon
         terrainShadingMaskUnscaledUnrotated = Rhino.Geometry.Brep.MergeBreps(shadingMaskBreps, tol)  # merge the shadingMaskBreps into a single brep
         # allign the terrainShadingMaskUnscaledUnrotated to "origin_0_0_0" point, instead of locationPt
         translationVec = origin_0_0_0 - locationPt
@@ -900,7 +893,7 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     del lastRowPoints
     gc.collect()
     
-    return terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM
+    return terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM, horizonErrorD
 
 
 def scaleTerrainShadingMask(context, terrainShadingMaskUnscaledUnrotated, origin_0_0_0, latitude):
@@ -1099,7 +1092,7 @@ def bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, heightM,
     groupIndex3 = gismo_preparation.groupGeometry(layerName + "_terrainShadingMask_title", geometryIds3)
 
 
-def printOutput(north, latitude, longitude, locationName, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, workingSubFolderPath, downloadTSVLink):
+def printOutput(north, latitude, longitude, locationName, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, workingSubFolderPath, downloadTSVLink, maxHorizonErrorD, horizonErrorD):
     if maskStyle == 0:
         maskStyleLabel2 = "spherical"
     elif maskStyle == 1:
@@ -1108,6 +1101,10 @@ def printOutput(north, latitude, longitude, locationName, heightM, minVisibility
         bakedOrNot = "and baked "
     elif bakeIt_ == False:
         bakedOrNot = ""
+    if horizonErrorD == None:
+        horizonErrorLabel = "unknown (already created terrain shading mask)"
+    else:
+        horizonErrorLabel = "%s (at most)" % horizonErrorD
     resultsCompletedMsg = "Terrain shading mask component results successfully completed %s!" % bakedOrNot
     printOutputMsg = \
     """
@@ -1123,7 +1120,10 @@ Maximal visibility radius (km): %s
 Mask style: %s (%s)
 Working folder: %s
 Download Url: %s
-    """ % (locationName, latitude, longitude, 360-math.degrees(northRad), int(minVisibilityRadiusM/1000), int(maxVisibilityRadiusM/1000), maskStyle, maskStyleLabel2, workingSubFolderPath, downloadTSVLink)
+Maximal horizon error (deg.): %s
+
+Horizon angles error (deg.): %s
+    """ % (locationName, latitude, longitude, 360-math.degrees(northRad), int(minVisibilityRadiusM/1000), int(maxVisibilityRadiusM/1000), maskStyle, maskStyleLabel2, workingSubFolderPath, downloadTSVLink, maxHorizonErrorD, horizonErrorLabel)
     print resultsCompletedMsg
     print printOutputMsg
 
@@ -1137,24 +1137,26 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
         gismo_environmentalAnalysis = sc.sticky["gismo_EnvironmentalAnalysis"]()
         gismo_gis = sc.sticky["gismo_GIS"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
         
         locationName, locationLatitudeD, locationLongitudeD, timeZone, elevation, validLocationData, printMsg = gismo_preparation.checkLocationData(_location)
         if validLocationData:
             fileNameIncomplete = locationName + "_" + str(locationLatitudeD) + "_" + str(locationLongitudeD) + "_TERRAIN_MASK"  # incomplete due to missing "_visibility=100KM_sph" part (for example)
-            heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg = checkInputData(minVisibilityRadius_, maxVisibilityRadius_, north_, maskStyle_, workingFolder_, downloadUrl_)
+            heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, memoryLimitMB, maxHorizonErrorD, validInputData, printMsg = checkInputData(minVisibilityRadius_, maxVisibilityRadius_, north_, maskStyle_, workingFolder_, downloadUrl_, memoryLimit_, maxHorizonError_)
             if validInputData:
                 if _runIt:
                     if validInputData:
-                        terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel)
+                        terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, objFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel)
                         if valid_Obj_or_Raster_file:
+                            horizonErrorD = None  # unknown for already created terrain shading masks
                             if (rasterFilePath != "needless") and (rasterFilePath != "download failed"):  # terrain shading mask NEEDS to be created
-                                terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM = createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, context_, unitConversionFactor)
+                                terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM, horizonErrorD = createTerrainShadingMask(objFilePath, rasterFilePath, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, context_, memoryLimitMB, maxHorizonErrorD, unitConversionFactor)
                             scale, terrainShadingMaskScaled_radius, contextRadius, contextCentroid, validContextCentroid, printMsg = scaleTerrainShadingMask(context_, terrainShadingMaskUnscaledUnrotated, origin_0_0_0, locationLatitudeD)
                             originPt = contextCentroid
                             if validContextCentroid:
                                 terrainShadingMaskScaledRotated, compassCrvs, titleDescriptionLabelMeshes = compassCrvs_title_scalingRotating(origin_0_0_0, contextCentroid, scale, northVec, terrainShadingMaskUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, heightM, elevationM, minVisibilityRadiusM, maxVisibilityRadiusM, unitConversionFactor)
                                 if bakeIt_: bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, contextCentroid, terrainShadingMaskScaledRotated, compassCrvs, titleDescriptionLabelMeshes)
-                                printOutput(northRad, locationLatitudeD, locationLongitudeD, locationName, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, workingSubFolderPath, downloadTSVLink)
+                                printOutput(northRad, locationLatitudeD, locationLongitudeD, locationName, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, workingSubFolderPath, downloadTSVLink, maxHorizonErrorD, horizonErrorD)
                                 terrainShadingMask = terrainShadingMaskScaledRotated; title = titleDescriptionLabelMeshes; maskRadius = terrainShadingMaskScaled_radius; elevation = elevationM
                             else:
                                 print printMsg
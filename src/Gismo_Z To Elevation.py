@@ -25,17 +25,23 @@ Provided by Gismo 0.0.2
         _elevation: Plug in the "elevation" output from Gismo "Terrain Generator" or Ladybug "Terrain Generator" components.
                     -
                     In Rhino document units (meters, feets...).
+        elevationSampler_: Plug in the "elevationSampler" output from Gismo "Terrain Generator" component.
+                           If supplied, the "_origin" and "_elevation" inputs are not needed, and the elevation of the terrain below the "_point" will be calculated as well, directly from the terrain's elevation grid (no terrain geometry is intersected).
     
     output:
         readMe!: ...
         pointElevation: Elevation of the inputted _point.
                         -
                         In Rhino document units (meters, feets...).
+        terrainElevation: Elevation of the terrain below the inputted _point. Calculated only if "elevationSampler_" input is supplied.
+                          If the _point is outside of the terrain, this output will be empty.
+                          -
+                          In Rhino document units (meters, feets...).
 """
 
 ghenv.Component.Name = "Gismo_Z To Elevation"
 ghenv.Component.NickName = "ZtoElevation"
-ghenv.Component.Message = "VER 0.0.2\nMAR_01_2017"
+ghenv.Component.Message = "VER 0.0.2\nOCT_18_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | Gismo"
@@ -47,36 +53,48 @@ import scriptcontext as sc
 import Grasshopper
 
 
-def main(point, originPt, originPtElevation):
+def main(point, originPt, originPtElevation, elevationSampler):
     
     # check inputs
     if (point == None):
-        pointElevation_ = None
+        pointElevation_ = terrainElevation_ = None
         validInputData = False
         printMsg = "Please input the \"_point\" for which you would like to calculate elevation."
-        return pointElevation_, validInputData, printMsg
+        return pointElevation_, terrainElevation_, validInputData, printMsg
+    
+    if (elevationSampler != None):
+        # the origin and its elevation are known to the "elevationSampler"
+        if (originPt == None):
+            originPt = elevationSampler.origin
+        if (originPtElevation == None):
+            originPtElevation = elevationSampler.locationHeightM / elevationSampler.unitConversionFactor
     
     if (originPt == None):
-        pointElevation_ = None
+        pointElevation_ = terrainElevation_ = None
         validInputData = False
         printMsg = "Please input \"origin\" output from Gismo or Ladybug \"Terrain Generator\" components, to this component's \"_origin\" input."
-        return pointElevation_, validInputData, printMsg
+        return pointElevation_, terrainElevation_, validInputData, printMsg
     
     if (originPtElevation == None):
-        pointElevation_ = None
+        pointElevation_ = terrainElevation_ = None
         validInputData = False
         printMsg = "Please input \"elevation\" output from Gismo or Ladybug \"Terrain Generator\" components, to this component's \"_elevation\" input."
-        return pointElevation_, validInputData, printMsg
+        return pointElevation_, terrainElevation_, validInputData, printMsg
     
     
     pointZ = point.Z
     originPtZ = originPt.Z
     pointElevation_ = (pointZ-originPtZ) + originPtElevation
     
+    if (elevationSampler != None):
+        terrainElevation_ = elevationSampler.elevations([point])[0]
+    else:
+        terrainElevation_ = None
+    
     validInputData = True
     printMsg = "ok"
     
-    return pointElevation_, validInputData, printMsg
+    return pointElevation_, terrainElevation_, validInputData, printMsg
 
 level = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
 if sc.sticky.has_key("gismoGismo_released"):
@@ -84,7 +102,7 @@ if sc.sticky.has_key("gismoGismo_released"):
     if validVersionDate:
         gismo_osm = sc.sticky["gismo_OSM"]()
         
-        pointElevation, validInputData, printMsg = main(_point, _origin, _elevation)
+        pointElevation, terrainElevation, validInputData, printMsg = main(_point, _origin, _elevation, elevationSampler_)
         if validInputData:
             pass
         else:
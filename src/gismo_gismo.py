@@ -33,7 +33,7 @@ Provided by Gismo 0.0.2
 
 ghenv.Component.Name = "Gismo_Gismo"
 ghenv.Component.NickName = "Gismo"
-ghenv.Component.Message = "VER 0.0.2\nJUN_16_2017"
+ghenv.Component.Message = "VER 0.0.2\nOCT_18_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.icon
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "0 | Gismo"
@@ -49,7 +49,10 @@ import System
 import shutil
 import urllib
 import Rhino
+import array
+import bisect
 import time
+import json
 import math
 import sys
 import clr
@@ -1137,21 +1140,115 @@ class CreateGeometry():
         return meshFaceAreas
     
     
+    def gridMeshFaces(self, u, v):
+        """
+        create quad faces of a mesh made from a grid of u*v vertices
+        """
+        faces = System.Collections.Generic.List[Rhino.Geometry.MeshFace](max(u-1,0)*max(v-1,0))
+        for i in xrange(1,u):
+            for k in xrange(1,v):
+                faces.Add(Rhino.Geometry.MeshFace(k-1+(i-1)*v, k-1+i*v, k-1+i*v+1, k-1+(i-1)*v+1))
+        
+        return faces
+    
+    
     def meshFromPoints(self, u, v, pts, meshColors=None):
         """
         create a mesh from a grid of points
         """
         mesh = Rhino.Geometry.Mesh()
-        if (meshColors == None) or (len(meshColors) == 0):
-            for pt in pts:
-                mesh.Vertices.Add(pt)
-        else:
-            for i,pt in enumerate(pts):
-                mesh.Vertices.Add(pt)
-                mesh.VertexColors.Add(meshColors[i])
-        for i in xrange(1,u):
-            for k in xrange(1,v):
-                mesh.Faces.AddFace(k-1+(i-1)*v, k-1+i*v, k-1+i*v+1, k-1+(i-1)*v+1)
+        mesh.Vertices.AddVertices(System.Collections.Generic.List[Rhino.Geometry.Point3d](pts))
+        if (meshColors != None) and (len(meshColors) != 0):
+            mesh.VertexColors.SetColors(System.Array[System.Drawing.Color](meshColors))
+        mesh.Faces.AddFaces(self.gridMeshFaces(u, v))
+        
+        return mesh
+    
+    
+    def meshFromHeights(self, heights, numOfRows, numOfColumns, startX, startY, stepX, stepY, heightFactor, noDataHeight=0):
+        """
+        create a mesh from a grid of heights. Vertices are added and faces created in bulk
+        """
+        # heights grid is a flat list of numOfRows*numOfColumns heights, row after row, starting from the upper left corner (startX, startY). Rows go towards -Y (by stepY), and columns towards +X (by stepX)
+        # each vertex Z coordinate is its height multiplied by heightFactor. float("nan") heights (no data) are replaced with noDataHeight
+        columnsX = [startX + column*stepX  for column in xrange(numOfColumns)]
+        vertices = System.Collections.Generic.List[Rhino.Geometry.Point3d](numOfRows*numOfColumns)
+        for row in xrange(numOfRows):
+            rowY = startY - row*stepY
+            rowStart = row*numOfColumns
+            for column in xrange(numOfColumns):
+                height = heights[rowStart + column]
+                if math.isnan(height):
+                    height = noDataHeight
+                vertices.Add(Rhino.Geometry.Point3d(columnsX[column], rowY, height*heightFactor))
+        
+        mesh = Rhino.Geometry.Mesh()
+        mesh.Vertices.AddVertices(vertices)
+        mesh.Faces.AddFaces(self.gridMeshFaces(numOfRows, numOfColumns))
+        
+        return mesh
+    
+    
+    def meshFromTriangulation(self, heights, numOfColumns, vertices, triangles, startX, startY, stepX, stepY, heightFactor, noDataHeight=0):
+        """
+        create a triangle mesh from a triangulation of a grid of heights (for example Terrain.adaptiveTriangulation). Vertices are added and faces created in bulk
+        """
+        # vertices are (column, row) grid indices, and triangles are triples of vertex indices. Heights of the vertices outside of the grid are the ones of the nearest grid edge
+        numOfRows = len(heights) // numOfColumns
+        pts = System.Collections.Generic.List[Rhino.Geometry.Point3d](len(vertices))
+        for column, row in vertices:
+            height = heights[min(row, numOfRows-1)*numOfColumns + min(column, numOfColumns-1)]
+            if math.isnan(height):
+                height = noDataHeight
+            pts.Add(Rhino.Geometry.Point3d(startX + column*stepX, startY - row*stepY, height*heightFactor))
+        
+        faces = System.Collections.Generic.List[Rhino.Geometry.MeshFace](len(triangles))
+        for vertexIndex1, vertexIndex2, vertexIndex3 in triangles:
+            faces.Add(Rhino.Geometry.MeshFace(vertexIndex1, vertexIndex2, vertexIndex3))
+        
+        mesh = Rhino.Geometry.Mesh()
+        mesh.Vertices.AddVertices(pts)
+        mesh.Faces.AddFaces(faces)
+        
+        return mesh
+    
+    
+    def meshFromCroppedGrid(self, vertices, faces, boundary, startX, startY, stepX, stepY, heightFactor, standThickness=0, noDataHeight=0):
+        """
+        create a mesh from a cropped grid of heights (Terrain.cropTriangulation). If standThickness > 0, the stand (side walls and a bottom) is added from the boundary, so the mesh is closed
+        """
+        # vertices are (column, row, height), faces are triples or quadruples of vertex indices, and boundary is a closed loop of vertex indices (counter-clockwise when seen from above)
+        # the stand's bottom is standThickness below the lowest vertex. The bottom is triangulated as a fan from the boundary's center, which is fine for the convex (square, circle) boundaries
+        pts = System.Collections.Generic.List[Rhino.Geometry.Point3d](len(vertices) + len(boundary) + 1)
+        for column, row, height in vertices:
+            if math.isnan(height):
+                height = noDataHeight
+            pts.Add(Rhino.Geometry.Point3d(startX + column*stepX, startY - row*stepY, height*heightFactor))
+        
+        meshFaces = System.Collections.Generic.List[Rhino.Geometry.MeshFace](len(faces) + 2*len(boundary))
+        for face in faces:
+            if len(face) == 4:
+                meshFaces.Add(Rhino.Geometry.MeshFace(face[0], face[1], face[2], face[3]))
+            else:
+                meshFaces.Add(Rhino.Geometry.MeshFace(face[0], face[1], face[2]))
+        
+        if (standThickness > 0) and (len(boundary) >= 3):
+            numOfVertices = pts.Count
+            numOfBoundaryVertices = len(boundary)
+            bottomZ = min(pt.Z for pt in pts) - standThickness
+            for vertexIndex in boundary:
+                pts.Add(Rhino.Geometry.Point3d(pts[vertexIndex].X, pts[vertexIndex].Y, bottomZ))
+            pts.Add(Rhino.Geometry.Point3d(sum(pts[vertexIndex].X for vertexIndex in boundary)/numOfBoundaryVertices, sum(pts[vertexIndex].Y for vertexIndex in boundary)/numOfBoundaryVertices, bottomZ))
+            bottomCenterIndex = pts.Count - 1
+            
+            for i in xrange(numOfBoundaryVertices):
+                nextI = (i+1) % numOfBoundaryVertices
+                meshFaces.Add(Rhino.Geometry.MeshFace(boundary[i], numOfVertices+i, numOfVertices+nextI, boundary[nextI]))  # side wall, facing outwards
+                meshFaces.Add(Rhino.Geometry.MeshFace(bottomCenterIndex, numOfVertices+nextI, numOfVertices+i))  # bottom, facing downwards
+        
+        mesh = Rhino.Geometry.Mesh()
+        mesh.Vertices.AddVertices(pts)
+        mesh.Faces.AddFaces(meshFaces)
         
         return mesh
     
@@ -2118,6 +2215,561 @@ class GIS():
         return distanceM
     
     
+    def gridHeights(self, grid, rowStart=0, numOfWindowRows=None):
+        """
+        read all values (or only numOfWindowRows rows starting from rowStart) of an opened MapWinGIS grid at once, into a flat list of heights (row after row, starting from the upper left corner)
+        """
+        # no data values are replaced with float("nan")
+        header = grid.Header
+        numOfColumns = header.NumberCols
+        noDataValue = header.NodataValue
+        if numOfWindowRows == None:
+            numOfWindowRows = header.NumberRows - rowStart
+        
+        values = System.Array.CreateInstance(System.Single, numOfWindowRows*numOfColumns)
+        try:
+            bulkReadSuccess = grid.GetFloatWindow(rowStart, rowStart+numOfWindowRows-1, 0, numOfColumns-1, values)
+        except Exception, e:
+            bulkReadSuccess = False
+        
+        if bulkReadSuccess:
+            heights = [float(value)  for value in values]
+        else:
+            # older MapWinGIS versions: read value by value
+            heights = [grid.Value(column,row)  for row in xrange(rowStart, rowStart+numOfWindowRows)  for column in xrange(numOfColumns)]
+        del values
+        
+        nan = float("nan")
+        heights = [nan if (height == noDataValue) else height  for height in heights]
+        
+        return heights
+    
+    
+    def demTiles(self, latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD):
+        """
+        names and lower left corners of the 1x1 degree DEM tiles covering a latitude-longitude bounding box (tiles named as SRTM ones: "N46E015")
+        """
+        tiles = []
+        for tileLatitudeD in xrange(int(math.floor(latitudeBottomD)), int(math.ceil(latitudeTopD))):
+            for tileLongitudeD in xrange(int(math.floor(longitudeLeftD)), int(math.ceil(longitudeRightD))):
+                tileName = "%s%02d%s%03d" % ("N" if tileLatitudeD >= 0 else "S", abs(tileLatitudeD), "E" if tileLongitudeD >= 0 else "W", abs(tileLongitudeD))
+                tiles.append([tileName, tileLatitudeD, tileLongitudeD])
+        
+        return tiles
+    
+    
+    def rasterFromDEMtiles(self, demType, latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD, rasterFilePath):
+        """
+        assemble a .tif raster for the given latitude-longitude bounding box from the locally stored 1x1 degree opentopography.org tiles, stored in the "terrain_tiles" subfolder of the gismoFolder.
+        Only the tiles missing in the local store are downloaded. Tiles which can not be downloaded (for example the ones without any coverage, like open sea) are skipped, and their part of the raster has no data.
+        Returns "True" if the raster is created and "False" if none of the tiles could be downloaded or the raster could not be assembled, and the names of the skipped tiles
+        """
+        gismoFolder = sc.sticky["gismo_gismoFolder"]  # "gismoFolder_" input of Gismo_Gismo component
+        tilesFolderPath = os.path.join(gismoFolder, "terrain_tiles")
+        demTypeFolderPath = os.path.join(tilesFolderPath, demType)
+        preparation = Preparation()
+        if not (preparation.createFolder(tilesFolderPath) and preparation.createFolder(demTypeFolderPath)):
+            rasterCreated = False
+            return rasterCreated, []
+        
+        tileFilePaths = []
+        skippedTileNames = []
+        for tileName, tileLatitudeD, tileLongitudeD in self.demTiles(latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD):
+            tileFilePath = os.path.join(demTypeFolderPath, tileName + ".tif")
+            if not os.path.exists(tileFilePath):
+                # based on: http://www.opentopography.org/developers
+                downloadTileLink = "http://opentopo.sdsc.edu/otr/getdem?demtype=%s&west=%s&south=%s&east=%s&north=%s&outputFormat=GTiff" % (demType, tileLongitudeD, tileLatitudeD, tileLongitudeD+1, tileLatitudeD+1)
+                # download to a temporary file first, so that an interrupted or failed download never ends up in the tiles store
+                partialTileFilePath = tileFilePath + ".part"
+                tileDownloaded = preparation.downloadFile(downloadTileLink, partialTileFilePath)
+                if tileDownloaded:
+                    # opentopography.org returns an error message instead of a GeoTIFF when the request fails
+                    myFile = open(partialTileFilePath, "rb")
+                    tiffSignature = myFile.read(4)
+                    myFile.close()
+                    tileDownloaded = tiffSignature in ("II*\x00", "MM\x00*")
+                if not tileDownloaded:
+                    if os.path.exists(partialTileFilePath):
+                        os.remove(partialTileFilePath)
+                    skippedTileNames.append(tileName)
+                    continue
+                os.rename(partialTileFilePath, tileFilePath)
+            tileFilePaths.append(tileFilePath)
+        
+        if (len(tileFilePaths) == 0):
+            rasterCreated = False
+            return rasterCreated, skippedTileNames
+        
+        # mosaic the tiles and crop the mosaic to the bounding box. Parts of the bounding box not covered by any tile (skipped tiles) get the no data value
+        utils = MapWinGIS.UtilsClass()
+        vrtFilePath = os.path.splitext(rasterFilePath)[0] + "_tiles.vrt"
+        bstrOptions = " ".join("\"%s\"" % tileFilePath  for tileFilePath in tileFilePaths)
+        buildVrtResult = MapWinGIS.UtilsClass.GDALBuildVrt(utils, vrtFilePath, bstrOptions, None)
+        if buildVrtResult == True:
+            bstrOptions = "-te %s %s %s %s -dstnodata -32768" % (longitudeLeftD, latitudeBottomD, longitudeRightD, latitudeTopD)
+            cropResult = MapWinGIS.UtilsClass.GDALWarp(utils, vrtFilePath, rasterFilePath, bstrOptions, None)
+            os.remove(vrtFilePath)
+        else:
+            cropResult = False
+        
+        if cropResult != True:
+            convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
+            print "convertErrorMsg: ", convertErrorMsg
+            rasterCreated = False
+            return rasterCreated, skippedTileNames
+        
+        rasterCreated = True
+        return rasterCreated, skippedTileNames
+    
+    
+    def transverseMercatorCoefficients(self):
+        """
+        WGS 84 ellipsoid coefficients of the Krueger series for the transverse Mercator projection
+        """
+        # based on: "Transverse Mercator with an accuracy of a few nanometers", C.F.F. Karney, Journal of Geodesy 2011
+        a = 6378137.0
+        f = 1/298.257223563
+        n = f/(2-f)
+        A = a/(1+n) * (1 + (n**2)/4 + (n**4)/64)
+        alpha = [n/2 - 2/3.0*n**2 + 5/16.0*n**3 + 41/180.0*n**4,
+                 13/48.0*n**2 - 3/5.0*n**3 + 557/1440.0*n**4,
+                 61/240.0*n**3 - 103/140.0*n**4,
+                 49561/161280.0*n**4]
+        beta = [n/2 - 2/3.0*n**2 + 37/96.0*n**3 - 1/360.0*n**4,
+                1/48.0*n**2 + 1/15.0*n**3 - 437/1440.0*n**4,
+                17/480.0*n**3 - 37/840.0*n**4,
+                4397/161280.0*n**4]
+        delta = [2*n - 2/3.0*n**2 - 2*n**3 + 116/45.0*n**4,
+                 7/3.0*n**2 - 8/5.0*n**3 - 227/45.0*n**4,
+                 56/15.0*n**3 - 136/35.0*n**4,
+                 4279/630.0*n**4]
+        
+        return n, A, alpha, beta, delta
+    
+    
+    def latLonToUTM(self, latitudeD, longitudeD, CRS_UTMzone, northOrsouth):
+        """
+        convert latitude,longitude coordinates to x,y coordinates of the given WGS 84 UTM zone, without the use of MapWinGIS
+        """
+        n, A, alpha, beta, delta = self.transverseMercatorCoefficients()
+        k0 = 0.9996
+        falseNorthing = 0 if (northOrsouth == "north") else 10000000
+        centralMeridianD = (CRS_UTMzone-1)*6 - 180 + 3
+        
+        latitudeR = math.radians(latitudeD)
+        longitudeR = math.radians(longitudeD - centralMeridianD)
+        e = 2*math.sqrt(n)/(1+n)
+        t = math.sinh(math.atanh(math.sin(latitudeR)) - e*math.atanh(e*math.sin(latitudeR)))
+        xiPrime = math.atan2(t, math.cos(longitudeR))
+        etaPrime = math.atanh(math.sin(longitudeR)/math.sqrt(1 + t*t))
+        xi = xiPrime
+        eta = etaPrime
+        for j in xrange(4):
+            xi += alpha[j] * math.sin(2*(j+1)*xiPrime) * math.cosh(2*(j+1)*etaPrime)
+            eta += alpha[j] * math.cos(2*(j+1)*xiPrime) * math.sinh(2*(j+1)*etaPrime)
+        
+        x = 500000 + k0*A*eta
+        y = falseNorthing + k0*A*xi
+        
+        return x, y
+    
+    
+    def UTMtoLatLon(self, x, y, CRS_UTMzone, northOrsouth):
+        """
+        convert x,y coordinates of the given WGS 84 UTM zone to latitude,longitude coordinates, without the use of MapWinGIS
+        """
+        n, A, alpha, beta, delta = self.transverseMercatorCoefficients()
+        k0 = 0.9996
+        falseNorthing = 0 if (northOrsouth == "north") else 10000000
+        centralMeridianD = (CRS_UTMzone-1)*6 - 180 + 3
+        
+        xi = (y - falseNorthing)/(k0*A)
+        eta = (x - 500000)/(k0*A)
+        xiPrime = xi
+        etaPrime = eta
+        for j in xrange(4):
+            xiPrime -= beta[j] * math.sin(2*(j+1)*xi) * math.cosh(2*(j+1)*eta)
+            etaPrime -= beta[j] * math.cos(2*(j+1)*xi) * math.sinh(2*(j+1)*eta)
+        chi = math.asin(math.sin(xiPrime)/math.cosh(etaPrime))
+        latitudeR = chi
+        for j in xrange(4):
+            latitudeR += delta[j] * math.sin(2*(j+1)*chi)
+        longitudeR = math.atan2(math.sinh(etaPrime), math.cos(xiPrime))
+        
+        latitudeD = math.degrees(latitudeR)
+        longitudeD = centralMeridianD + math.degrees(longitudeR)
+        
+        return latitudeD, longitudeD
+    
+    
+    def reprojectedGrid(self, numOfRows, numOfColumns, upperLeftLongitudeD, upperLeftLatitudeD, cellsizeLongitudeD, cellsizeLatitudeD, CRS_UTMzone, northOrsouth, cellsizeM=None, downsamplingFactor=1):
+        """
+        size, cell size and upper left corner of the WGS 84 UTM zone grid which covers a WGS 84 (latitude-longitude) grid
+        """
+        # if cellsizeM is not supplied, the source resolution is preserved (the same way GDALWarp does it: source grid diagonal divided into the same number of cells), and coarsened downsamplingFactor times
+        # extent of the source grid in UTM coordinates, from the points along its edges
+        edgePts = []
+        numOfEdgeSteps = 20
+        for i in xrange(numOfEdgeSteps+1):
+            longitudeD = upperLeftLongitudeD + cellsizeLongitudeD*numOfColumns*i/numOfEdgeSteps
+            latitudeD = upperLeftLatitudeD - cellsizeLatitudeD*numOfRows*i/numOfEdgeSteps
+            edgePts.append(self.latLonToUTM(upperLeftLatitudeD, longitudeD, CRS_UTMzone, northOrsouth))
+            edgePts.append(self.latLonToUTM(upperLeftLatitudeD - cellsizeLatitudeD*numOfRows, longitudeD, CRS_UTMzone, northOrsouth))
+            edgePts.append(self.latLonToUTM(latitudeD, upperLeftLongitudeD, CRS_UTMzone, northOrsouth))
+            edgePts.append(self.latLonToUTM(latitudeD, upperLeftLongitudeD + cellsizeLongitudeD*numOfColumns, CRS_UTMzone, northOrsouth))
+        minX = min(pt[0]  for pt in edgePts)
+        maxX = max(pt[0]  for pt in edgePts)
+        minY = min(pt[1]  for pt in edgePts)
+        maxY = max(pt[1]  for pt in edgePts)
+        
+        if cellsizeM == None:
+            upperLeftX, upperLeftY = self.latLonToUTM(upperLeftLatitudeD, upperLeftLongitudeD, CRS_UTMzone, northOrsouth)
+            lowerRightX, lowerRightY = self.latLonToUTM(upperLeftLatitudeD - cellsizeLatitudeD*numOfRows, upperLeftLongitudeD + cellsizeLongitudeD*numOfColumns, CRS_UTMzone, northOrsouth)
+            cellsizeM = downsamplingFactor * math.hypot(lowerRightX-upperLeftX, lowerRightY-upperLeftY) / math.hypot(numOfColumns, numOfRows)
+        
+        numOfRowsUTM = max(1, int(math.ceil((maxY-minY)/cellsizeM)))
+        numOfColumnsUTM = max(1, int(math.ceil((maxX-minX)/cellsizeM)))
+        upperLeftCornerX = minX
+        upperLeftCornerY = minY + numOfRowsUTM*cellsizeM
+        
+        return numOfRowsUTM, numOfColumnsUTM, cellsizeM, upperLeftCornerX, upperLeftCornerY
+    
+    
+    def reprojectHeights(self, heights, numOfRows, numOfColumns, upperLeftLongitudeD, upperLeftLatitudeD, cellsizeLongitudeD, cellsizeLatitudeD, CRS_UTMzone, northOrsouth, cellsizeM=None, resamplingMethod="bilinear", downsamplingFactor=1, reprojectedGrid=None, rowStart=0, numOfStripRows=None):
+        """
+        reproject and resample a WGS 84 (latitude-longitude) heights grid to a WGS 84 UTM zone heights grid, without writing any raster files.
+        resamplingMethod: "bilinear", "cubic" or "average" (mean of all source cells covered by the target cell, for downsampling)
+        """
+        # both heights grids are flat lists, row after row, starting from the upper left (north-west) corner. Source grid's cells are centered at integer column, row positions
+        # reprojectedGrid (from reprojectedGrid method) and rowStart, numOfStripRows allow only a strip of rows of the UTM grid to be calculated. The source grid can then be only the strip of rows covering it (with its own upperLeftLatitudeD)
+        nan = float("nan")
+        
+        if reprojectedGrid == None:
+            reprojectedGrid = self.reprojectedGrid(numOfRows, numOfColumns, upperLeftLongitudeD, upperLeftLatitudeD, cellsizeLongitudeD, cellsizeLatitudeD, CRS_UTMzone, northOrsouth, cellsizeM, downsamplingFactor)
+        numOfRowsUTM, numOfColumnsUTM, cellsizeM, upperLeftCornerX, upperLeftCornerY = reprojectedGrid
+        if numOfStripRows == None:
+            numOfStripRows = numOfRowsUTM - rowStart
+        
+        # source cell position of the target cells is calculated exactly only for every latticeStep-th target row and column, and linearly interpolated in between (the same approximation GDALWarp uses)
+        latticeStep = 16
+        latticeColumns = range(0, numOfColumnsUTM, latticeStep) + [numOfColumnsUTM-1] if ((numOfColumnsUTM-1) % latticeStep != 0) else range(0, numOfColumnsUTM, latticeStep)
+        latticeRows = range(rowStart, rowStart+numOfStripRows, latticeStep) + [rowStart+numOfStripRows-1] if ((numOfStripRows-1) % latticeStep != 0) else range(rowStart, rowStart+numOfStripRows, latticeStep)
+        def sourcePosition(column, row):
+            latitudeD, longitudeD = self.UTMtoLatLon(upperLeftCornerX + (column+0.5)*cellsizeM, upperLeftCornerY - (row+0.5)*cellsizeM, CRS_UTMzone, northOrsouth)
+            return (longitudeD - upperLeftLongitudeD)/cellsizeLongitudeD - 0.5, (upperLeftLatitudeD - latitudeD)/cellsizeLatitudeD - 0.5
+        lattice = [[sourcePosition(column, row)  for column in latticeColumns]  for row in latticeRows]
+        
+        # half of the target cell size, in source cells (for "average" resampling)
+        centerLatitudeD, centerLongitudeD = self.UTMtoLatLon(upperLeftCornerX + numOfColumnsUTM*cellsizeM/2, upperLeftCornerY - numOfRowsUTM*cellsizeM/2, CRS_UTMzone, northOrsouth)  # of the whole UTM grid, so that all of its strips are resampled equally
+        centerLatitudeR = math.radians(centerLatitudeD)
+        halfColumns = 0.5*cellsizeM / (math.radians(cellsizeLongitudeD)*6378137.0*math.cos(centerLatitudeR))
+        halfRows = 0.5*cellsizeM / (math.radians(cellsizeLatitudeD)*6378137.0)
+        if (resamplingMethod == "average") and (halfColumns <= 0.5) and (halfRows <= 0.5):
+            resamplingMethod = "bilinear"  # target cells are not larger than source ones: nothing to average
+        
+        def bilinear(column, row):
+            # positions up to half a cell outside of the source grid still lie on its edge cells
+            if (column < -0.5) or (row < -0.5) or (column > numOfColumns-0.5) or (row > numOfRows-0.5):
+                return nan
+            column = min(max(column, 0), numOfColumns-1)
+            row = min(max(row, 0), numOfRows-1)
+            column0 = min(int(column), max(numOfColumns-2, 0))
+            row0 = min(int(row), max(numOfRows-2, 0))
+            column1 = min(column0+1, numOfColumns-1)
+            row1 = min(row0+1, numOfRows-1)
+            columnFraction = column - column0
+            rowFraction = row - row0
+            heightTop = heights[row0*numOfColumns+column0]*(1-columnFraction) + heights[row0*numOfColumns+column1]*columnFraction
+            heightBottom = heights[row1*numOfColumns+column0]*(1-columnFraction) + heights[row1*numOfColumns+column1]*columnFraction
+            return heightTop*(1-rowFraction) + heightBottom*rowFraction
+        
+        def cubicWeights(fraction):
+            # Keys cubic convolution kernel (a = -0.5)
+            weights = []
+            for distance in (1+fraction, fraction, 1-fraction, 2-fraction):
+                if distance <= 1:
+                    weights.append(1.5*distance**3 - 2.5*distance**2 + 1)
+                else:
+                    weights.append(-0.5*distance**3 + 2.5*distance**2 - 4*distance + 2)
+            return weights
+        
+        def cubic(column, row):
+            column0 = int(math.floor(column))
+            row0 = int(math.floor(row))
+            if (column0 < 1) or (row0 < 1) or (column0 > numOfColumns-3) or (row0 > numOfRows-3):
+                return bilinear(column, row)  # not enough neighbours at the edges of the source grid
+            columnWeights = cubicWeights(column-column0)
+            rowWeights = cubicWeights(row-row0)
+            height = 0
+            for i in xrange(4):
+                start = (row0-1+i)*numOfColumns + column0-1
+                height += rowWeights[i] * (heights[start]*columnWeights[0] + heights[start+1]*columnWeights[1] + heights[start+2]*columnWeights[2] + heights[start+3]*columnWeights[3])
+            return height  # float("nan") if any of the 16 heights is float("nan")
+        
+        def average(column, row):
+            # each source cell is weighted by the part of it covered by the target cell
+            columnStart = max(int(math.floor(column-halfColumns+0.5)), 0)
+            columnEnd = min(int(math.ceil(column+halfColumns-0.5)), numOfColumns-1)
+            sourceRowStart = max(int(math.floor(row-halfRows+0.5)), 0)
+            sourceRowEnd = min(int(math.ceil(row+halfRows-0.5)), numOfRows-1)
+            columnWeights = [max(0, min(column_+0.5, column+halfColumns) - max(column_-0.5, column-halfColumns))  for column_ in xrange(columnStart, columnEnd+1)]
+            heightsSum = 0
+            weightsSum = 0
+            for row_ in xrange(sourceRowStart, sourceRowEnd+1):
+                rowWeight = max(0, min(row_+0.5, row+halfRows) - max(row_-0.5, row-halfRows))
+                for height, columnWeight in zip(heights[row_*numOfColumns+columnStart : row_*numOfColumns+columnEnd+1], columnWeights):
+                    if height == height:  # not float("nan")
+                        heightsSum += height*columnWeight*rowWeight
+                        weightsSum += columnWeight*rowWeight
+            if weightsSum == 0:
+                return bilinear(column, row)
+            return heightsSum/weightsSum
+        
+        sample = {"bilinear": bilinear, "cubic": cubic, "average": average}[resamplingMethod]
+        
+        heightsUTM = []
+        latticeRowIndex = 0
+        for row in xrange(rowStart, rowStart+numOfStripRows):
+            while (latticeRowIndex < len(latticeRows)-2) and (row > latticeRows[latticeRowIndex+1]):
+                latticeRowIndex += 1
+            if len(latticeRows) == 1:
+                rowLattice = lattice[0]
+            else:
+                rowFraction = float(row - latticeRows[latticeRowIndex]) / (latticeRows[latticeRowIndex+1] - latticeRows[latticeRowIndex])
+                rowLattice = [(top[0] + (bottom[0]-top[0])*rowFraction, top[1] + (bottom[1]-top[1])*rowFraction)  for top, bottom in zip(lattice[latticeRowIndex], lattice[latticeRowIndex+1])]
+            
+            latticeColumnIndex = 0
+            for column in xrange(numOfColumnsUTM):
+                while (latticeColumnIndex < len(latticeColumns)-2) and (column > latticeColumns[latticeColumnIndex+1]):
+                    latticeColumnIndex += 1
+                if len(latticeColumns) == 1:
+                    sourceColumn, sourceRow = rowLattice[0]
+                else:
+                    left = rowLattice[latticeColumnIndex]
+                    right = rowLattice[latticeColumnIndex+1]
+                    columnFraction = float(column - latticeColumns[latticeColumnIndex]) / (latticeColumns[latticeColumnIndex+1] - latticeColumns[latticeColumnIndex])
+                    sourceColumn = left[0] + (right[0]-left[0])*columnFraction
+                    sourceRow = left[1] + (right[1]-left[1])*columnFraction
+                heightsUTM.append(sample(sourceColumn, sourceRow))
+        
+        return heightsUTM, numOfStripRows, numOfColumnsUTM, cellsizeM, upperLeftCornerX, upperLeftCornerY - rowStart*cellsizeM
+    
+    
+    def reprojectRasterToDEMcache(self, rasterFilePath, demCacheFilePath, CRS_EPSG_code, CRS_UTMzone, northOrsouth, resamplingMethod="bilinear", downsamplingFactor=1, memoryLimitMB=512):
+        """
+        reproject a WGS 84 (latitude-longitude) raster file to a WGS 84 UTM zone heights grid (see reprojectHeights), and write it to a .json header file and a raw float32 .bin file next to it, so that it can be read by readDEMcache.
+        The raster is processed in strips of rows, so that the memory used stays around memoryLimitMB megabytes regardless of the size of the raster
+        """
+        grid = MapWinGIS.GridClass()
+        dataType = MapWinGIS.GridDataType.DoubleDataType
+        fileTypeExtension = MapWinGIS.GridFileType.UseExtension
+        inRam = False  # the raster is read strip by strip
+        openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterFilePath, dataType, inRam, fileTypeExtension, None)
+        if (openGridSuccess != True):
+            gridErrorMsg = grid.ErrorMsg
+            print "gridErrorMsg: ", gridErrorMsg
+        
+        header = grid.Header
+        numOfRows = header.NumberRows
+        numOfColumns = header.NumberCols
+        cellsizeLongitudeD = abs(header.dX)
+        cellsizeLatitudeD = abs(header.dY)
+        upperLeftLongitudeD = header.XllCenter - (cellsizeLongitudeD/2)
+        upperLeftLatitudeD = header.YllCenter - (cellsizeLatitudeD/2) + (cellsizeLatitudeD*numOfRows)
+        
+        reprojectedGrid = self.reprojectedGrid(numOfRows, numOfColumns, upperLeftLongitudeD, upperLeftLatitudeD, cellsizeLongitudeD, cellsizeLatitudeD, CRS_UTMzone, northOrsouth, None, downsamplingFactor)
+        numOfRowsUTM, numOfColumnsUTM, cellsizeM, upperLeftCornerX, upperLeftCornerY = reprojectedGrid
+        
+        # number of UTM rows per strip: a strip holds its UTM heights and the source rows covering them (about 32 bytes per height in a list)
+        bytesPerHeight = 32
+        sourceRowsPerRow = float(numOfRows)/numOfRowsUTM
+        numOfStripRows = int(memoryLimitMB*1024*1024 / (bytesPerHeight * (numOfColumnsUTM + sourceRowsPerRow*numOfColumns)))
+        numOfStripRows = min(max(numOfStripRows, 16), numOfRowsUTM)
+        
+        # source rows outside of the strip which are still used by the resampling (cubic neighbours, averaged cells)
+        marginRows = 3 + int(math.ceil(cellsizeM / (math.radians(cellsizeLatitudeD)*6378137.0)))
+        
+        demCacheDataFilePath = os.path.splitext(demCacheFilePath)[0] + ".bin"
+        myFile = open(demCacheDataFilePath, "wb")
+        minHeight = float("inf")
+        maxHeight = float("-inf")
+        for rowStart in xrange(0, numOfRowsUTM, numOfStripRows):
+            numOfStripRows_ = min(numOfStripRows, numOfRowsUTM-rowStart)
+            
+            # source rows covering the strip: from the strip's top and bottom edges
+            sourceRows = []
+            for row in (rowStart, rowStart+numOfStripRows_):
+                for column in range(0, numOfColumnsUTM+1, max(1, numOfColumnsUTM/16)) + [numOfColumnsUTM]:
+                    latitudeD, longitudeD = self.UTMtoLatLon(upperLeftCornerX + column*cellsizeM, upperLeftCornerY - row*cellsizeM, CRS_UTMzone, northOrsouth)
+                    sourceRows.append((upperLeftLatitudeD - latitudeD)/cellsizeLatitudeD)
+            sourceRowStart = min(max(int(math.floor(min(sourceRows))) - marginRows, 0), numOfRows-1)
+            sourceRowEnd = min(max(int(math.ceil(max(sourceRows))) + marginRows, 0), numOfRows-1)
+            
+            sourceHeights = self.gridHeights(grid, sourceRowStart, sourceRowEnd-sourceRowStart+1)
+            stripHeights = self.reprojectHeights(sourceHeights, sourceRowEnd-sourceRowStart+1, numOfColumns, upperLeftLongitudeD, upperLeftLatitudeD - sourceRowStart*cellsizeLatitudeD, cellsizeLongitudeD, cellsizeLatitudeD, CRS_UTMzone, northOrsouth, cellsizeM, resamplingMethod, downsamplingFactor, reprojectedGrid, rowStart, numOfStripRows_)[0]
+            del sourceHeights
+            
+            stripHeightsFloat32 = array.array("f", stripHeights)
+            del stripHeights
+            stripHeightsFloat32.tofile(myFile)
+            validHeights = [height  for height in stripHeightsFloat32  if height == height]  # without float("nan") (no data) heights
+            if validHeights:
+                minHeight = min(minHeight, min(validHeights))
+                maxHeight = max(maxHeight, max(validHeights))
+            del validHeights, stripHeightsFloat32
+        myFile.close()
+        
+        closeGridSuccess = grid.Close()
+        del grid
+        
+        demHeader = {
+        "CRS_EPSG_code": CRS_EPSG_code,
+        "numOfRows": numOfRowsUTM,
+        "numOfColumns": numOfColumnsUTM,
+        "cellsizeM": cellsizeM,
+        "upperLeftCornerX": upperLeftCornerX,
+        "upperLeftCornerY": upperLeftCornerY,
+        "minHeight": minHeight if (minHeight != float("inf")) else None,
+        "maxHeight": maxHeight if (maxHeight != float("-inf")) else None,
+        "dataFile": os.path.basename(demCacheDataFilePath)
+        }
+        # the header is written last: a .json file without its complete .bin file never exists
+        myFile = open(demCacheFilePath, "w")
+        json.dump(demHeader, myFile)
+        myFile.close()
+        
+        return demHeader
+    
+    
+    def readDEMcache(self, demCacheFilePath, columnStart=0, rowStart=0, numOfWindowColumns=None, numOfWindowRows=None):
+        """
+        read a window (by default the whole grid) of heights written by reprojectRasterToDEMcache (or demCachePyramid).
+        The .bin file is memory mapped, so only the part of it covered by the window is read from the disk
+        """
+        myFile = open(demCacheFilePath, "r")
+        header = json.load(myFile)
+        myFile.close()
+        
+        numOfColumns = header["numOfColumns"]
+        if numOfWindowColumns == None:
+            numOfWindowColumns = numOfColumns - columnStart
+        if numOfWindowRows == None:
+            numOfWindowRows = header["numOfRows"] - rowStart
+        
+        heights = array.array("f")
+        itemsize = heights.itemsize
+        demCacheDataFilePath = os.path.join(os.path.dirname(demCacheFilePath), header["dataFile"])
+        myFile = open(demCacheDataFilePath, "rb")
+        try:
+            import mmap
+            demMap = mmap.mmap(myFile.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception, e:
+            demMap = None  # no mmap module or memory mapping failed: seek and read row by row instead
+        
+        for row in xrange(rowStart, rowStart+numOfWindowRows):
+            start = (row*numOfColumns + columnStart) * itemsize
+            if demMap != None:
+                heights.fromstring(demMap[start : start + numOfWindowColumns*itemsize])
+            else:
+                myFile.seek(start)
+                heights.fromstring(myFile.read(numOfWindowColumns*itemsize))
+        
+        if demMap != None:
+            demMap.close()
+        myFile.close()
+        
+        return heights, header
+    
+    
+    def demCachePyramid(self, demCacheFilePath, numOfLevels):
+        """
+        write numOfLevels coarser levels (a pyramid) of a DEM cache written by reprojectRasterToDEMcache. Each level halves the number of rows and columns of the previous one: its heights are the means of the 2x2 heights below.
+        Every level gets its own .json header and .bin file which can be read by readDEMcache. Returns the list of level .json file paths
+        """
+        # level headers also contain "maxHeightRangeM": the largest difference between the full resolution heights covered by any 2x2 neighbouring cells of the level.
+        # an interpolated height of the level is never further than maxHeightRangeM from the full resolution height at the same position
+        nan = float("nan")
+        header = self.readDEMcache(demCacheFilePath, 0, 0, 0, 0)[1]  # header only
+        numOfRows = header["numOfRows"]
+        numOfColumns = header["numOfColumns"]
+        
+        def reduceRows(rowA, rowB, function):
+            # 2x2 cells of two neighbouring rows into a single row of half the width. float("nan") heights are ignored
+            if len(rowA) % 2 == 1:
+                rowA = rowA + [nan]
+                rowB = rowB + [nan]
+            reducedRow = []
+            for cell in zip(rowA[0::2], rowA[1::2], rowB[0::2], rowB[1::2]):
+                validCell = [height  for height in cell  if height == height]
+                reducedRow.append(function(validCell) if validCell else nan)
+            return reducedRow
+        mean = lambda heights: sum(heights)/len(heights)
+        
+        basePath = os.path.splitext(demCacheFilePath)[0]
+        levelFilePaths = [basePath + "_level%s.json" % level  for level in xrange(1, numOfLevels+1)]
+        levelDataFiles = [open(os.path.splitext(levelFilePath)[0] + ".bin", "wb")  for levelFilePath in levelFilePaths]
+        previousMinRows = [None] * numOfLevels
+        previousMaxRows = [None] * numOfLevels
+        maxHeightRanges = [0] * numOfLevels
+        levelMinHeights = [float("inf")] * numOfLevels
+        levelMaxHeights = [float("-inf")] * numOfLevels
+        
+        # the grid is read in blocks of rows which make exactly one row of the coarsest level
+        numOfBlockRows = 2**numOfLevels
+        for blockRowStart in xrange(0, numOfRows, numOfBlockRows):
+            numOfBlockRows_ = min(numOfBlockRows, numOfRows-blockRowStart)
+            block = self.readDEMcache(demCacheFilePath, 0, blockRowStart, numOfColumns, numOfBlockRows_)[0]
+            meanRows = [list(block[row*numOfColumns : (row+1)*numOfColumns])  for row in xrange(numOfBlockRows_)]
+            del block
+            minRows = maxRows = meanRows
+            
+            for level in xrange(numOfLevels):
+                if len(meanRows) % 2 == 1:
+                    nanRow = [nan] * len(meanRows[0])
+                    meanRows = meanRows + [nanRow]
+                    minRows = minRows + [nanRow]
+                    maxRows = maxRows + [nanRow]
+                meanRows = [reduceRows(meanRows[row], meanRows[row+1], mean)  for row in xrange(0, len(meanRows), 2)]
+                minRows = [reduceRows(minRows[row], minRows[row+1], min)  for row in xrange(0, len(minRows), 2)]
+                maxRows = [reduceRows(maxRows[row], maxRows[row+1], max)  for row in xrange(0, len(maxRows), 2)]
+                
+                for meanRow, minRow, maxRow in zip(meanRows, minRows, maxRows):
+                    array.array("f", meanRow).tofile(levelDataFiles[level])
+                    validMeans = [height  for height in meanRow  if height == height]
+                    if validMeans:
+                        levelMinHeights[level] = min(levelMinHeights[level], min(validMeans))
+                        levelMaxHeights[level] = max(levelMaxHeights[level], max(validMeans))
+                    
+                    # range of the heights covered by the 2x2 neighbouring cells (of this and the previous row)
+                    minRow2 = minRow if (previousMinRows[level] == None) else [height1 if (height2 != height2) or (height1 < height2) else height2  for height1, height2 in zip(minRow, previousMinRows[level])]
+                    maxRow2 = maxRow if (previousMaxRows[level] == None) else [height1 if (height2 != height2) or (height1 > height2) else height2  for height1, height2 in zip(maxRow, previousMaxRows[level])]
+                    for column in xrange(len(minRow2)):
+                        cellMins = [height  for height in minRow2[column : column+2]  if height == height]
+                        if cellMins:
+                            heightRange = max(height  for height in maxRow2[column : column+2]  if height == height) - min(cellMins)
+                            maxHeightRanges[level] = max(maxHeightRanges[level], heightRange)
+                    previousMinRows[level] = minRow
+                    previousMaxRows[level] = maxRow
+        
+        for level in xrange(numOfLevels):
+            levelDataFiles[level].close()
+            levelHeader = dict(header)
+            levelHeader["level"] = level+1
+            levelHeader["numOfRows"] = int(math.ceil(numOfRows / 2.0**(level+1)))
+            levelHeader["numOfColumns"] = int(math.ceil(numOfColumns / 2.0**(level+1)))
+            levelHeader["cellsizeM"] = header["cellsizeM"] * 2**(level+1)
+            levelHeader["minHeight"] = levelMinHeights[level] if (levelMinHeights[level] != float("inf")) else None
+            levelHeader["maxHeight"] = levelMaxHeights[level] if (levelMaxHeights[level] != float("-inf")) else None
+            levelHeader["maxHeightRangeM"] = maxHeightRanges[level]
+            levelHeader["dataFile"] = os.path.basename(os.path.splitext(levelFilePaths[level])[0] + ".bin")
+            # the header is written last: a .json file without its complete .bin file never exists
+            myFile = open(levelFilePaths[level], "w")
+            json.dump(levelHeader, myFile)
+            myFile.close()
+        
+        return levelFilePaths
+    
+    
     def filterShapes(self, shortenedName_keys, subValuesL, shapesL, osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove):
         """
         filter values and shapes for the four inputs from "OSM ids" component
@@ -2293,6 +2945,1506 @@ class OSM():
         return requiredKeyRequiredValue_dict
 
 
+class Terrain():
+    """
+    methods for analysis of terrain height grids (DEM rasters). They operate on plain lists of heights, and do not use any Rhino geometry
+    """
+    def curvatureRefractionCorrection(self, distanceM):
+        """
+        calculate the Earth's curvature and refraction correction for a terrain point at horizontal distanceM from the observer
+        """
+        # source: "Surveying And Levelling" second edition, N.N. Basak, McGraw Hill Education (India) Private Limited, p161
+        distanceKM = distanceM/1000
+        correctionM = (0.0675 * (distanceKM**2))  # refraction and curvature correction (in meters)
+        
+        return correctionM
+    
+    
+    def heightAt(self, heights, numOfRows, numOfColumns, column, row):
+        """
+        bilinearly interpolate the height at fractional column, row position of the heights grid
+        """
+        # heights grid is a flat list of numOfRows*numOfColumns heights, row after row, starting from the upper left (north-west) corner: heights[row*numOfColumns + column]
+        # float("nan") is returned for positions outside of the grid, or if one of the four surrounding heights is float("nan") (no data)
+        if (column < 0) or (row < 0) or (column > numOfColumns-1) or (row > numOfRows-1):
+            return float("nan")
+        
+        column0 = min(int(column), numOfColumns-2)
+        row0 = min(int(row), numOfRows-2)
+        columnFraction = column - column0
+        rowFraction = row - row0
+        index0 = row0*numOfColumns + column0
+        
+        heightTop = heights[index0]*(1-columnFraction) + heights[index0+1]*columnFraction
+        heightBottom = heights[index0+numOfColumns]*(1-columnFraction) + heights[index0+numOfColumns+1]*columnFraction
+        height = heightTop*(1-rowFraction) + heightBottom*rowFraction
+        
+        return height
+    
+    
+    def horizonScan(self, heights, numOfRows, numOfColumns, cellsize, observerColumn, observerRow, observerHeightM, azimuthsD, minVisibilityRadiusM=0, maxVisibilityRadiusM=None):
+        """
+        calculate horizon angles seen from the observer by marching along each azimuth through the heights grid
+        """
+        # azimuthsD are clockwise from north (grid's "up" direction). observerColumn, observerRow are fractional grid indices. observerHeightM and heights are in meters
+        # each sample along the azimuth is corrected for the Earth's curvature and refraction. Samples closer than minVisibilityRadiusM are excluded
+        # horizon angles are in degrees. Azimuths without a single valid terrain sample get -90
+        # the observer does not need to be inside of the heights grid: a grid can be a strip of rows of a larger one (with observerRow shifted accordingly), and the largest horizon angles of all the strips are the horizon angles of the whole grid
+        stepM = cellsize  # one sample per cell
+        if maxVisibilityRadiusM == None:
+            maxVisibilityRadiusM = math.sqrt(numOfRows**2 + numOfColumns**2) * cellsize  # up to the grid's edge
+        firstStep = max(1, int(math.ceil(minVisibilityRadiusM/stepM)))
+        lastStep = int(maxVisibilityRadiusM/stepM)
+        
+        # distances and curvature corrections are equal for all azimuths, so calculate them only once
+        stepDistancesM = [n*stepM for n in xrange(firstStep, lastStep+1)]
+        stepCorrectionsM = [self.curvatureRefractionCorrection(distanceM) for distanceM in stepDistancesM]
+        
+        def stepsInside(start, step, last):
+            # range of step numbers for which start + step*stepNumber lies within 0 to last
+            if step == 0:
+                return (float("-inf"), float("inf")) if (0 <= start <= last) else (1, 0)
+            bound1 = (0 - start)/step
+            bound2 = (last - start)/step
+            return min(bound1, bound2), max(bound1, bound2)
+        
+        lastColumn = numOfColumns-1
+        lastRow = numOfRows-1
+        horizonAnglesD = []
+        for azimuthD in azimuthsD:
+            azimuthR = math.radians(azimuthD)
+            columnStep = round(math.sin(azimuthR), 12)  # round, so that the samples along 0, 90, 180, 270 azimuths do not fall off the grid edge due to floating point error
+            rowStep = -round(math.cos(azimuthR), 12)  # rows grow towards south
+            maxTangent = float("-inf")
+            
+            # the samples of the azimuth which lie within the grid
+            columnStepsMin, columnStepsMax = stepsInside(observerColumn, columnStep, lastColumn)
+            rowStepsMin, rowStepsMax = stepsInside(observerRow, rowStep, lastRow)
+            stepsMin = max(columnStepsMin, rowStepsMin, firstStep)
+            stepsMax = min(columnStepsMax, rowStepsMax, lastStep)
+            if stepsMin <= stepsMax:
+                for stepNumber in xrange(int(math.ceil(stepsMin)), int(math.floor(stepsMax))+1):
+                    column = min(max(observerColumn + columnStep*stepNumber, 0), lastColumn)
+                    row = min(max(observerRow + rowStep*stepNumber, 0), lastRow)
+                    
+                    # bilinear interpolation (inlined heightAt, as this is the hot loop)
+                    column0 = min(int(column), lastColumn-1)
+                    row0 = min(int(row), lastRow-1)
+                    columnFraction = column - column0
+                    rowFraction = row - row0
+                    index0 = row0*numOfColumns + column0
+                    heightTop = heights[index0]*(1-columnFraction) + heights[index0+1]*columnFraction
+                    heightBottom = heights[index0+numOfColumns]*(1-columnFraction) + heights[index0+numOfColumns+1]*columnFraction
+                    height = heightTop*(1-rowFraction) + heightBottom*rowFraction
+                    
+                    n = stepNumber - firstStep
+                    tangent = (height - stepCorrectionsM[n] - observerHeightM) / stepDistancesM[n]
+                    if tangent > maxTangent:  # float("nan") (no data) tangent is never larger
+                        maxTangent = tangent
+            horizonAnglesD.append(math.degrees(math.atan(maxTangent)))
+        
+        return horizonAnglesD
+    
+    
+    def horizonMap(self, heights, numOfRows, numOfColumns, cellsize, azimuthsD, observerHeightM=0, nearSamples=8):
+        """
+        calculate horizon angles of all cells of the heights grid for each azimuth, by a sweep with a convex hull stack
+        """
+        # based on: "Fast horizon computation at all points of a terrain with visibility and shading applications", A. James Stewart, IEEE TVCG, 1998
+        # and: "Bump map shading and horizon maps", B. Cabral, N. Max, R. Springmeyer, Computer Graphics, 1987
+        # for each azimuth, the grid is covered with parallel lines (one cell apart) running in the azimuth direction, and each cell is assigned to the two lines on its both sides.
+        # Each line is swept backwards (from its far end in azimuth direction), while the upper convex hull of the terrain profile sampled along the line (one cell apart) is kept on a stack.
+        # The horizon of a cell is the tangent from the cell to the hull of the samples at least nearSamples cells ahead of it: amortized O(1) for the hull update, O(log n) for the tangent.
+        # The tangents from the two lines are linearly interpolated to the cell's own offset across them, instead of taking the profile of the nearest line which can be up to half a cell to the side of the cell.
+        # A line sample is up to one cell to the side of the cell's own azimuth, which is a large angle for near samples. So the first nearSamples-1 samples (one cell apart) are taken along the cell's own azimuth, the same as in "horizonScan".
+        # For nearSamples=8, 99% of the horizon angles are within 1 degree (smooth terrain) to 2 degrees (rough terrain) of the horizonScan ones. Cells less than nearSamples cells away from the grid's edge in azimuth direction can differ up to about 8 degrees, as the profiles of their two lines end at different distances
+        # Earth's curvature and refraction correction (c*d**2) does not break the convexity: for heights reduced by c*s**2 (s being the position along the line), the corrected tangent from cell i to sample j is (H_j - H_i)/(s_j - s_i) + 2*c*s_i
+        # returned horizonMap is a flat array.array("f") of horizon angles in degrees: horizonMap[azimuthIndex*numOfRows*numOfColumns + row*numOfColumns + column]
+        # cells without any terrain in azimuth direction (on the grid's edge) and no data cells get -90
+        correctionFactor = 0.0675/1000000  # curvatureRefractionCorrection per square meter
+        numOfCells = numOfRows*numOfColumns
+        lastColumn = numOfColumns-1
+        lastRow = numOfRows-1
+        horizonMap = array.array("f")
+        
+        for azimuthD in azimuthsD:
+            azimuthR = math.radians(azimuthD)
+            columnStep = round(math.sin(azimuthR), 12)  # round, so that the samples along 0, 90, 180, 270 azimuths do not fall off the grid edge due to floating point error
+            rowStep = -round(math.cos(azimuthR), 12)  # rows grow towards south
+            
+            # positions across (t) and along (s) the azimuth direction, in cells: column = -t*rowStep + s*columnStep, row = t*columnStep + s*rowStep
+            cornersT = [-column*rowStep + row*columnStep  for column,row in [(0,0), (lastColumn,0), (0,lastRow), (lastColumn,lastRow)]]
+            cornersS = [column*columnStep + row*rowStep  for column,row in [(0,0), (lastColumn,0), (0,lastRow), (lastColumn,lastRow)]]
+            firstLineT = int(math.floor(min(cornersT)))
+            lastSampleS = int(math.ceil(max(cornersS)))
+            numOfLines = int(math.ceil(max(cornersT))) - firstLineT + 1
+            
+            # assign each cell to the lines on its both sides, with weights by its offset across them
+            linesCells = [[] for i in xrange(numOfLines+1)]
+            index = 0
+            for row in xrange(numOfRows):
+                for column in xrange(numOfColumns):
+                    t = -column*rowStep + row*columnStep - firstLineT
+                    s = column*columnStep + row*rowStep
+                    lineIndex = int(math.floor(t))
+                    weight = t - lineIndex
+                    linesCells[lineIndex].append((s, index, 1-weight))
+                    if weight > 0:
+                        linesCells[lineIndex+1].append((s, index, weight))
+                    index += 1
+            
+            cellsTangents = [0.0]*numOfCells; cellsWeights = [0.0]*numOfCells  # weighted sums of the tangents from both lines
+            for lineIndex in xrange(numOfLines+1):
+                lineCells = linesCells[lineIndex]
+                if len(lineCells) == 0:
+                    continue
+                lineCells.sort(reverse=True)  # from the far end of the line
+                lineT = firstLineT + lineIndex
+                hullPositionsM = []; hullHeights = []  # the last stack item is the nearest one to the cell currently swept
+                sampleS = lastSampleS
+                
+                for s, index, weight in lineCells:
+                    height = heights[index]
+                    if height != height:
+                        continue  # no data (float("nan")) cell
+                    
+                    # add the samples at least one cell ahead to the hull
+                    while sampleS >= s + nearSamples:
+                        column = -lineT*rowStep + sampleS*columnStep
+                        row = lineT*columnStep + sampleS*rowStep
+                        if (column >= 0) and (row >= 0) and (column <= lastColumn) and (row <= lastRow):
+                            column0 = min(int(column), lastColumn-1)
+                            row0 = min(int(row), lastRow-1)
+                            columnFraction = column - column0
+                            rowFraction = row - row0
+                            index0 = row0*numOfColumns + column0
+                            sampleHeight = (heights[index0]*(1-columnFraction) + heights[index0+1]*columnFraction)*(1-rowFraction) + (heights[index0+numOfColumns]*(1-columnFraction) + heights[index0+numOfColumns+1]*columnFraction)*rowFraction
+                            if sampleHeight == sampleHeight:
+                                samplePositionM = sampleS*cellsize
+                                sampleReducedHeight = sampleHeight - correctionFactor*samplePositionM*samplePositionM
+                                while (len(hullPositionsM) >= 2) and ((hullHeights[-1] - sampleReducedHeight) * (hullPositionsM[-2] - samplePositionM) <= (hullHeights[-2] - sampleReducedHeight) * (hullPositionsM[-1] - samplePositionM)):
+                                    hullPositionsM.pop(); hullHeights.pop()
+                                hullPositionsM.append(samplePositionM)
+                                hullHeights.append(sampleReducedHeight)
+                        sampleS -= 1
+                    
+                    hullCount = len(hullPositionsM)
+                    if hullCount == 0:
+                        continue
+                    # tangent from the (lifted) cell to the hull. Slopes towards the hull vertices are unimodal from the nearest to the farthest vertex
+                    positionM = s*cellsize
+                    observerReducedHeight = height - correctionFactor*positionM*positionM + observerHeightM
+                    low = 0; high = hullCount-1  # counted from the nearest hull vertex
+                    while low < high:
+                        middle = (low+high)//2
+                        slopeMiddle = (hullHeights[hullCount-1-middle] - observerReducedHeight) / (hullPositionsM[hullCount-1-middle] - positionM)
+                        slopeNext = (hullHeights[hullCount-2-middle] - observerReducedHeight) / (hullPositionsM[hullCount-2-middle] - positionM)
+                        if slopeNext <= slopeMiddle:
+                            high = middle
+                        else:
+                            low = middle+1
+                    tangent = (hullHeights[hullCount-1-low] - observerReducedHeight) / (hullPositionsM[hullCount-1-low] - positionM) + 2*correctionFactor*positionM
+                    cellsTangents[index] += weight*tangent
+                    cellsWeights[index] += weight
+            
+            # cells with the terrain ahead of only one of their lines get its tangent. Then the near samples along the cell's own azimuth
+            nearDistancesM = [n*cellsize  for n in xrange(1, nearSamples)]
+            nearCorrectionsM = [correctionFactor*distanceM*distanceM  for distanceM in nearDistancesM]
+            horizonAnglesD = array.array("f", [-90])*numOfCells
+            index = 0
+            for row in xrange(numOfRows):
+                for column in xrange(numOfColumns):
+                    if cellsWeights[index] > 0:
+                        tangent = cellsTangents[index]/cellsWeights[index]
+                    else:
+                        tangent = float("-inf")
+                    for n in xrange(nearSamples-1):
+                        nearColumn = column + columnStep*(n+1)
+                        nearRow = row + rowStep*(n+1)
+                        if (nearColumn < 0) or (nearRow < 0) or (nearColumn > lastColumn) or (nearRow > lastRow):
+                            break
+                        column0 = min(int(nearColumn), lastColumn-1)
+                        row0 = min(int(nearRow), lastRow-1)
+                        columnFraction = nearColumn - column0
+                        rowFraction = nearRow - row0
+                        index0 = row0*numOfColumns + column0
+                        nearHeight = (heights[index0]*(1-columnFraction) + heights[index0+1]*columnFraction)*(1-rowFraction) + (heights[index0+numOfColumns]*(1-columnFraction) + heights[index0+numOfColumns+1]*columnFraction)*rowFraction
+                        nearTangent = (nearHeight - nearCorrectionsM[n] - heights[index] - observerHeightM) / nearDistancesM[n]
+                        if nearTangent > tangent:  # float("nan") (no data) tangent is never larger
+                            tangent = nearTangent
+                    if (tangent != float("-inf")) and (heights[index] == heights[index]):
+                        horizonAnglesD[index] = math.degrees(math.atan(tangent))
+                    index += 1
+            
+            horizonMap.extend(horizonAnglesD)
+            del linesCells; del cellsTangents; del cellsWeights
+        
+        return horizonMap
+    
+    
+    def writeHorizonMap(self, horizonMapFilePath, horizonMap, header):
+        """
+        write the horizonMap to a .json header file and a raw float32 .bin file next to it
+        """
+        horizonMapDataFilePath = os.path.splitext(horizonMapFilePath)[0] + ".bin"
+        header["dataFile"] = os.path.basename(horizonMapDataFilePath)
+        
+        myFile = open(horizonMapDataFilePath, "wb")
+        horizonMap.tofile(myFile)
+        myFile.close()
+        
+        myFile = open(horizonMapFilePath, "w")
+        json.dump(header, myFile)
+        myFile.close()
+    
+    
+    def readHorizonMapHeader(self, horizonMapFilePath):
+        """
+        read the .json header of a horizon map written by writeHorizonMap
+        """
+        myFile = open(horizonMapFilePath, "r")
+        header = json.load(myFile)
+        myFile.close()
+        
+        return header
+    
+    
+    def horizonMapProfile(self, horizonMapFilePath, header, column, row):
+        """
+        read horizon angles of all azimuths for a single cell of a horizon map, without loading the whole map
+        """
+        numOfRows = header["numOfRows"]
+        numOfColumns = header["numOfColumns"]
+        column = min(max(int(round(column)), 0), numOfColumns-1)
+        row = min(max(int(round(row)), 0), numOfRows-1)
+        
+        horizonMapDataFilePath = os.path.join(os.path.dirname(horizonMapFilePath), header["dataFile"])
+        myFile = open(horizonMapDataFilePath, "rb")
+        horizonAnglesD = array.array("f")
+        for azimuthIndex in xrange(len(header["azimuthsD"])):
+            myFile.seek((azimuthIndex*numOfRows*numOfColumns + row*numOfColumns + column) * horizonAnglesD.itemsize)
+            horizonAnglesD.fromstring(myFile.read(horizonAnglesD.itemsize))
+        myFile.close()
+        
+        return list(horizonAnglesD)
+    
+    
+    def windowSums(self, values, numOfRows, numOfColumns):
+        """
+        sum the values of each cell's 3x3 cells window. Cells outside of the grid are left out
+        """
+        # separable sliding sums: first along each row, then along each column. Both are O(N)
+        rowSums = [0.0] * (numOfRows*numOfColumns)
+        for row in xrange(numOfRows):
+            rowStart = row*numOfColumns
+            for column in xrange(numOfColumns):
+                index = rowStart + column
+                windowSum = values[index]
+                if column > 0:
+                    windowSum += values[index-1]
+                if column < numOfColumns-1:
+                    windowSum += values[index+1]
+                rowSums[index] = windowSum
+        
+        windowSums = [0.0] * (numOfRows*numOfColumns)
+        for row in xrange(numOfRows):
+            rowStart = row*numOfColumns
+            for column in xrange(numOfColumns):
+                index = rowStart + column
+                windowSum = rowSums[index]
+                if row > 0:
+                    windowSum += rowSums[index-numOfColumns]
+                if row < numOfRows-1:
+                    windowSum += rowSums[index+numOfColumns]
+                windowSums[index] = windowSum
+        
+        return windowSums
+    
+    
+    def windowMinMax(self, values, numOfRows, numOfColumns):
+        """
+        find the minimal and maximal value of each cell's 3x3 cells window. Cells outside of the grid are left out
+        """
+        rowMins = [0.0] * (numOfRows*numOfColumns)
+        rowMaxs = [0.0] * (numOfRows*numOfColumns)
+        for row in xrange(numOfRows):
+            rowStart = row*numOfColumns
+            rowEnd = rowStart + numOfColumns
+            for index in xrange(rowStart, rowEnd):
+                windowValues = values[max(index-1, rowStart):min(index+2, rowEnd)]
+                rowMins[index] = min(windowValues)
+                rowMaxs[index] = max(windowValues)
+        
+        windowMins = [0.0] * (numOfRows*numOfColumns)
+        windowMaxs = [0.0] * (numOfRows*numOfColumns)
+        for index in xrange(numOfRows*numOfColumns):
+            upperIndex = index-numOfColumns if (index >= numOfColumns) else index
+            lowerIndex = index+numOfColumns if (index < (numOfRows-1)*numOfColumns) else index
+            windowMins[index] = min(rowMins[upperIndex], rowMins[index], rowMins[lowerIndex])
+            windowMaxs[index] = max(rowMaxs[upperIndex], rowMaxs[index], rowMaxs[lowerIndex])
+        
+        return windowMins, windowMaxs
+    
+    
+    def roughnessIndices(self, heights, normalsX, normalsY, normalsZ, numOfRows, numOfColumns):
+        """
+        calculate TRI, SRF, TPI and ERR of each cell of the heights grid, for a 3x3 cells window
+        """
+        # based on: http://download.osgeo.org/qgis/doc/reference-docs/Terrain_Ruggedness_Index.pdf
+        # http://gis.stackexchange.com/a/6059/65002
+        # https://github.com/wschwanghart/topotoolbox/blob/master/@GRIDobj/roughness.m
+        # normalsX, normalsY, normalsZ are the unit surface normal components at each cell. Edge and corner cells have 5 and 3 neighbouring cells in their window instead of 8
+        numOfCells = numOfRows*numOfColumns
+        
+        # heights are taken relative to their mean, to keep the sums of squared heights precise
+        meanHeight = sum(heights)/numOfCells
+        relativeHeights = [height - meanHeight  for height in heights]
+        heightSums = self.windowSums(relativeHeights, numOfRows, numOfColumns)
+        squaredHeightSums = self.windowSums([height*height  for height in relativeHeights], numOfRows, numOfColumns)
+        normalXsums = self.windowSums(normalsX, numOfRows, numOfColumns)
+        normalYsums = self.windowSums(normalsY, numOfRows, numOfColumns)
+        normalZsums = self.windowSums(normalsZ, numOfRows, numOfColumns)
+        heightMins, heightMaxs = self.windowMinMax(relativeHeights, numOfRows, numOfColumns)
+        
+        TRI_List = []
+        SRF_List = []
+        TPI_List = []
+        ERR_List = []
+        for row in xrange(numOfRows):
+            windowRows = 3 - (row == 0) - (row == numOfRows-1)
+            for column in xrange(numOfColumns):
+                index = row*numOfColumns + column
+                windowCells = windowRows * (3 - (column == 0) - (column == numOfColumns-1))
+                centralHeight = relativeHeights[index]
+                
+                # Terrain Ruggedness Index (Riley): square root of the sum of squared height differences between the central cell and its neighbouring cells
+                squaredDifferencesSum = windowCells*centralHeight*centralHeight - 2*centralHeight*heightSums[index] + squaredHeightSums[index]
+                TRI_List.append(math.sqrt(max(squaredDifferencesSum, 0)))
+                
+                # Surface Roughness Factor (Hobson): length of the resultant of unit normals in the window, divided by the number of cells
+                SRF_List.append(math.sqrt(normalXsums[index]**2 + normalYsums[index]**2 + normalZsums[index]**2) / windowCells)
+                
+                # Topographic Position Index: difference between the central cell height and mean height of its neighbouring cells
+                TPI_List.append(centralHeight - (heightSums[index] - centralHeight)/(windowCells - 1))
+                
+                # Elevation-Relief Ratio (Pike and Wilson, 1971), source: Olaya, V. 2009: Basic land-surface parameters. In: Geomorphometry, Hengl, T. & Reuter, H. I.
+                relief = heightMaxs[index] - heightMins[index]
+                if relief > 0:
+                    ERR_List.append((heightSums[index]/windowCells - heightMins[index]) / relief)
+                else:
+                    ERR_List.append(0)  # flat window
+        
+        return TRI_List, SRF_List, TPI_List, ERR_List
+    
+    
+    def summedAreaTable(self, values, numOfRows, numOfColumns):
+        """
+        create a summed-area table (integral image) of the values grid
+        """
+        # the table has an additional first row and first column of zeros: its (numOfRows+1)*(numOfColumns+1) items are the sums of all values above and to the left of each table item
+        tableColumns = numOfColumns+1
+        table = [0.0] * ((numOfRows+1)*tableColumns)
+        for row in xrange(numOfRows):
+            rowSum = 0.0
+            upperIndex = row*tableColumns + 1
+            index = upperIndex + tableColumns
+            for value in values[row*numOfColumns:(row+1)*numOfColumns]:
+                rowSum += value
+                table[index] = table[upperIndex] + rowSum
+                index += 1; upperIndex += 1
+        
+        return table
+    
+    
+    def topographicPositionIndices(self, heights, numOfRows, numOfColumns, columnSpacing, rowSpacing, innerRadius, outerRadius, circular=True):
+        """
+        calculate TPI and DEV of each cell of the heights grid, for a neighbourhood between innerRadius and outerRadius
+        """
+        # based on: "Topographic Position and Landforms Analysis", A. Weiss, poster presentation, ESRI User Conference, 2001
+        # "Topographic Position Index (tpi_jen.avx) extension for ArcView 3.x", J. Jenness, Jenness Enterprises, 2006
+        # DEV (deviation from mean elevation) is TPI divided by the standard deviation of the neighbourhood heights, source: "Primary topographic attributes", J.C. Gallant, J.P. Wilson, In: Terrain analysis: principles and applications, 2000
+        # circular neighbourhood is an annulus: cells whose center distance is larger than innerRadius and not larger than outerRadius. Rectangular neighbourhood is an outer rectangle without the inner one, both with half sizes of the radii
+        # the central cell is never a part of its neighbourhood. Cells outside of the grid are left out
+        # neighbourhood sums are read from summed-area tables of heights and squared heights: O(1) per cell for rectangular, and O(outerRadius) per cell for circular neighbourhoods (one table lookup for each row of the annulus)
+        numOfCells = numOfRows*numOfColumns
+        tableColumns = numOfColumns+1
+        
+        # heights are taken relative to their mean, to keep the sums of squared heights precise
+        meanHeight = sum(heights)/numOfCells
+        relativeHeights = [height - meanHeight  for height in heights]
+        heightTable = self.summedAreaTable(relativeHeights, numOfRows, numOfColumns)
+        squaredHeightTable = self.summedAreaTable([height*height  for height in relativeHeights], numOfRows, numOfColumns)
+        
+        # half sizes of the outer and inner rectangles, in cells
+        outerRows = int(outerRadius/rowSpacing + 1e-9); outerColumns = int(outerRadius/columnSpacing + 1e-9)
+        innerRows = int(innerRadius/rowSpacing + 1e-9); innerColumns = int(innerRadius/columnSpacing + 1e-9)
+        if circular:
+            # annulus as a list of rows: (row offset, outer half span, inner half span) in cells. Inner half span of -1 means that the inner circle does not reach that row
+            neighbourhoodRows = []
+            for rowOffset in xrange(-outerRows, outerRows+1):
+                rowDistance = abs(rowOffset)*rowSpacing
+                outerHalfSpan = int(math.sqrt(max(outerRadius**2 - rowDistance**2, 0))/columnSpacing + 1e-9)
+                if rowDistance <= innerRadius:
+                    innerHalfSpan = int(math.sqrt(innerRadius**2 - rowDistance**2)/columnSpacing + 1e-9)
+                else:
+                    innerHalfSpan = -1
+                neighbourhoodRows.append((rowOffset, outerHalfSpan, innerHalfSpan))
+        
+        def rectangleSums(firstRow, lastRow, firstColumn, lastColumn):
+            # sums of heights and squared heights, and number of cells of a rectangle clipped to the grid (first and last rows and columns included)
+            firstRow = max(firstRow, 0); lastRow = min(lastRow, numOfRows-1)
+            firstColumn = max(firstColumn, 0); lastColumn = min(lastColumn, numOfColumns-1)
+            if (firstRow > lastRow) or (firstColumn > lastColumn):
+                return 0.0, 0.0, 0
+            upperLeft = firstRow*tableColumns + firstColumn
+            upperRight = firstRow*tableColumns + lastColumn+1
+            lowerLeft = (lastRow+1)*tableColumns + firstColumn
+            lowerRight = (lastRow+1)*tableColumns + lastColumn+1
+            heightSum = heightTable[lowerRight] - heightTable[upperRight] - heightTable[lowerLeft] + heightTable[upperLeft]
+            squaredHeightSum = squaredHeightTable[lowerRight] - squaredHeightTable[upperRight] - squaredHeightTable[lowerLeft] + squaredHeightTable[upperLeft]
+            return heightSum, squaredHeightSum, (lastRow-firstRow+1)*(lastColumn-firstColumn+1)
+        
+        TPI_List = []
+        DEV_List = []
+        for row in xrange(numOfRows):
+            for column in xrange(numOfColumns):
+                if circular:
+                    heightSum = squaredHeightSum = 0.0; cellsCount = 0
+                    for rowOffset, outerHalfSpan, innerHalfSpan in neighbourhoodRows:
+                        outerSums = rectangleSums(row+rowOffset, row+rowOffset, column-outerHalfSpan, column+outerHalfSpan)
+                        heightSum += outerSums[0]; squaredHeightSum += outerSums[1]; cellsCount += outerSums[2]
+                        if innerHalfSpan >= 0:
+                            innerSums = rectangleSums(row+rowOffset, row+rowOffset, column-innerHalfSpan, column+innerHalfSpan)
+                            heightSum -= innerSums[0]; squaredHeightSum -= innerSums[1]; cellsCount -= innerSums[2]
+                else:
+                    heightSum, squaredHeightSum, cellsCount = rectangleSums(row-outerRows, row+outerRows, column-outerColumns, column+outerColumns)
+                    innerSums = rectangleSums(row-min(innerRows, outerRows), row+min(innerRows, outerRows), column-min(innerColumns, outerColumns), column+min(innerColumns, outerColumns))
+                    heightSum -= innerSums[0]; squaredHeightSum -= innerSums[1]; cellsCount -= innerSums[2]
+                
+                if cellsCount == 0:
+                    # neighbourhood smaller than a cell
+                    TPI_List.append(0); DEV_List.append(0)
+                    continue
+                centralHeight = relativeHeights[row*numOfColumns + column]
+                meanNeighbourhoodHeight = heightSum/cellsCount
+                # Topographic Position Index: difference between the central cell height and mean height of its neighbourhood
+                TPI = centralHeight - meanNeighbourhoodHeight
+                TPI_List.append(TPI)
+                # deviation from mean elevation: TPI in standard deviations of the neighbourhood heights
+                variance = squaredHeightSum/cellsCount - meanNeighbourhoodHeight**2
+                if variance > 1e-12:
+                    DEV_List.append(TPI/math.sqrt(variance))
+                else:
+                    DEV_List.append(0)  # flat neighbourhood
+        
+        return TPI_List, DEV_List
+    
+    
+    def landforms(self, smallDeviations, largeDeviations, slopesD):
+        """
+        classify each cell into one of 10 landform classes, from its standardized TPI for a small and a large neighbourhood
+        """
+        # based on: "Topographic Position and Landforms Analysis", A. Weiss, poster presentation, ESRI User Conference, 2001
+        # "Land Facet Corridor Designer", J. Jenness, B. Brost, P. Beier, 2013
+        # standardized TPI (DEV) lower or equal to -1 is a low, larger or equal to 1 a high position, and anything in between a middle position. Middle positions at both scales are plains if their slope is not steeper than 5 degrees
+        #  1 - canyons, deeply incised streams
+        #  2 - midslope drainages, shallow valleys
+        #  3 - upland drainages, headwaters
+        #  4 - U-shaped valleys
+        #  5 - plains
+        #  6 - open slopes
+        #  7 - upper slopes, mesas
+        #  8 - local ridges, hills in valleys
+        #  9 - midslope ridges, small hills in plains
+        # 10 - mountain tops, high ridges
+        landformClasses = []
+        for index in xrange(len(slopesD)):
+            smallPosition = (smallDeviations[index] > -1) + (smallDeviations[index] >= 1)  # 0 - low, 1 - middle, 2 - high
+            largePosition = (largeDeviations[index] > -1) + (largeDeviations[index] >= 1)
+            landformClass = 1 + smallPosition*3 + largePosition
+            if (landformClass > 4):
+                # middle position on both scales is split into plains (5) and open slopes (6)
+                if (smallPosition == 1) and (largePosition == 1) and (slopesD[index] > 5):
+                    landformClass = 6
+                elif (landformClass > 5):
+                    landformClass += 1
+            landformClasses.append(landformClass)
+        
+        return landformClasses
+    
+    
+    def gradients(self, heights, numOfRows, numOfColumns, columnCoordinates, rowCoordinates):
+        """
+        calculate the height derivatives along the columns and along the rows of a rectilinear heights grid, with Horn's finite differences
+        """
+        # source: "Hill shading and the reflectance map", B.K.P. Horn, Proceedings of the IEEE, 1981
+        # columnCoordinates are the coordinates of each column along the rows, and rowCoordinates of each row along the columns. They do not need to be equally spaced
+        # each derivative is a 1,2,1 weighted mean of central differences of three neighbouring rows (columns). Edge cells use one-sided differences, and their own row (column) instead of the missing neighbouring one
+        columnDerivatives = [0.0] * (numOfRows*numOfColumns)
+        rowDerivatives = [0.0] * (numOfRows*numOfColumns)
+        for row in xrange(numOfRows):
+            previousRow = max(row-1, 0)
+            nextRow = min(row+1, numOfRows-1)
+            rowSpan = rowCoordinates[nextRow] - rowCoordinates[previousRow]
+            for column in xrange(numOfColumns):
+                previousColumn = max(column-1, 0)
+                nextColumn = min(column+1, numOfColumns-1)
+                columnSpan = columnCoordinates[nextColumn] - columnCoordinates[previousColumn]
+                
+                if columnSpan != 0:
+                    columnDerivatives[row*numOfColumns + column] = ( \
+                        (heights[previousRow*numOfColumns + nextColumn] - heights[previousRow*numOfColumns + previousColumn]) + \
+                        2*(heights[row*numOfColumns + nextColumn] - heights[row*numOfColumns + previousColumn]) + \
+                        (heights[nextRow*numOfColumns + nextColumn] - heights[nextRow*numOfColumns + previousColumn]) ) / (4*columnSpan)
+                if rowSpan != 0:
+                    rowDerivatives[row*numOfColumns + column] = ( \
+                        (heights[nextRow*numOfColumns + previousColumn] - heights[previousRow*numOfColumns + previousColumn]) + \
+                        2*(heights[nextRow*numOfColumns + column] - heights[previousRow*numOfColumns + column]) + \
+                        (heights[nextRow*numOfColumns + nextColumn] - heights[previousRow*numOfColumns + nextColumn]) ) / (4*rowSpan)
+        
+        return columnDerivatives, rowDerivatives
+    
+    
+    def curvatures(self, heights, numOfRows, numOfColumns, columnCoordinates, rowCoordinates):
+        """
+        calculate mean, Gaussian, profile and plan curvature of each cell of a rectilinear heights grid, from a quadratic surface fitted to its 3x3 cells window
+        """
+        # source: "Quantitative analysis of land surface topography", P. Zevenbergen, C. Thorne, Earth Surface Processes and Landforms, 1987
+        # "General geomorphometry, derivatives of altitude, and descriptive statistics", I.S. Evans, In: Spatial analysis in geomorphology, 1972
+        # "Primary topographic attributes", J.C. Gallant, J.P. Wilson, In: Terrain analysis: principles and applications, 2000
+        # first and second height derivatives are the ones of Evans-Young least squares quadratic: the means of the central and second differences of the window's three rows (columns). columnCoordinates and rowCoordinates do not need to be equally spaced
+        # all curvatures are positive where the terrain bends upwards (valleys, hollows), the same as Rhino's surface curvature with the normal pointing upwards:
+        # - profile curvature is the curvature in the slope direction: positive where the flow decelerates, negative where it accelerates
+        # - plan curvature is the curvature of the contour line: positive where the flow converges, negative where it diverges. Profile and plan curvature of flat cells are 0
+        # edge cells get the curvatures of their nearest inner cell
+        meanCurvatures = [0.0] * (numOfRows*numOfColumns)
+        gaussianCurvatures = [0.0] * (numOfRows*numOfColumns)
+        profileCurvatures = [0.0] * (numOfRows*numOfColumns)
+        planCurvatures = [0.0] * (numOfRows*numOfColumns)
+        if (numOfRows < 3) or (numOfColumns < 3):
+            return meanCurvatures, gaussianCurvatures, profileCurvatures, planCurvatures
+        
+        for row in xrange(numOfRows):
+            innerRow = min(max(row, 1), numOfRows-2)
+            previousRowSpacing = rowCoordinates[innerRow] - rowCoordinates[innerRow-1]
+            nextRowSpacing = rowCoordinates[innerRow+1] - rowCoordinates[innerRow]
+            previousRow = (innerRow-1)*numOfColumns; centralRow = innerRow*numOfColumns; nextRow = (innerRow+1)*numOfColumns
+            for column in xrange(numOfColumns):
+                innerColumn = min(max(column, 1), numOfColumns-2)
+                index = row*numOfColumns + column
+                if (innerRow != row) or (innerColumn != column):
+                    # edge cell: filled after its nearest inner cell
+                    continue
+                previousColumnSpacing = columnCoordinates[column] - columnCoordinates[column-1]
+                nextColumnSpacing = columnCoordinates[column+1] - columnCoordinates[column]
+                
+                # height derivatives along the rows (p, r) and along the columns (q, t), and the mixed one (s)
+                p = q = r = s = t = 0.0
+                for windowRow in (previousRow, centralRow, nextRow):
+                    p += (heights[windowRow + column+1] - heights[windowRow + column-1]) / (previousColumnSpacing + nextColumnSpacing)
+                    r += 2*((heights[windowRow + column+1] - heights[windowRow + column])/nextColumnSpacing - (heights[windowRow + column] - heights[windowRow + column-1])/previousColumnSpacing) / (previousColumnSpacing + nextColumnSpacing)
+                for windowColumn in (column-1, column, column+1):
+                    q += (heights[nextRow + windowColumn] - heights[previousRow + windowColumn]) / (previousRowSpacing + nextRowSpacing)
+                    t += 2*((heights[nextRow + windowColumn] - heights[centralRow + windowColumn])/nextRowSpacing - (heights[centralRow + windowColumn] - heights[previousRow + windowColumn])/previousRowSpacing) / (previousRowSpacing + nextRowSpacing)
+                p /= 3; q /= 3; r /= 3; t /= 3
+                s = ((heights[nextRow + column+1] - heights[nextRow + column-1]) - (heights[previousRow + column+1] - heights[previousRow + column-1])) / ((previousColumnSpacing + nextColumnSpacing) * (previousRowSpacing + nextRowSpacing))
+                
+                squaredGradient = p*p + q*q
+                w = 1 + squaredGradient
+                meanCurvatures[index] = ((1 + q*q)*r - 2*p*q*s + (1 + p*p)*t) / (2 * w**1.5)
+                gaussianCurvatures[index] = (r*t - s*s) / (w*w)
+                if squaredGradient > 1e-12:
+                    profileCurvatures[index] = (p*p*r + 2*p*q*s + q*q*t) / (squaredGradient * w**1.5)
+                    planCurvatures[index] = (q*q*r - 2*p*q*s + p*p*t) / squaredGradient**1.5
+        
+        # edge cells
+        for row in xrange(numOfRows):
+            innerRow = min(max(row, 1), numOfRows-2)
+            for column in xrange(numOfColumns):
+                innerColumn = min(max(column, 1), numOfColumns-2)
+                if (innerRow != row) or (innerColumn != column):
+                    index = row*numOfColumns + column
+                    innerIndex = innerRow*numOfColumns + innerColumn
+                    meanCurvatures[index] = meanCurvatures[innerIndex]
+                    gaussianCurvatures[index] = gaussianCurvatures[innerIndex]
+                    profileCurvatures[index] = profileCurvatures[innerIndex]
+                    planCurvatures[index] = planCurvatures[innerIndex]
+        
+        return meanCurvatures, gaussianCurvatures, profileCurvatures, planCurvatures
+    
+    
+    def hillshadeStatistics(self, normalsX, normalsY, normalsZ, weights, lightVectors, threshold, matrixFilePath=None):
+        """
+        calculate the hillshade of each cell for each of the lightVectors: its mean, and the number of lightVectors for which it is above the threshold
+        """
+        # hillshade is 255 * cosine of the angle between the cell's unit normal and the unit lightVector (direction towards the light source), multiplied by the cell weight (for example the hypsometric shading factor). Cells facing away from the light source have a hillshade of 0
+        # slope and aspect are in the normal, and sun zenith and azimuth in the lightVector, so each hillshade is a single dot product: nothing is recalculated for each lightVector
+        # if matrixFilePath is supplied, the whole hillshade matrix is written to it as comma separated values: one line for each cell, with its hillshades for each of the lightVectors
+        numOfLightVectors = len(lightVectors)
+        if matrixFilePath != None:
+            matrixFile = open(matrixFilePath, "w")
+        
+        meanHillshades = []
+        numOfHillshadesAboveThreshold = []
+        for index in xrange(len(weights)):
+            normalX = normalsX[index]; normalY = normalsY[index]; normalZ = normalsZ[index]
+            factor = 255 * weights[index]
+            hillshades = [max(lightX*normalX + lightY*normalY + lightZ*normalZ, 0)*factor  for lightX, lightY, lightZ in lightVectors]
+            meanHillshades.append(sum(hillshades)/numOfLightVectors)
+            numOfHillshadesAboveThreshold.append(len([hillshade  for hillshade in hillshades  if hillshade > threshold]))
+            if matrixFilePath != None:
+                matrixFile.write(",".join(["%0.2f" % hillshade  for hillshade in hillshades]) + "\n")
+        
+        if matrixFilePath != None:
+            matrixFile.close()
+        
+        return meanHillshades, numOfHillshadesAboveThreshold
+    
+    
+    def castShadows(self, heights, numOfRows, numOfColumns, columnSpacing, rowSpacing, sunColumnDirection, sunRowDirection, sunAltitudeR):
+        """
+        find which cells of the heights grid are lit (1) and which are in the shadow cast by the terrain (0), for a sun at sunAltitudeR
+        """
+        # sunColumnDirection, sunRowDirection are the horizontal components of the direction towards the sun, along the increasing columns and increasing rows (in the same units as columnSpacing, rowSpacing)
+        # cells are swept in lines perpendicular to the dominant (in cells) sun direction, starting from the line closest to the sun. Each cell carries the height of the shadow plane above it: the larger of its own height, and the shadow plane height of the point in the previous line towards the sun (linearly interpolated between its two cells), lowered by the distance to it times tangent of sunAltitudeR
+        # a cell is lit if it is not lower than the shadow plane which reaches it. Each cell is visited once: O(N) for each sun position
+        if sunAltitudeR <= 0:
+            return [0] * (numOfRows*numOfColumns)  # sun below the horizon
+        sunDirectionLength = math.sqrt(sunColumnDirection**2 + sunRowDirection**2)
+        if sunDirectionLength == 0:
+            return [1] * (numOfRows*numOfColumns)  # sun in zenith
+        
+        # step from one line of cells to the previous one (towards the sun): one cell along the dominant direction, and a fraction of a cell along the other one
+        columnsPerLength = sunColumnDirection/sunDirectionLength/columnSpacing
+        rowsPerLength = sunRowDirection/sunDirectionLength/rowSpacing
+        if abs(columnsPerLength) >= abs(rowsPerLength):
+            # lines are columns
+            numOfLines = numOfColumns; numOfLineCells = numOfRows
+            stepLength = 1/abs(columnsPerLength)
+            lineStep = 1 if (columnsPerLength > 0) else -1
+            cellStep = rowsPerLength * stepLength
+            def cellIndex(line, lineCell):
+                return lineCell*numOfColumns + line
+        else:
+            # lines are rows
+            numOfLines = numOfRows; numOfLineCells = numOfColumns
+            stepLength = 1/abs(rowsPerLength)
+            lineStep = 1 if (rowsPerLength > 0) else -1
+            cellStep = columnsPerLength * stepLength
+            def cellIndex(line, lineCell):
+                return line*numOfColumns + lineCell
+        shadowDrop = stepLength * math.tan(sunAltitudeR)
+        
+        lit = [1] * (numOfRows*numOfColumns)
+        # the first line (closest to the sun) is lit, and its shadow plane heights are its heights
+        firstLine = numOfLines-1 if (lineStep > 0) else 0
+        previousShadowHeights = [heights[cellIndex(firstLine, lineCell)]  for lineCell in xrange(numOfLineCells)]
+        for line in xrange(firstLine - lineStep, firstLine - lineStep*numOfLines, -lineStep):
+            shadowHeights = []
+            for lineCell in xrange(numOfLineCells):
+                index = cellIndex(line, lineCell)
+                height = heights[index]
+                previousLineCell = lineCell + cellStep
+                lowerLineCell = int(math.floor(previousLineCell))
+                if (lowerLineCell < 0) or (previousLineCell > numOfLineCells-1):
+                    # sun ray reaches the cell from outside of the grid
+                    shadowHeights.append(height)
+                    continue
+                fraction = previousLineCell - lowerLineCell
+                if fraction > 0:
+                    reachingShadowHeight = previousShadowHeights[lowerLineCell]*(1-fraction) + previousShadowHeights[lowerLineCell+1]*fraction - shadowDrop
+                else:
+                    reachingShadowHeight = previousShadowHeights[lowerLineCell] - shadowDrop
+                if height < reachingShadowHeight:
+                    lit[index] = 0
+                    shadowHeights.append(reachingShadowHeight)
+                else:
+                    shadowHeights.append(height)
+            previousShadowHeights = shadowHeights
+        
+        return lit
+    
+    
+    def viewshed(self, heights, numOfRows, numOfColumns, observerColumn, observerRow, observerHeight, targetHeight=0):
+        """
+        find which cells of the heights grid are visible from the observer, with the XDraw line of sight propagation
+        """
+        # source: "Line-of-sight and viewshed algorithms", W.R. Franklin, C. Ray, 1994 and "Performance of viewshed algorithms on a DEM", Izraelevitz, 2003
+        # observer is placed at the nearest cell of observerColumn, observerRow. observerHeight is its absolute height (terrain height plus eye height), in the same units as heights
+        # cells are processed in square rings around the observer. The line of sight to each cell is interpolated from the two cells of the previous ring on each side of the line. O(N)
+        observerColumn = min(max(int(round(observerColumn)), 0), numOfColumns-1)
+        observerRow = min(max(int(round(observerRow)), 0), numOfRows-1)
+        
+        # lineOfSightHeights: the larger of the cell's height and the height of the line of sight passing above it
+        lineOfSightHeights = list(heights)
+        visibility = [True] * (numOfRows*numOfColumns)
+        numOfRings = max(observerRow, numOfRows-1-observerRow, observerColumn, numOfColumns-1-observerColumn)
+        for ring in xrange(2, numOfRings+1):
+            distanceRatio = ring / float(ring-1)
+            for row in xrange(max(observerRow-ring, 0), min(observerRow+ring, numOfRows-1)+1):
+                rowOffset = row - observerRow
+                if abs(rowOffset) == ring:
+                    columns = xrange(max(observerColumn-ring, 0), min(observerColumn+ring, numOfColumns-1)+1)
+                else:
+                    columns = [column  for column in (observerColumn-ring, observerColumn+ring)  if 0 <= column < numOfColumns]
+                for column in columns:
+                    columnOffset = column - observerColumn
+                    if abs(rowOffset) >= abs(columnOffset):
+                        # the line of sight crosses the previous ring's row
+                        previousRow = row - (1 if rowOffset > 0 else -1)
+                        previousColumn = observerColumn + columnOffset/distanceRatio
+                        column0 = int(math.floor(previousColumn))
+                        fraction = previousColumn - column0
+                        index0 = previousRow*numOfColumns + column0
+                        previousHeight = lineOfSightHeights[index0] if (fraction == 0) else lineOfSightHeights[index0]*(1-fraction) + lineOfSightHeights[index0+1]*fraction
+                    else:
+                        # the line of sight crosses the previous ring's column
+                        previousColumn = column - (1 if columnOffset > 0 else -1)
+                        previousRow = observerRow + rowOffset/distanceRatio
+                        row0 = int(math.floor(previousRow))
+                        fraction = previousRow - row0
+                        index0 = row0*numOfColumns + previousColumn
+                        previousHeight = lineOfSightHeights[index0] if (fraction == 0) else lineOfSightHeights[index0]*(1-fraction) + lineOfSightHeights[index0+numOfColumns]*fraction
+                    
+                    index = row*numOfColumns + column
+                    lineOfSightHeight = observerHeight + (previousHeight - observerHeight)*distanceRatio
+                    if heights[index] + targetHeight < lineOfSightHeight:
+                        visibility[index] = False
+                        lineOfSightHeights[index] = lineOfSightHeight
+        
+        return visibility
+    
+    
+    def contourLines(self, heights, numOfRows, numOfColumns, levels):
+        """
+        calculate the contour lines of the heights grid for each of the levels, with the marching squares algorithm
+        """
+        # returns a list of polylines for each level. A polyline is a list of (column, row) fractional grid indices. Closed polylines end with their first point
+        # heights are interpolated linearly along the cell edges. Saddle cells (two opposite corners above the level, two below) are resolved with the mean height of the cell
+        # cells with a float("nan") height (no data) are skipped. Each cell only visits the levels between its lowest and highest corner height
+        levels = list(levels)
+        sortedLevelIndices = sorted(xrange(len(levels)), key=lambda levelIndex: levels[levelIndex])
+        sortedLevels = [levels[levelIndex]  for levelIndex in sortedLevelIndices]
+        
+        # cell edges are identified by keys: the horizontal edge to the right of the vertex (row, column) is 2*index, and the vertical edge below it 2*index+1
+        links = [{}  for level in levels]  # edge key: list of the edge keys it is connected to, for each level
+        for row in xrange(numOfRows-1):
+            for column in xrange(numOfColumns-1):
+                index = row*numOfColumns + column
+                heightTL = heights[index]
+                heightTR = heights[index+1]
+                heightBR = heights[index+numOfColumns+1]
+                heightBL = heights[index+numOfColumns]
+                if (heightTL != heightTL) or (heightTR != heightTR) or (heightBR != heightBR) or (heightBL != heightBL):
+                    continue  # no data
+                cellMin = min(heightTL, heightTR, heightBR, heightBL)
+                cellMax = max(heightTL, heightTR, heightBR, heightBL)
+                
+                top = 2*index
+                left = 2*index + 1
+                bottom = 2*(index+numOfColumns)
+                right = 2*(index+1) + 1
+                for sortedIndex in xrange(bisect.bisect_right(sortedLevels, cellMin), bisect.bisect_right(sortedLevels, cellMax)):
+                    level = sortedLevels[sortedIndex]
+                    case = (heightTL >= level)*8 + (heightTR >= level)*4 + (heightBR >= level)*2 + (heightBL >= level)
+                    if (case == 1) or (case == 14):
+                        segments = ((left, bottom),)
+                    elif (case == 2) or (case == 13):
+                        segments = ((bottom, right),)
+                    elif (case == 3) or (case == 12):
+                        segments = ((left, right),)
+                    elif (case == 4) or (case == 11):
+                        segments = ((top, right),)
+                    elif (case == 6) or (case == 9):
+                        segments = ((top, bottom),)
+                    elif (case == 7) or (case == 8):
+                        segments = ((left, top),)
+                    else:
+                        # saddle: case 5 (upper right and lower left corners above) or 10 (upper left and lower right corners above)
+                        centerAbove = (heightTL + heightTR + heightBR + heightBL)/4 >= level
+                        if (case == 5) == centerAbove:
+                            segments = ((left, top), (bottom, right))
+                        else:
+                            segments = ((top, right), (left, bottom))
+                    
+                    levelLinks = links[sortedLevelIndices[sortedIndex]]
+                    for edgeKey1, edgeKey2 in segments:
+                        levelLinks.setdefault(edgeKey1, []).append(edgeKey2)
+                        levelLinks.setdefault(edgeKey2, []).append(edgeKey1)
+        
+        def edgePoint(edgeKey, level):
+            # position of the level along the edge
+            index = edgeKey // 2
+            row, column = divmod(index, numOfColumns)
+            index2 = index + (numOfColumns if (edgeKey % 2) else 1)
+            fraction = (level - heights[index]) / (heights[index2] - heights[index])
+            if (edgeKey % 2):
+                return (column, row + fraction)
+            else:
+                return (column + fraction, row)
+        
+        # stitch the segments into polylines: open polylines start at the edge keys with a single link (grid edge, or no data), closed ones anywhere
+        contourPolylines = []
+        for levelIndex, level in enumerate(levels):
+            levelLinks = links[levelIndex]
+            polylines = []
+            startKeys = [edgeKey  for edgeKey in levelLinks  if len(levelLinks[edgeKey]) == 1] + list(levelLinks.keys())
+            for startKey in startKeys:
+                if not levelLinks.get(startKey):
+                    continue  # already stitched
+                polylineKeys = [startKey]
+                edgeKey = startKey
+                while levelLinks.get(edgeKey):
+                    nextKey = levelLinks[edgeKey].pop()
+                    levelLinks[nextKey].remove(edgeKey)
+                    polylineKeys.append(nextKey)
+                    edgeKey = nextKey
+                polylines.append([edgePoint(edgeKey, level)  for edgeKey in polylineKeys])
+            contourPolylines.append(polylines)
+            links[levelIndex] = None
+        
+        return contourPolylines
+    
+    
+    def adaptiveTriangulation(self, heights, numOfRows, numOfColumns, maxErrorM):
+        """
+        triangulate the heights grid with a right-triangulated irregular network (RTIN): large right triangles where the terrain is flat, small ones where it is not. No height deviates from the triangulation by more than maxErrorM
+        """
+        # source: "Right-triangulated irregular networks", W. Evans, D. Kirkpatrick, G. Townsend, Algorithmica, 2001, and Mapbox's "martini" implementation
+        # returns the vertices as (column, row) grid indices, and the triangles as triples of vertex indices (counter-clockwise when seen from above)
+        # the grid is padded to a square of 2**n+1 heights (by repeating the edge heights). Triangles which lie completely in the padding are left out
+        gridSize = 2
+        while gridSize+1 < max(numOfRows, numOfColumns):
+            gridSize *= 2
+        tileSize = gridSize
+        gridSize += 1
+        paddedHeights = []
+        for row in xrange(gridSize):
+            rowStart = min(row, numOfRows-1)*numOfColumns
+            rowHeights = list(heights[rowStart : rowStart+numOfColumns])
+            paddedHeights.extend(rowHeights + [rowHeights[-1]] * (gridSize-numOfColumns))
+        
+        # error of each vertex: an upper bound of the height deviation within the triangles which are split at it, calculated from the smallest triangles up.
+        # splitting a triangle changes its heights by at most the deviation at the splitting vertex, so the bound is that deviation plus the largest bound of the children
+        # squares of the triangulation are split along the diagonal going from their upper left corner if their (column+row) square index is even, otherwise along the other diagonal
+        errors = [0.0] * (gridSize*gridSize)
+        halfSize = 1
+        while halfSize < tileSize:
+            # vertices which split the axis aligned hypotenuses (2*halfSize long) of the diamonds. Their children split the diagonals of the squares halfSize wide
+            quarterSize = halfSize // 2
+            for row in xrange(0, gridSize, halfSize):
+                firstColumn = 0 if ((row // halfSize) % 2) else halfSize
+                for column in xrange(firstColumn, gridSize, 2*halfSize):
+                    index = row*gridSize + column
+                    if (row // halfSize) % 2:
+                        error = abs((paddedHeights[index-halfSize*gridSize] + paddedHeights[index+halfSize*gridSize])/2 - paddedHeights[index])
+                    else:
+                        error = abs((paddedHeights[index-halfSize] + paddedHeights[index+halfSize])/2 - paddedHeights[index])
+                    childrenError = 0
+                    if quarterSize > 0:
+                        for childRow, childColumn in ((row-quarterSize, column-quarterSize), (row-quarterSize, column+quarterSize), (row+quarterSize, column-quarterSize), (row+quarterSize, column+quarterSize)):
+                            if (0 <= childRow < gridSize) and (0 <= childColumn < gridSize):
+                                childrenError = max(childrenError, errors[childRow*gridSize + childColumn])
+                    errors[index] = error + childrenError
+            
+            # vertices at the centers of the squares 2*halfSize wide, splitting their diagonals. Their children split the squares' sides
+            for row in xrange(halfSize, gridSize, 2*halfSize):
+                for column in xrange(halfSize, gridSize, 2*halfSize):
+                    index = row*gridSize + column
+                    if ((row // (2*halfSize)) + (column // (2*halfSize))) % 2 == 0:
+                        error = abs((paddedHeights[index-halfSize*gridSize-halfSize] + paddedHeights[index+halfSize*gridSize+halfSize])/2 - paddedHeights[index])
+                    else:
+                        error = abs((paddedHeights[index-halfSize*gridSize+halfSize] + paddedHeights[index+halfSize*gridSize-halfSize])/2 - paddedHeights[index])
+                    errors[index] = error + max(errors[index-halfSize], errors[index+halfSize], errors[index-halfSize*gridSize], errors[index+halfSize*gridSize])
+            halfSize *= 2
+        
+        # split the triangles from the two largest ones down, until their error is within maxErrorM. Triangle: hypotenuse (a, b), right angle corner c
+        vertexIndices = {}
+        vertices = []
+        triangles = []
+        def vertexIndex(column, row):
+            index = row*gridSize + column
+            if index not in vertexIndices:
+                vertexIndices[index] = len(vertices)
+                vertices.append((column, row))
+            return vertexIndices[index]
+        
+        stack = [(0, 0, tileSize, tileSize, tileSize, 0), (tileSize, tileSize, 0, 0, 0, tileSize)]
+        while stack:
+            aColumn, aRow, bColumn, bRow, cColumn, cRow = stack.pop()
+            middleColumn = (aColumn + bColumn) // 2
+            middleRow = (aRow + bRow) // 2
+            if (abs(aColumn-cColumn) + abs(aRow-cRow) > 1) and (errors[middleRow*gridSize + middleColumn] > maxErrorM):
+                stack.append((cColumn, cRow, aColumn, aRow, middleColumn, middleRow))
+                stack.append((bColumn, bRow, cColumn, cRow, middleColumn, middleRow))
+            elif (min(aColumn, bColumn, cColumn) < numOfColumns) and (min(aRow, bRow, cRow) < numOfRows):
+                # rows grow towards south, so (a, b, c) is counter-clockwise when seen from above
+                triangles.append((vertexIndex(aColumn, aRow), vertexIndex(bColumn, bRow), vertexIndex(cColumn, cRow)))
+        
+        return vertices, triangles
+    
+    
+    def splineFit(self, heights, numOfRows, numOfColumns, numOfControlRows, numOfControlColumns, degree=3):
+        """
+        least squares fit of a clamped uniform B-spline surface to the heights grid, with numOfControlRows*numOfControlColumns control heights
+        """
+        # source: "The NURBS Book", L. Piegl, W. Tiller, 1997 (A2.1, A2.2 and 9.4.1)
+        # the grid is parametrized uniformly from 0 to 1 along its rows and columns. As the fit is a tensor product, it is solved row by row, and then control column by control column, with banded normal equations
+        # returns the control heights (row after row), the full knot vectors along the rows and along the columns, the largest deviation of the fitted surface from the heights, and the fitted surface heights at the heights grid points (row after row)
+        def knotVector(numOfControlPoints, degree):
+            numOfSpans = numOfControlPoints - degree
+            return [0.0]*(degree+1) + [i/float(numOfSpans)  for i in xrange(1, numOfSpans)] + [1.0]*(degree+1)
+        
+        def basisFunctions(knots, numOfControlPoints, degree, t):
+            # span index and the degree+1 nonzero basis functions at parameter t
+            span = min(max(int(t*(numOfControlPoints-degree)) + degree, degree), numOfControlPoints-1)
+            left = [0.0]*(degree+1)
+            right = [0.0]*(degree+1)
+            basis = [1.0] + [0.0]*degree
+            for j in xrange(1, degree+1):
+                left[j] = t - knots[span+1-j]
+                right[j] = knots[span+j] - t
+                saved = 0.0
+                for r in xrange(j):
+                    temp = basis[r] / (right[r+1] + left[j-r])
+                    basis[r] = saved + right[r+1]*temp
+                    saved = left[j-r]*temp
+                basis[j] = saved
+            return span-degree, basis
+        
+        def fitMatrices(numOfPoints, numOfControlPoints, degree):
+            # basis functions at each of the points, and the banded Cholesky factor of the normal equations matrix
+            knots = knotVector(numOfControlPoints, degree)
+            pointsBases = [basisFunctions(knots, numOfControlPoints, degree, point/float(max(numOfPoints-1, 1)))  for point in xrange(numOfPoints)]
+            # normal matrix band: normalBand[i][k] is the element (i, i+k)
+            normalBand = [[0.0]*(degree+1)  for i in xrange(numOfControlPoints)]
+            for firstIndex, basis in pointsBases:
+                for a in xrange(degree+1):
+                    for b in xrange(a, degree+1):
+                        normalBand[firstIndex+a][b-a] += basis[a]*basis[b]
+            # banded Cholesky factorization: lowerBand[i][k] is the element (i, i-k) of the lower triangular factor
+            lowerBand = [[0.0]*(degree+1)  for i in xrange(numOfControlPoints)]
+            for i in xrange(numOfControlPoints):
+                for j in xrange(max(0, i-degree), i+1):
+                    value = normalBand[j][i-j]
+                    for m in xrange(max(0, i-degree), j):
+                        value -= lowerBand[i][i-m]*lowerBand[j][j-m]
+                    if i == j:
+                        lowerBand[i][0] = math.sqrt(value)
+                    else:
+                        lowerBand[i][i-j] = value / lowerBand[j][0]
+            return knots, pointsBases, lowerBand
+        
+        def solve(lowerBand, numOfControlPoints, degree, rightSide):
+            # forward and back substitution with the banded Cholesky factor
+            y = list(rightSide)
+            for i in xrange(numOfControlPoints):
+                for k in xrange(1, min(degree, i)+1):
+                    y[i] -= lowerBand[i][k]*y[i-k]
+                y[i] /= lowerBand[i][0]
+            for i in xrange(numOfControlPoints-1, -1, -1):
+                for k in xrange(1, min(degree, numOfControlPoints-1-i)+1):
+                    y[i] -= lowerBand[i+k][k]*y[i+k]
+                y[i] /= lowerBand[i][0]
+            return y
+        
+        rowsDegree = min(degree, numOfControlRows-1)
+        columnsDegree = min(degree, numOfControlColumns-1)
+        knotsRows, rowsBases, rowsLowerBand = fitMatrices(numOfRows, numOfControlRows, rowsDegree)
+        knotsColumns, columnsBases, columnsLowerBand = fitMatrices(numOfColumns, numOfControlColumns, columnsDegree)
+        
+        # fit along each row of heights, then along each column of the results
+        rowFits = []
+        for row in xrange(numOfRows):
+            rightSide = [0.0]*numOfControlColumns
+            rowStart = row*numOfColumns
+            for column, (firstIndex, basis) in enumerate(columnsBases):
+                height = heights[rowStart + column]
+                for a in xrange(columnsDegree+1):
+                    rightSide[firstIndex+a] += basis[a]*height
+            rowFits.append(solve(columnsLowerBand, numOfControlColumns, columnsDegree, rightSide))
+        controlColumns = []
+        for controlColumn in xrange(numOfControlColumns):
+            rightSide = [0.0]*numOfControlRows
+            for row, (firstIndex, basis) in enumerate(rowsBases):
+                value = rowFits[row][controlColumn]
+                for a in xrange(rowsDegree+1):
+                    rightSide[firstIndex+a] += basis[a]*value
+            controlColumns.append(solve(rowsLowerBand, numOfControlRows, rowsDegree, rightSide))
+        del rowFits
+        controlHeights = [controlColumns[controlColumn][controlRow]  for controlRow in xrange(numOfControlRows)  for controlColumn in xrange(numOfControlColumns)]
+        
+        # largest deviation of the fitted surface at the heights grid points
+        maxDeviation = 0
+        fittedHeights = []
+        columnsEvaluated = []
+        for controlRow in xrange(numOfControlRows):
+            controlRowStart = controlRow*numOfControlColumns
+            columnsEvaluated.append([sum(basis[a]*controlHeights[controlRowStart+firstIndex+a]  for a in xrange(columnsDegree+1))  for firstIndex, basis in columnsBases])
+        for row, (firstIndex, basis) in enumerate(rowsBases):
+            rowStart = row*numOfColumns
+            for column in xrange(numOfColumns):
+                fittedHeight = sum(basis[a]*columnsEvaluated[firstIndex+a][column]  for a in xrange(rowsDegree+1))
+                fittedHeights.append(fittedHeight)
+                deviation = abs(fittedHeight - heights[rowStart + column])
+                if deviation > maxDeviation:
+                    maxDeviation = deviation
+        
+        return controlHeights, knotsRows, knotsColumns, maxDeviation, fittedHeights
+    
+    
+    def cropTriangulation(self, heights, numOfRows, numOfColumns, centerColumn, centerRow, radius, circular, vertices=None, triangles=None):
+        """
+        crop the heights grid (or its triangulation) with a square or a circle directly on the grid: the cells (triangles) inside are kept, and the ones crossing the edge are clipped and triangulated
+        """
+        # centerColumn, centerRow: center of the square (circle) as fractional column and row indices. radius: half of the square's side (circle's radius) in cells. The square (circle) should lie inside of the grid
+        # vertices, triangles: triangulation of the grid (for example Terrain.adaptiveTriangulation). If not supplied, the grid cells (quads) are cropped
+        # returns the cropped vertices as (column, row, height), the faces as triples or quadruples of vertex indices (with the same orientation as the grid cells or triangles), and the boundary of the cropped terrain as a closed loop of vertex indices (in the faces' orientation)
+        # the vertices created on an edge shared by two faces are shared by both of them, so the cropped terrain has no cracks
+        
+        # the circle is replaced by an inscribed polygon, whose sides deviate from it by at most a quarter of a cell
+        if circular:
+            numOfSides = max(48, int(math.ceil(math.pi / math.acos(1 - 0.25/max(radius, 0.5)))))
+            startAngle = 0
+            corners = [(centerColumn + radius*math.cos(2*math.pi*k/numOfSides), centerRow + radius*math.sin(2*math.pi*k/numOfSides))  for k in xrange(numOfSides)]
+        else:
+            numOfSides = 4
+            startAngle = math.pi/4
+            corners = [(centerColumn + radius, centerRow + radius), (centerColumn - radius, centerRow + radius), (centerColumn - radius, centerRow - radius), (centerColumn + radius, centerRow - radius)]
+        innerRadius = radius*math.cos(math.pi/numOfSides)
+        sectorAngle = 2*math.pi/numOfSides
+        
+        # sides as lines with unit normals pointing inside: nx*column + ny*row + c is the distance from a side (positive inside)
+        sides = []
+        for k in xrange(numOfSides):
+            (column1, row1), (column2, row2) = corners[k], corners[(k+1) % numOfSides]
+            sideLength = math.hypot(column2 - column1, row2 - row1)
+            nx = (row1 - row2) / sideLength
+            ny = (column2 - column1) / sideLength
+            if nx*(centerColumn - column1) + ny*(centerRow - row1) < 0:
+                nx = -nx; ny = -ny
+            sides.append((nx, ny, -(nx*column1 + ny*row1)))
+        
+        def sideOf(column, row):
+            # the side facing the (column, row) point
+            return int(((math.atan2(row - centerRow, column - centerColumn) - startAngle) % (2*math.pi)) / sectorAngle) % numOfSides
+        
+        def isInside(column, row):
+            # strictly inside: points on the sides are clipped, so that the boundary can be found among the clipped faces only
+            distanceX = column - centerColumn; distanceY = row - centerRow
+            if not circular:
+                return max(abs(distanceX), abs(distanceY)) < radius
+            squaredDistance = distanceX*distanceX + distanceY*distanceY
+            if squaredDistance < innerRadius*innerRadius:
+                return True
+            elif squaredDistance >= radius*radius:
+                return False
+            nx, ny, c = sides[sideOf(column, row)]
+            return (nx*column + ny*row + c) > 0
+        
+        def clippingSides(points):
+            # only the sides facing the points can clip a face which lies within the angle from the center to the points
+            if not circular:
+                return range(numOfSides)
+            pointsSides = [sideOf(column, row)  for column, row, height, edge, key in points]
+            differences = [((side - pointsSides[0] + numOfSides//2) % numOfSides) - numOfSides//2  for side in pointsSides]
+            minColumn = min(point[0] for point in points); maxColumn = max(point[0] for point in points)
+            minRow = min(point[1] for point in points); maxRow = max(point[1] for point in points)
+            if (max(differences) - min(differences) >= numOfSides//2 - 2) or ((minColumn <= centerColumn <= maxColumn) and (minRow <= centerRow <= maxRow)):
+                return range(numOfSides)
+            return [(pointsSides[0] + difference) % numOfSides  for difference in xrange(min(differences)-1, max(differences)+2)]
+        
+        # original vertices
+        if vertices == None:
+            def vertexPoint(vertexIndex):
+                row, column = divmod(vertexIndex, numOfColumns)
+                return column, row, heights[vertexIndex]
+        else:
+            def vertexPoint(vertexIndex):
+                column, row = vertices[vertexIndex]
+                return column, row, heights[min(row, numOfRows-1)*numOfColumns + min(column, numOfColumns-1)]
+        
+        croppedVertices = []
+        croppedVertexIndices = {}
+        def croppedVertexIndex(point):
+            # point: (column, row, height, edge, key). Key is ("v", vertexIndex) for original vertices, ("e", vertexIndex1, vertexIndex2, side) for the crossings of the edges and the sides, and ("c", corner) for the corners
+            key = point[4]
+            if key not in croppedVertexIndices:
+                croppedVertexIndices[key] = len(croppedVertices)
+                croppedVertices.append(point[:3])
+            return croppedVertexIndices[key]
+        
+        onSideTolerance = 1e-7 * max(radius, 1)
+        crossings = {}
+        def crossing(point1, point2, side, distance1, distance2):
+            # point where the segment from point1 to point2 crosses the side
+            if (point1[3] != None) and (point2[3] != None) and (len(set(point1[3] + point2[3])) == 2):
+                # the segment lies on an edge of the face: the crossing is calculated from the edge's vertices, the same for both faces sharing the edge
+                vertexIndex1, vertexIndex2 = sorted(set(point1[3] + point2[3]))
+                key = ("e", vertexIndex1, vertexIndex2, side)
+                if key not in crossings:
+                    column1, row1, height1 = vertexPoint(vertexIndex1)
+                    column2, row2, height2 = vertexPoint(vertexIndex2)
+                    nx, ny, c = sides[side]
+                    d1 = nx*column1 + ny*row1 + c
+                    d2 = nx*column2 + ny*row2 + c
+                    t = d1 / (d1 - d2)
+                    crossings[key] = (column1 + t*(column2 - column1), row1 + t*(row2 - row1), height1 + t*(height2 - height1), (vertexIndex1, vertexIndex2), key)
+                return crossings[key]
+            else:
+                # the segment lies on another side: the crossing is the corner between the two sides
+                t = distance1 / (distance1 - distance2)
+                column = point1[0] + t*(point2[0] - point1[0])
+                row = point1[1] + t*(point2[1] - point1[1])
+                height = point1[2] + t*(point2[2] - point1[2])
+                corner = min([side, (side+1) % numOfSides], key=lambda k: (corners[k][0] - column)**2 + (corners[k][1] - row)**2)
+                if (corners[corner][0] - column)**2 + (corners[corner][1] - row)**2 > onSideTolerance**2:
+                    # crossing of the extensions of two sides, which is clipped later by the sides in between
+                    return (column, row, height, None, ("p", column, row))
+                return (corners[corner][0], corners[corner][1], height, None, ("c", corner))
+        
+        # faces to crop: grid cells (counter-clockwise when seen from above, as CreateGeometry.gridMeshFaces) in the square (circle) bounding box, or triangles
+        if triangles == None:
+            firstRow = max(int(math.floor(centerRow - radius)), 0); lastRow = min(int(math.ceil(centerRow + radius)), numOfRows-1)
+            firstColumn = max(int(math.floor(centerColumn - radius)), 0); lastColumn = min(int(math.ceil(centerColumn + radius)), numOfColumns-1)
+            faces = ((row*numOfColumns + column, (row+1)*numOfColumns + column, (row+1)*numOfColumns + column+1, row*numOfColumns + column+1)  for row in xrange(firstRow, lastRow)  for column in xrange(firstColumn, lastColumn))
+        else:
+            faces = triangles
+        
+        croppedFaces = []
+        boundaryNextVertex = {}
+        vertexInside = {}
+        for face in faces:
+            points = []
+            for vertexIndex in face:
+                column, row, height = vertexPoint(vertexIndex)
+                points.append((column, row, height, (vertexIndex,), ("v", vertexIndex)))
+                if vertexIndex not in vertexInside:
+                    vertexInside[vertexIndex] = isInside(column, row)
+            
+            insideVertices = [vertexInside[vertexIndex]  for vertexIndex in face]
+            if all(insideVertices):
+                croppedFaces.append(tuple([croppedVertexIndex(point)  for point in points]))
+                continue
+            if not any(insideVertices):
+                # skip the faces which are completely outside of the circle (or square) itself
+                distanceX = max(min(point[0] for point in points) - centerColumn, 0, centerColumn - max(point[0] for point in points))
+                distanceY = max(min(point[1] for point in points) - centerRow, 0, centerRow - max(point[1] for point in points))
+                if (circular and (distanceX*distanceX + distanceY*distanceY >= radius*radius)) or ((not circular) and (max(distanceX, distanceY) >= radius)):
+                    continue
+            
+            # clip the face with each side (Sutherland-Hodgman). Quads are clipped as two triangles, because they are not planar
+            if len(points) == 4:
+                polygons = [[points[0], points[1], points[2]], [points[0], points[2], points[3]]]
+            else:
+                polygons = [points]
+            for polygon in polygons:
+                polygonSides = clippingSides(polygon)
+                for side in polygonSides:
+                    nx, ny, c = sides[side]
+                    distances = [nx*point[0] + ny*point[1] + c  for point in polygon]
+                    if min(distances) >= 0:
+                        continue
+                    if max(distances) <= 0:
+                        polygon = []
+                        break
+                    clippedPolygon = []
+                    for i in xrange(len(polygon)):
+                        distance1 = distances[i]; distance2 = distances[(i+1) % len(polygon)]
+                        if distance1 >= 0:
+                            clippedPolygon.append(polygon[i])
+                        if ((distance1 > 0) and (distance2 < 0)) or ((distance1 < 0) and (distance2 > 0)):
+                            clippedPolygon.append(crossing(polygon[i], polygon[(i+1) % len(polygon)], side, distance1, distance2))
+                    polygon = clippedPolygon
+                    if len(polygon) < 3:
+                        break
+                
+                polygonVertexIndices = []
+                for point in polygon:
+                    vertexIndex = croppedVertexIndex(point)
+                    if (len(polygonVertexIndices) == 0) or (polygonVertexIndices[-1] != vertexIndex):
+                        polygonVertexIndices.append(vertexIndex)
+                if (len(polygonVertexIndices) > 1) and (polygonVertexIndices[-1] == polygonVertexIndices[0]):
+                    polygonVertexIndices.pop()
+                if len(polygonVertexIndices) < 3:
+                    continue
+                
+                # clipped polygons are convex: fan triangulation. Their edges lying on the sides are the boundary of the cropped terrain
+                for i in xrange(1, len(polygonVertexIndices)-1):
+                    croppedFaces.append((polygonVertexIndices[0], polygonVertexIndices[i], polygonVertexIndices[i+1]))
+                for i in xrange(len(polygonVertexIndices)):
+                    vertexIndex1 = polygonVertexIndices[i]; vertexIndex2 = polygonVertexIndices[(i+1) % len(polygonVertexIndices)]
+                    middleColumn = (croppedVertices[vertexIndex1][0] + croppedVertices[vertexIndex2][0]) / 2.0
+                    middleRow = (croppedVertices[vertexIndex1][1] + croppedVertices[vertexIndex2][1]) / 2.0
+                    if min(sides[side][0]*middleColumn + sides[side][1]*middleRow + sides[side][2]  for side in polygonSides) <= onSideTolerance:
+                        boundaryNextVertex[vertexIndex1] = vertexIndex2
+        
+        # chain the boundary edges into a loop (the longest one, if there is more than one)
+        boundary = []
+        while boundaryNextVertex:
+            firstVertexIndex, vertexIndex = boundaryNextVertex.popitem()
+            loop = [firstVertexIndex]
+            while (vertexIndex != firstVertexIndex) and (vertexIndex in boundaryNextVertex):
+                loop.append(vertexIndex)
+                vertexIndex = boundaryNextVertex.pop(vertexIndex)
+            if len(loop) > len(boundary):
+                boundary = loop
+        
+        return croppedVertices, croppedFaces, boundary
+    
+    
+    def meshTriangles(self, faces):
+        """
+        split the mesh faces (triples or quadruples of vertex indices) into triangles. Quads are split along their first diagonal
+        """
+        triangles = []
+        for face in faces:
+            triangles.append((face[0], face[1], face[2]))
+            if len(face) == 4:
+                triangles.append((face[0], face[2], face[3]))
+        
+        return triangles
+    
+    
+    def meshVertexNormals(self, verticesX, verticesY, verticesZ, triangles):
+        """
+        calculate the unit normal of each mesh vertex as the area weighted mean of its triangles' normals
+        """
+        # cross product of two triangle edges is the triangle normal multiplied by twice the triangle area, so its sum over the vertex triangles is already area weighted
+        numOfVertices = len(verticesX)
+        normalsX = [0.0] * numOfVertices
+        normalsY = [0.0] * numOfVertices
+        normalsZ = [0.0] * numOfVertices
+        for a, b, c in triangles:
+            abX = verticesX[b] - verticesX[a]; abY = verticesY[b] - verticesY[a]; abZ = verticesZ[b] - verticesZ[a]
+            acX = verticesX[c] - verticesX[a]; acY = verticesY[c] - verticesY[a]; acZ = verticesZ[c] - verticesZ[a]
+            crossX = abY*acZ - abZ*acY
+            crossY = abZ*acX - abX*acZ
+            crossZ = abX*acY - abY*acX
+            for vertexIndex in (a, b, c):
+                normalsX[vertexIndex] += crossX
+                normalsY[vertexIndex] += crossY
+                normalsZ[vertexIndex] += crossZ
+        
+        for vertexIndex in xrange(numOfVertices):
+            normalLength = math.sqrt(normalsX[vertexIndex]**2 + normalsY[vertexIndex]**2 + normalsZ[vertexIndex]**2)
+            if normalLength > 0:
+                normalsX[vertexIndex] /= normalLength
+                normalsY[vertexIndex] /= normalLength
+                normalsZ[vertexIndex] /= normalLength
+            else:
+                normalsZ[vertexIndex] = 1.0  # vertex without faces
+        
+        return normalsX, normalsY, normalsZ
+    
+    
+    def meshVertexNeighbours(self, numOfVertices, faces):
+        """
+        find the neighbouring vertices of each mesh vertex: the ones which share a face with it
+        """
+        # for a mesh made from a grid of points (quads), these are the same 8 neighbours as in a 3x3 cells window
+        neighbours = [set()  for vertexIndex in xrange(numOfVertices)]
+        for face in faces:
+            for vertexIndex in face:
+                neighbours[vertexIndex].update(face)
+        for vertexIndex in xrange(numOfVertices):
+            neighbours[vertexIndex].discard(vertexIndex)
+        
+        return [list(vertexNeighbours)  for vertexNeighbours in neighbours]
+    
+    
+    def meshMeanCurvatures(self, verticesX, verticesY, verticesZ, triangles, normalsX, normalsY, normalsZ):
+        """
+        calculate the mean curvature at each mesh vertex, with the cotangent Laplace-Beltrami operator
+        """
+        # source: "Discrete differential-geometry operators for triangulated 2-manifolds", M. Meyer, M. Desbrun, P. Schroder, A. Barr, VisMath, 2002
+        # mean curvature is positive where the mesh bends towards the vertex normal (valleys of a terrain), the same as Rhino's surface curvature. Each vertex area is a third of its triangles' areas
+        # mean curvature of the vertices on the mesh boundary is the mean of the ones of their inner neighbouring vertices
+        numOfVertices = len(verticesX)
+        laplacesX = [0.0] * numOfVertices
+        laplacesY = [0.0] * numOfVertices
+        laplacesZ = [0.0] * numOfVertices
+        vertexAreas = [0.0] * numOfVertices
+        edgeCounts = {}
+        for triangle in triangles:
+            doubleArea = None
+            for corner in xrange(3):
+                a = triangle[corner]; b = triangle[(corner+1) % 3]; c = triangle[(corner+2) % 3]
+                abX = verticesX[b] - verticesX[a]; abY = verticesY[b] - verticesY[a]; abZ = verticesZ[b] - verticesZ[a]
+                acX = verticesX[c] - verticesX[a]; acY = verticesY[c] - verticesY[a]; acZ = verticesZ[c] - verticesZ[a]
+                crossLength = math.sqrt((abY*acZ - abZ*acY)**2 + (abZ*acX - abX*acZ)**2 + (abX*acY - abY*acX)**2)
+                if crossLength == 0:
+                    break  # degenerate triangle
+                doubleArea = crossLength
+                # cotangent of the angle at corner "a" weights the opposite edge "bc"
+                halfCotangent = 0.5 * (abX*acX + abY*acY + abZ*acZ) / crossLength
+                bcX = verticesX[c] - verticesX[b]; bcY = verticesY[c] - verticesY[b]; bcZ = verticesZ[c] - verticesZ[b]
+                laplacesX[b] += halfCotangent*bcX; laplacesY[b] += halfCotangent*bcY; laplacesZ[b] += halfCotangent*bcZ
+                laplacesX[c] -= halfCotangent*bcX; laplacesY[c] -= halfCotangent*bcY; laplacesZ[c] -= halfCotangent*bcZ
+                edge = (min(b,c), max(b,c))
+                edgeCounts[edge] = edgeCounts.get(edge, 0) + 1
+            else:
+                for vertexIndex in triangle:
+                    vertexAreas[vertexIndex] += doubleArea / 6
+        
+        boundaryVertices = set()
+        for edge, edgeCount in edgeCounts.iteritems():
+            if edgeCount == 1:
+                boundaryVertices.update(edge)
+        del edgeCounts
+        
+        meanCurvatures = [0.0] * numOfVertices
+        for vertexIndex in xrange(numOfVertices):
+            if (vertexAreas[vertexIndex] > 0) and (vertexIndex not in boundaryVertices):
+                meanCurvatures[vertexIndex] = (laplacesX[vertexIndex]*normalsX[vertexIndex] + laplacesY[vertexIndex]*normalsY[vertexIndex] + laplacesZ[vertexIndex]*normalsZ[vertexIndex]) / (2*vertexAreas[vertexIndex])
+        
+        if boundaryVertices:
+            innerNeighbours = {}
+            for triangle in triangles:
+                for vertexIndex in triangle:
+                    if vertexIndex in boundaryVertices:
+                        innerNeighbours.setdefault(vertexIndex, set()).update([neighbourIndex  for neighbourIndex in triangle  if neighbourIndex not in boundaryVertices])
+            for vertexIndex, neighbourIndices in innerNeighbours.iteritems():
+                if neighbourIndices:
+                    meanCurvatures[vertexIndex] = sum(meanCurvatures[neighbourIndex]  for neighbourIndex in neighbourIndices) / len(neighbourIndices)
+        
+        return meanCurvatures
+    
+    
+    def meshRoughnessIndices(self, heights, normalsX, normalsY, normalsZ, neighbours):
+        """
+        calculate TRI, SRF, TPI and ERR of each mesh vertex, for a window of the vertex and its neighbouring vertices (Terrain.meshVertexNeighbours)
+        """
+        # the same indices as Terrain.roughnessIndices calculates for a 3x3 cells window of a heights grid
+        TRI_List = []
+        SRF_List = []
+        TPI_List = []
+        ERR_List = []
+        for vertexIndex, vertexNeighbours in enumerate(neighbours):
+            centralHeight = heights[vertexIndex]
+            neighbourHeights = [heights[neighbourIndex]  for neighbourIndex in vertexNeighbours]
+            windowVertices = len(vertexNeighbours) + 1
+            
+            # Terrain Ruggedness Index (Riley)
+            TRI_List.append(math.sqrt(sum((height - centralHeight)**2  for height in neighbourHeights)))
+            
+            # Surface Roughness Factor (Hobson)
+            normalXsum = normalsX[vertexIndex] + sum(normalsX[neighbourIndex]  for neighbourIndex in vertexNeighbours)
+            normalYsum = normalsY[vertexIndex] + sum(normalsY[neighbourIndex]  for neighbourIndex in vertexNeighbours)
+            normalZsum = normalsZ[vertexIndex] + sum(normalsZ[neighbourIndex]  for neighbourIndex in vertexNeighbours)
+            SRF_List.append(math.sqrt(normalXsum**2 + normalYsum**2 + normalZsum**2) / windowVertices)
+            
+            # Topographic Position Index
+            if len(neighbourHeights) > 0:
+                TPI_List.append(centralHeight - sum(neighbourHeights)/len(neighbourHeights))
+            else:
+                TPI_List.append(0)
+            
+            # Elevation-Relief Ratio (Pike and Wilson)
+            windowHeights = neighbourHeights + [centralHeight]
+            relief = max(windowHeights) - min(windowHeights)
+            if relief > 0:
+                ERR_List.append((sum(windowHeights)/windowVertices - min(windowHeights)) / relief)
+            else:
+                ERR_List.append(0)  # flat window
+        
+        return TRI_List, SRF_List, TPI_List, ERR_List
+
+
+class ElevationSampler():
+    """
+    bilinear elevations of any number of points from the heights grid of a terrain created by "Terrain Generator" component. No terrain geometry is intersected
+    """
+    def __init__(self, heights, numOfRows, numOfColumns, cellsizeM, locationColumn, locationRow, origin, northRad, unitConversionFactor, upperLeftCornerX=None, upperLeftCornerY=None, CRS_UTMzone=None, northOrsouth=None):
+        # heights are in meters, row after row from the upper left corner. locationColumn, locationRow: position of the terrain's "origin" in the grid, as fractional column and row indices
+        # origin, northRad and unitConversionFactor (Rhino document units to meters) are the ones with which "Terrain Generator" moved, rotated and scaled its terrain
+        # upperLeftCornerX, upperLeftCornerY (UTM coordinates of the grid's first height), CRS_UTMzone and northOrsouth are only needed for the latitude-longitude points
+        self.heights = heights
+        self.numOfRows = numOfRows
+        self.numOfColumns = numOfColumns
+        self.cellsizeM = cellsizeM
+        self.locationColumn = locationColumn
+        self.locationRow = locationRow
+        self.origin = Rhino.Geometry.Point3d(origin)
+        self.northRad = northRad
+        self.unitConversionFactor = unitConversionFactor
+        self.upperLeftCornerX = upperLeftCornerX
+        self.upperLeftCornerY = upperLeftCornerY
+        self.CRS_UTMzone = CRS_UTMzone
+        self.northOrsouth = northOrsouth
+        self.terrain = Terrain()
+        self.locationHeightM = self.terrain.heightAt(heights, numOfRows, numOfColumns, locationColumn, locationRow)
+        if math.isnan(self.locationHeightM):
+            self.locationHeightM = 0  # origin on no data heights: the terrain geometry has them set to 0
+    
+    
+    def heightsAt(self, columns, rows):
+        """
+        bilinear heights (in meters) at fractional column and row indices. Positions outside of the grid (or without data) get None
+        """
+        heightsAt = []
+        for column, row in zip(columns, rows):
+            height = self.terrain.heightAt(self.heights, self.numOfRows, self.numOfColumns, column, row)
+            heightsAt.append(None if math.isnan(height) else height)
+        
+        return heightsAt
+    
+    
+    def gridPositions(self, pts):
+        """
+        fractional column and row indices of points from the Rhino document (moved, rotated "terrain" output of "Terrain Generator" component)
+        """
+        # undo the "Terrain Generator" rotation around the origin, then convert to meters
+        cosNorth = math.cos(-self.northRad)
+        sinNorth = math.sin(-self.northRad)
+        factor = self.unitConversionFactor / self.cellsizeM
+        columns = []
+        rows = []
+        for pt in pts:
+            dx = pt.X - self.origin.X
+            dy = pt.Y - self.origin.Y
+            columns.append(self.locationColumn + (dx*cosNorth - dy*sinNorth)*factor)
+            rows.append(self.locationRow - (dx*sinNorth + dy*cosNorth)*factor)
+        
+        return columns, rows
+    
+    
+    def elevations(self, pts):
+        """
+        elevations (above the sea level) of the terrain below each of the points, in Rhino document units. Points outside of the terrain get None
+        """
+        columns, rows = self.gridPositions(pts)
+        return [height/self.unitConversionFactor if (height != None) else None  for height in self.heightsAt(columns, rows)]
+    
+    
+    def terrainPoints(self, pts):
+        """
+        points moved vertically to the terrain. Points outside of the terrain get None
+        """
+        terrainPts = []
+        for pt, elevation in zip(pts, self.elevations(pts)):
+            if elevation == None:
+                terrainPts.append(None)
+            else:
+                terrainPts.append(Rhino.Geometry.Point3d(pt.X, pt.Y, self.origin.Z + elevation - self.locationHeightM/self.unitConversionFactor))
+        
+        return terrainPts
+    
+    
+    def elevationsLatLon(self, latitudesD, longitudesD):
+        """
+        elevations (above the sea level) of the terrain at latitude-longitude points, in Rhino document units. Points outside of the terrain get None
+        """
+        gismo_gis = GIS()
+        columns = []
+        rows = []
+        for latitudeD, longitudeD in zip(latitudesD, longitudesD):
+            x, y = gismo_gis.latLonToUTM(latitudeD, longitudeD, self.CRS_UTMzone, self.northOrsouth)
+            columns.append((x - self.upperLeftCornerX) / self.cellsizeM)
+            rows.append((self.upperLeftCornerY - y) / self.cellsizeM)
+        return [height/self.unitConversionFactor if (height != None) else None  for height in self.heightsAt(columns, rows)]
+
+
 def raiseWarning(booleanValue, printMsg):
     if not booleanValue:
         level = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
@@ -2308,6 +4460,8 @@ sc.sticky["gismo_CreateGeometry"] = CreateGeometry
 sc.sticky["gismo_EnvironmentalAnalysis"] = EnvironmentalAnalysis
 sc.sticky["gismo_GIS"] = GIS
 sc.sticky["gismo_OSM"] = OSM
+sc.sticky["gismo_Terrain"] = Terrain
+sc.sticky["gismo_ElevationSampler"] = ElevationSampler
 sc.sticky["gismo_mapwingisFolder"] = mapFolder_
 
 # check gismoFolder